@@ -80,10 +80,19 @@ class EventController(object):
         self.options = options
         self.engine = rpc_client.EngineClient()
 
-    def _event_list(self, req, identity,
-                    filter_func=lambda e: True, detail=False):
+    def _event_list(self, req, identity, filter_func=lambda e: True,
+                    detail=False, filters=None, limit=None, marker=None,
+                    sort_keys=None, sort_dir=None):
+        # The resource properties are not part of the summary, so don't
+        # bother loading them
         events = self.engine.list_events(req.context,
-                                         identity)
+                                         identity,
+                                         include_properties=detail,
+                                         filters=filters,
+                                         limit=limit,
+                                         marker=marker,
+                                         sort_keys=sort_keys,
+                                         sort_dir=sort_dir)
 
         keys = None if detail else summary_keys
 
@@ -94,13 +103,29 @@ class EventController(object):
         """
         Lists summary information for all events
         """
+        whitelist = {
+            'limit': 'single',
+            'marker': 'single',
+            'sort_dir': 'single',
+            'sort_keys': 'multi',
+        }
+        filter_whitelist = {
+            'resource_status': 'mixed',
+            'resource_action': 'mixed',
+            'resource_name': 'mixed',
+        }
+        params = util.get_allowed_params(req.params, whitelist)
+        filter_params = util.get_allowed_params(req.params, filter_whitelist)
 
         if resource_name is None:
-            events = self._event_list(req, identity)
+            events = self._event_list(req, identity,
+                                      filters=filter_params, **params)
         else:
             res_match = lambda e: e[engine_api.EVENT_RES_NAME] == resource_name
 
-            events = self._event_list(req, identity, res_match)
+            filter_params['resource_name'] = resource_name
+            events = self._event_list(req, identity, res_match,
+                                      filters=filter_params, **params)
             if not events:
                 msg = _('No events found for resource %s') % resource_name
                 raise exc.HTTPNotFound(msg)
@@ -118,7 +143,8 @@ class EventController(object):
             return (ev[engine_api.EVENT_RES_NAME] == resource_name and
                     identity.event_id == event_id)
 
-        events = self._event_list(req, identity, event_match, True)
+        events = self._event_list(req, identity, event_match, True,
+                                  filters={'resource_name': resource_name})
         if not events:
             raise exc.HTTPNotFound(_('No event %s found') % event_id)
 
@@ -191,7 +191,7 @@ class StackController(object):
         """
         Lists detailed information for all stacks
         """
-        stacks = self.engine.list_stacks(req.context)
+        stacks = self.engine.show_stack(req.context, None)
 
         return {'stacks': [stacks_view.format_stack(req, s) for s in stacks]}
 
@@ -19,6 +19,7 @@
 """
 
 import sys
+import time
 
 from oslo.config import cfg
 
@@ -48,7 +49,19 @@ def purge_deleted():
     """
     Remove database records that have been previously soft deleted
     """
-    utils.purge_deleted(CONF.command.age, CONF.command.granularity)
+    start = time.time()
+    purged = utils.purge_deleted(CONF.command.age, CONF.command.granularity,
+                                 CONF.command.batch_size)
+    elapsed = time.time() - start
+
+    total = sum(purged.values())
+    for table, count in sorted(purged.items()):
+        print(_('%(table)s: %(count)d rows deleted') % {'table': table,
+                                                       'count': count})
+    print(_('Deleted %(total)d rows in %(elapsed).1f seconds '
+            '(%(rate).1f rows/second)') %
+          {'total': total, 'elapsed': elapsed,
+           'rate': total / elapsed if elapsed else 0.0})
 
 
 def add_command_parsers(subparsers):
@@ -68,6 +81,10 @@ def add_command_parsers(subparsers):
         '-g', '--granularity', default='days',
         choices=['days', 'hours', 'minutes', 'seconds'],
         help=_('Granularity to use for age argument, defaults to days.'))
+    parser.add_argument(
+        '-b', '--batch-size', default='1000',
+        help=_('Number of rows to delete in each transaction, '
+               'defaults to 1000.'))
 
 command_opt = cfg.SubCommandOpt('command',
                                 title='Commands',
@@ -64,6 +64,25 @@ service_opts = [
     cfg.IntOpt('max_template_size',
                default=524288,
                help='Maximum raw byte size of any template.'),
+    cfg.IntOpt('parsed_template_cache_size',
+               default=32,
+               help=_('Maximum number of parsed YAML templates cached in'
+                      ' memory by each process, so that the same template'
+                      ' text need not be parsed again. Set to 0 to disable'
+                      ' the cache.')),
+    cfg.IntOpt('template_fetch_chunk_size',
+               default=65536,
+               help=_('Size (in bytes) of the chunks in which templates are'
+                      ' read when fetching them from a URL.')),
+    cfg.IntOpt('template_fetch_timeout',
+               default=60,
+               help=_('Timeout (in seconds) for connecting to a server and'
+                      ' for each read from it when fetching a template from'
+                      ' a URL.')),
+    cfg.IntOpt('template_fetch_pool_size',
+               default=10,
+               help=_('Maximum number of connections kept open to each host'
+                      ' from which templates are fetched.')),
     cfg.IntOpt('max_nested_stack_depth',
                default=3,
                help='Maximum depth allowed when using nested stacks.')]
@@ -107,10 +126,108 @@ engine_opts = [
                help=_('Maximum events that will be available per stack. Older'
                       ' events will be deleted when this is reached. Set to 0'
                       ' for unlimited events per stack.')),
+    cfg.IntOpt('event_batch_size',
+               default=100,
+               help=_('Maximum number of events buffered in the engine before'
+                      ' they are written to the database in a single batch.'
+                      ' Buffered events are also written after'
+                      ' event_batch_interval seconds and whenever a stack'
+                      ' action finishes. Set to 0 to write each event to the'
+                      ' database as it occurs.')),
+    cfg.IntOpt('event_batch_interval',
+               default=1,
+               help=_('Maximum time (in seconds) for which events are'
+                      ' buffered in the engine before being written to the'
+                      ' database.')),
     cfg.IntOpt('engine_life_check_timeout',
                default=2,
                help=_('RPC timeout for the engine liveness check that is used'
-                      ' for stack locking.'))]
+                      ' for stack locking.')),
+    cfg.IntOpt('max_concurrent_resource_actions',
+               default=0,
+               help=_('Maximum number of resources in a stack that may be'
+                      ' created, updated, deleted, etc. at the same time.'
+                      ' May be overridden for a stack in the engine_options'
+                      ' section of its environment. Set to 0 for no limit.')),
+    cfg.IntOpt('max_concurrent_resource_actions_per_engine',
+               default=0,
+               help=_('Maximum number of resource actions that may be in'
+                      ' progress at the same time across all stacks in an'
+                      ' engine. The limit is shared fairly between stacks.'
+                      ' Actions on nested stack resources are not counted,'
+                      ' only those on the resources of the nested stacks.'
+                      ' Set to 0 for no limit.')),
+    cfg.IntOpt('server_status_cache_ttl',
+               default=2,
+               help=_('Time (in seconds) for which the status of servers'
+                      ' fetched from Nova with a single list query is shared'
+                      ' between all of the servers being polled. Set to 0 to'
+                      ' poll each server individually.')),
+    cfg.IntOpt('template_cache_size',
+               default=100,
+               help=_('Maximum number of parsed templates (and the static'
+                      ' data resolved from them for each set of stack'
+                      ' parameters) cached in memory by each engine. Set to'
+                      ' 0 to disable the cache.')),
+    cfg.IntOpt('remote_template_cache_size',
+               default=10485760,
+               help=_('Maximum total size (in bytes) of the nested and'
+                      ' provider templates fetched from remote URLs that are'
+                      ' cached by each engine. Set to 0 to disable the'
+                      ' cache.')),
+    cfg.IntOpt('remote_template_cache_ttl',
+               default=60,
+               help=_('Time (in seconds) for which a cached remote template'
+                      ' is used without checking whether it has changed.'
+                      ' After this, it is revalidated with a conditional'
+                      ' request.')),
+    cfg.StrOpt('remote_template_cache_dir',
+               help=_('Directory in which cached remote templates are also'
+                      ' stored, so that they survive engine restarts and are'
+                      ' shared between the engines on a host. By default'
+                      ' they are only cached in memory.')),
+    cfg.BoolOpt('dispatch_nested_stacks',
+                default=False,
+                help=_('Create nested stacks on any available engine, by'
+                       ' sending a message over RPC, instead of in the'
+                       ' engine that is creating the parent stack. The'
+                       ' parent stack waits for the nested stack to finish'
+                       ' by polling its status in the database.')),
+    cfg.IntOpt('nested_stack_dispatch_timeout',
+               default=60,
+               help=_('Time (in seconds) that a parent stack waits for an'
+                      ' engine to start creating a nested stack dispatched'
+                      ' over RPC, before cancelling it and failing.')),
+    cfg.IntOpt('num_engine_workers',
+               default=1,
+               help=_('Number of heat-engine processes to fork and run.'
+                      ' Each has its own engine ID and consumes from the'
+                      ' shared engine topic, with stack locks preventing'
+                      ' concurrent actions on the same stack.')),
+    cfg.IntOpt('wait_condition_poll_interval',
+               default=30,
+               help=_('Interval (in seconds) at which a WaitCondition checks'
+                      ' its handle for signals in the database, in case a'
+                      ' notification of a signal sent to the engine running'
+                      ' it was lost. Set to 0 to check on every step.')),
+    cfg.IntOpt('user_creds_cache_size',
+               default=1000,
+               help=_('Maximum number of stacks for which the decrypted'
+                      ' stored credentials are cached in memory by each'
+                      ' engine, so that handling signals and watch rules'
+                      ' does not read and decrypt them every time. Set to 0'
+                      ' to disable the cache.')),
+    cfg.IntOpt('trust_token_cache_size',
+               default=1000,
+               help=_('Maximum number of trust-scoped keystone tokens cached'
+                      ' in memory by each engine, so that handling signals'
+                      ' and watch rules does not authenticate with keystone'
+                      ' every time. Set to 0 to disable the cache.')),
+    cfg.IntOpt('trust_token_expiry_margin',
+               default=300,
+               help=_('Time (in seconds) before a cached trust-scoped token'
+                      ' expires at which a new token is obtained instead of'
+                      ' using it.'))]
 
 rpc_opts = [
     cfg.StrOpt('host',
@@ -17,8 +17,11 @@ from heat.common.template_format import yaml
 from heat.common.template_format import yaml_loader
 
 
-SECTIONS = (PARAMETERS, RESOURCE_REGISTRY) = \
-           ('parameters', 'resource_registry')
+SECTIONS = (PARAMETERS, RESOURCE_REGISTRY, ENGINE_OPTIONS) = \
+           ('parameters', 'resource_registry', 'engine_options')
+
+# Sections which are always present in a parsed environment
+REQUIRED_SECTIONS = (PARAMETERS, RESOURCE_REGISTRY)
 
 
 def parse(env_str):
@@ -47,6 +50,6 @@ def default_for_missing(env):
     '''
     Checks a parsed environment for missing sections.
     '''
-    for param in SECTIONS:
+    for param in REQUIRED_SECTIONS:
         if param not in env:
             env[param] = {}
@@ -19,6 +19,7 @@ import uuid
 
 from heat.common import context
 from heat.common import exception
+from heat.common import lru_cache
 
 import keystoneclient.exceptions as kc_exception
 from keystoneclient.v3 import client as kc_v3
@@ -30,8 +31,32 @@ from heat.openstack.common.gettextutils import _
 
 logger = logging.getLogger('heat.common.keystoneclient')
 
+cfg.CONF.import_opt('trust_token_cache_size', 'heat.common.config')
+cfg.CONF.import_opt('trust_token_expiry_margin', 'heat.common.config')
+
 AccessKey = namedtuple('AccessKey', ['id', 'access', 'secret'])
 
+# The auth references for trust-scoped tokens, keyed by trust ID. A token
+# obtained with a trust can't be used to obtain another, so it is shared by all
+# of the clients for the trust until it is about to expire.
+_trust_auth_refs = lru_cache.LRUCache(
+    lambda: cfg.CONF.trust_token_cache_size)
+
+
+def _get_trust_auth_ref(trust_id):
+    auth_ref = _trust_auth_refs.get(trust_id)
+    if auth_ref is None:
+        return None
+    if auth_ref.will_expire_soon(cfg.CONF.trust_token_expiry_margin):
+        _trust_auth_refs.pop(trust_id)
+        return None
+    return auth_ref
+
+
+def clear_trust_token_cache():
+    '''Discard all cached trust-scoped tokens.'''
+    _trust_auth_refs.clear()
+
 
 class KeystoneClient(object):
     """
@@ -108,8 +133,16 @@ class KeystoneClient(object):
         kwargs['insecure'] = self._get_client_option('insecure')
         kwargs['cert'] = self._get_client_option('cert_file')
         kwargs['key'] = self._get_client_option('key_file')
+        auth_ref = None
+        if 'trust_id' in kwargs:
+            auth_ref = _get_trust_auth_ref(kwargs['trust_id'])
         client_v3 = kc_v3.Client(**kwargs)
-        client_v3.authenticate()
+        if auth_ref is not None:
+            # Reuse the token already obtained with this trust
+            client_v3.auth_ref = auth_ref
+            client_v3.process_token()
+        else:
+            client_v3.authenticate()
         # If we are authenticating with a trust set the context auth_token
         # with the trust scoped token
         if 'trust_id' in kwargs:
@@ -124,6 +157,8 @@ class KeystoneClient(object):
             if self.context.trustor_user_id != client_v3.auth_ref.user_id:
                 logger.error("Trust impersonation failed")
                 raise exception.AuthorizationFailure()
+            if auth_ref is None:
+                _trust_auth_refs.put(kwargs['trust_id'], client_v3.auth_ref)
 
         return client_v3
 
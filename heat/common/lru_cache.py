@@ -0,0 +1,124 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+A least-recently-used cache that does not depend on collections.OrderedDict,
+which is not available in Python 2.6.
+"""
+
+# Fields of a link in the list of entries
+PREV, NEXT, KEY, VALUE = range(4)
+
+
+class LRUCache(object):
+    """
+    A cache holding a bounded number of entries, evicting the least recently
+    used first.
+
+    The maximum size may be given as an integer or as a callable returning
+    one, so that it can be read from a config option whenever an entry is
+    added. If the maximum size is zero or less nothing is cached; if it is
+    None, entries are only ever removed explicitly.
+    """
+
+    def __init__(self, max_size=None):
+        self._max_size = max_size
+        # Each entry is a link in a circular doubly-linked list, in order from
+        # least to most recently used, with the root link as a sentinel.
+        self._links = {}
+        self._root = []
+        self._root[:] = [self._root, self._root, None, None]
+
+    def max_size(self):
+        """Return the maximum number of entries, or None if unbounded."""
+        if callable(self._max_size):
+            return self._max_size()
+        return self._max_size
+
+    def __len__(self):
+        return len(self._links)
+
+    def __contains__(self, key):
+        """Return True if a key is cached, without marking it as used."""
+        return key in self._links
+
+    def __iter__(self):
+        """Iterate over the keys, from least to most recently used."""
+        keys = []
+        link = self._root[NEXT]
+        while link is not self._root:
+            keys.append(link[KEY])
+            link = link[NEXT]
+        return iter(keys)
+
+    def _unlink(self, link):
+        link[PREV][NEXT] = link[NEXT]
+        link[NEXT][PREV] = link[PREV]
+
+    def _append(self, link):
+        last = self._root[PREV]
+        link[PREV] = last
+        link[NEXT] = self._root
+        last[NEXT] = link
+        self._root[PREV] = link
+
+    def get(self, key, default=None):
+        """
+        Return the entry for a key, marking it as the most recently used, or
+        the default if it is not cached.
+        """
+        link = self._links.get(key)
+        if link is None:
+            return default
+        self._unlink(link)
+        self._append(link)
+        return link[VALUE]
+
+    def put(self, key, value):
+        """Add an entry, evicting the least recently used if necessary."""
+        max_size = self.max_size()
+        if max_size is not None and max_size <= 0:
+            return
+
+        link = self._links.get(key)
+        if link is None:
+            link = [None, None, key, value]
+            self._links[key] = link
+        else:
+            self._unlink(link)
+            link[VALUE] = value
+        self._append(link)
+
+        if max_size is not None:
+            while len(self._links) > max_size:
+                self.popitem()
+
+    def pop(self, key, default=None):
+        """Remove the entry for a key and return it, or the default."""
+        link = self._links.pop(key, None)
+        if link is None:
+            return default
+        self._unlink(link)
+        return link[VALUE]
+
+    def popitem(self):
+        """Remove and return the least recently used (key, value) pair."""
+        link = self._root[NEXT]
+        if link is self._root:
+            raise KeyError('LRU cache is empty')
+        return link[KEY], self.pop(link[KEY])
+
+    def clear(self):
+        self._links.clear()
+        self._root[:] = [self._root, self._root, None, None]
@@ -13,6 +13,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import copy
+import hashlib
 import re
 import yaml
 import json
@@ -20,8 +22,10 @@ import json
 from oslo.config import cfg
 
 from heat.common import exception
+from heat.common import lru_cache
 
 cfg.CONF.import_opt('max_template_size', 'heat.common.config')
+cfg.CONF.import_opt('parsed_template_cache_size', 'heat.common.config')
 
 HEAT_VERSIONS = (u'2012-12-12',)
 CFN_VERSIONS = (u'2010-09-09',)
@@ -50,6 +54,35 @@ yaml_loader.add_constructor(u'tag:yaml.org,2002:timestamp',
                             _construct_yaml_str)
 
 
+# Parsed YAML templates, keyed by a hash of their text
+_parse_cache = lru_cache.LRUCache(lambda: cfg.CONF.parsed_template_cache_size)
+
+
+def _load_yaml(tmpl_str):
+    '''
+    Parse a YAML template, reusing the result if the same text was parsed
+    recently. Only YAML results are cached, since the (C accelerated) JSON
+    parser is faster than copying a cached result.
+    '''
+    if isinstance(tmpl_str, unicode):
+        key = hashlib.sha1(tmpl_str.encode('utf-8')).hexdigest()
+    else:
+        key = hashlib.sha1(tmpl_str).hexdigest()
+
+    tpl = _parse_cache.get(key)
+    if tpl is None:
+        try:
+            tpl = yaml.load(tmpl_str, Loader=yaml_loader)
+        except yaml.YAMLError as yea:
+            raise ValueError(yea)
+        if tpl is None:
+            tpl = {}
+        _parse_cache.put(key, tpl)
+
+    # Callers are free to modify the template they are given
+    return copy.deepcopy(tpl)
+
+
 def parse(tmpl_str):
     '''
     Takes a string and returns a dict containing the parsed structure.
@@ -59,16 +92,18 @@ def parse(tmpl_str):
     if len(tmpl_str) > cfg.CONF.max_template_size:
         msg = _('Template exceeds maximum allowed size.')
         raise exception.RequestLimitExceeded(message=msg)
-    try:
-        tpl = json.loads(tmpl_str)
-    except ValueError:
+
+    # A JSON template must start with "{", so anything else can go straight
+    # to the YAML parser without a failed attempt to parse it as JSON. (A
+    # YAML flow mapping also starts with "{", so that still falls back.)
+    if tmpl_str.lstrip()[:1] == '{':
         try:
-            tpl = yaml.load(tmpl_str, Loader=yaml_loader)
-        except yaml.YAMLError as yea:
-            raise ValueError(yea)
-        else:
-            if tpl is None:
-                tpl = {}
+            tpl = json.loads(tmpl_str)
+        except ValueError:
+            tpl = _load_yaml(tmpl_str)
+    else:
+        tpl = _load_yaml(tmpl_str)
+
     if not isinstance(tpl, dict):
         raise ValueError(_('The template is not a JSON object '
                            'or YAML mapping.'))
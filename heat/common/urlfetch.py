@@ -17,19 +17,40 @@
 Utility for fetching a resource (e.g. a template) from a URL.
 '''
 
+import hashlib
+import json
+import os
+import tempfile
+
+import eventlet
 import requests
+from requests import adapters
 from requests import exceptions
 
 from oslo.config import cfg
 
 cfg.CONF.import_opt('max_template_size', 'heat.common.config')
+cfg.CONF.import_opt('template_fetch_chunk_size', 'heat.common.config')
+cfg.CONF.import_opt('template_fetch_timeout', 'heat.common.config')
+cfg.CONF.import_opt('template_fetch_pool_size', 'heat.common.config')
+cfg.CONF.import_opt('remote_template_cache_size', 'heat.common.config')
+cfg.CONF.import_opt('remote_template_cache_ttl', 'heat.common.config')
+cfg.CONF.import_opt('remote_template_cache_dir', 'heat.common.config')
 
+from heat.common import lru_cache
 from heat.openstack.common import log as logging
 from heat.openstack.common.gettextutils import _
 from heat.openstack.common.py3kcompat import urlutils
+from heat.openstack.common import timeutils
 
 logger = logging.getLogger(__name__)
 
+# The cache of remote templates, if enabled in this process
+_cache = None
+
+# The HTTP session used for all fetches, created on first use
+_http_session = None
+
 
 def get(url, allowed_schemes=('http', 'https')):
     '''
@@ -49,30 +70,225 @@ def get(url, allowed_schemes=('http', 'https')):
 
     if components.scheme == 'file':
         try:
-            return urlutils.urlopen(url).read()
+            data = urlutils.urlopen(url).read(cfg.CONF.max_template_size + 1)
         except urlutils.URLError as uex:
             raise IOError(_('Failed to retrieve template: %s') % str(uex))
+        _check_size(len(data))
+        return data
 
-    try:
-        resp = requests.get(url, stream=True)
-        resp.raise_for_status()
-
-        # We cannot use resp.text here because it would download the
-        # entire file, and a large enough file would bring down the
-        # engine.  The 'Content-Length' header could be faked, so it's
-        # necessary to download the content in chunks to until
-        # max_template_size is reached.  The chunk_size we use needs
-        # to balance CPU-intensive string concatenation with accuracy
-        # (eg. it's possible to fetch 1000 bytes greater than
-        # max_template_size with a chunk_size of 1000).
-        reader = resp.iter_content(chunk_size=1000)
-        result = ""
-        for chunk in reader:
-            result += chunk
-            if len(result) > cfg.CONF.max_template_size:
-                raise IOError("Template exceeds maximum allowed size (%s "
-                              "bytes)" % cfg.CONF.max_template_size)
-        return result
+    if _cache is not None:
+        return _cache.get(url)
 
+    try:
+        return _read(_request(url))
     except exceptions.RequestException as ex:
         raise IOError(_('Failed to retrieve template: %s') % str(ex))
+
+
+def _session():
+    '''Return the HTTP session whose connections are shared by fetches.'''
+    global _http_session
+    if _http_session is None:
+        pool_size = cfg.CONF.template_fetch_pool_size
+        adapter = adapters.HTTPAdapter(pool_connections=pool_size,
+                                       pool_maxsize=pool_size)
+        _http_session = requests.Session()
+        _http_session.mount('http://', adapter)
+        _http_session.mount('https://', adapter)
+    return _http_session
+
+
+def _request(url, headers=None):
+    resp = _session().get(url, stream=True, headers=headers,
+                          timeout=cfg.CONF.template_fetch_timeout)
+    resp.raise_for_status()
+    return resp
+
+
+def _read(resp):
+    '''Read the body of a streamed response, up to max_template_size.'''
+    # We cannot use resp.text here because it would download the
+    # entire file, and a large enough file would bring down the
+    # engine.  The 'Content-Length' header could be faked, so it's
+    # necessary to download the content in chunks until max_template_size
+    # is reached.  The chunks are joined only once at the end, so the cost
+    # of reading is linear in the size of the template.
+    chunk_size = cfg.CONF.template_fetch_chunk_size
+    chunks = []
+    size = 0
+    try:
+        for chunk in resp.iter_content(chunk_size=chunk_size):
+            size += len(chunk)
+            _check_size(size)
+            chunks.append(chunk)
+            # Don't starve other green threads while a large template is
+            # being downloaded
+            eventlet.sleep(0)
+    finally:
+        # Return the connection to the pool
+        resp.close()
+    return ''.join(chunks)
+
+
+def _check_size(size):
+    if size > cfg.CONF.max_template_size:
+        raise IOError("Template exceeds maximum allowed size (%s "
+                      "bytes)" % cfg.CONF.max_template_size)
+
+
+def enable_cache():
+    '''
+    Cache the templates fetched over HTTP(S) by this process.
+
+    This is used by the engine, which fetches the same nested and provider
+    templates every time a stack using them is loaded.
+    '''
+    global _cache
+    if cfg.CONF.remote_template_cache_size > 0:
+        _cache = TemplateCache(cfg.CONF.remote_template_cache_dir)
+    else:
+        _cache = None
+    return _cache
+
+
+def disable_cache():
+    global _cache
+    _cache = None
+
+
+class TemplateCache(object):
+    '''
+    A cache of templates fetched from remote URLs.
+
+    Entries are used as-is for remote_template_cache_ttl seconds, then
+    revalidated with a conditional request using the ETag and Last-Modified
+    headers of the original response. The total size of the cached
+    templates is limited to remote_template_cache_size bytes, with the least
+    recently used entries evicted first. If a directory is given, entries
+    are also stored there, so that they outlive the process.
+    '''
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir
+        self._entries = lru_cache.LRUCache()
+        self._size = 0
+        self.stats = dict.fromkeys(('hits', 'misses', 'revalidated',
+                                    'evicted'), 0)
+
+    def get(self, url):
+        '''Return the template at a URL, fetching it if necessary.'''
+        entry = self._lookup(url)
+        now = timeutils.utcnow_ts()
+        ttl = cfg.CONF.remote_template_cache_ttl
+
+        if entry is not None and now - entry['fetched_at'] < ttl:
+            self.stats['hits'] += 1
+            return entry['data']
+
+        headers = {}
+        if entry is not None:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        try:
+            resp = _request(url, headers)
+
+            if resp.status_code == 304 and entry is not None:
+                resp.close()
+                self.stats['revalidated'] += 1
+                data = entry['data']
+            else:
+                self.stats['misses'] += 1
+                data = _read(resp)
+                entry = {'url': url,
+                         'data': data,
+                         'etag': resp.headers.get('ETag'),
+                         'last_modified': resp.headers.get('Last-Modified')}
+
+        except exceptions.RequestException as ex:
+            raise IOError(_('Failed to retrieve template: %s') % str(ex))
+
+        entry['fetched_at'] = now
+        self._store(url, entry)
+        logger.debug(_('Remote template cache: %(hits)d hits, %(misses)d '
+                       'misses, %(revalidated)d revalidated, %(evicted)d '
+                       'evicted') % self.stats_dict())
+        return data
+
+    def stats_dict(self):
+        '''Return the cache metrics as a dict.'''
+        return dict(self.stats)
+
+    def clear(self):
+        for url in list(self._entries):
+            self._evict(url)
+
+    def _lookup(self, url):
+        entry = self._entries.get(url)
+        if entry is None:
+            entry = self._load(url)
+            if entry is None:
+                return None
+            self._entries.put(url, entry)
+            self._size += len(entry['data'])
+        return entry
+
+    def _store(self, url, entry):
+        old = self._entries.pop(url, None)
+        if old is not None:
+            self._size -= len(old['data'])
+
+        max_size = cfg.CONF.remote_template_cache_size
+        if len(entry['data']) > max_size:
+            self._remove_file(url)
+            return
+
+        self._entries.put(url, entry)
+        self._size += len(entry['data'])
+        while self._size > max_size:
+            self._evict(next(iter(self._entries)))
+        self._save(url, entry)
+
+    def _evict(self, url):
+        entry = self._entries.pop(url)
+        self._size -= len(entry['data'])
+        self.stats['evicted'] += 1
+        self._remove_file(url)
+
+    def _path(self, url):
+        digest = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, digest + '.json')
+
+    def _load(self, url):
+        if self.cache_dir is None:
+            return None
+        try:
+            with open(self._path(url)) as f:
+                entry = json.load(f)
+        except (IOError, ValueError):
+            return None
+        if entry.get('url') != url:
+            return None
+        return entry
+
+    def _save(self, url, entry):
+        if self.cache_dir is None:
+            return
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir)
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entry, f)
+            os.rename(tmp_path, self._path(url))
+        except (IOError, OSError) as ex:
+            logger.warning(_('Failed to store cached template %(url)s: '
+                             '%(ex)s') % {'url': url, 'ex': str(ex)})
+
+    def _remove_file(self, url):
+        if self.cache_dir is None:
+            return
+        try:
+            os.unlink(self._path(url))
+        except OSError:
+            pass
@@ -67,6 +67,18 @@ def resource_data_set(resource, key, value, redact=False):
     return IMPL.resource_data_set(resource, key, value, redact=redact)
 
 
+def resource_data_set_all(resource, data, redact=False):
+    return IMPL.resource_data_set_all(resource, data, redact=redact)
+
+
+def resource_data_decrypt(data):
+    return IMPL.resource_data_decrypt(data)
+
+
+def resource_data_get_all_by_resource(context, resource_id):
+    return IMPL.resource_data_get_all_by_resource(context, resource_id)
+
+
 def resource_data_get_by_key(context, resource_id, key):
     return IMPL.resource_data_get_by_key(context, resource_id, key)
 
@@ -80,6 +92,14 @@ def resource_get(context, resource_id):
     return IMPL.resource_get(context, resource_id)
 
 
+def resource_metadata_version(context, resource_id):
+    return IMPL.resource_metadata_version(context, resource_id)
+
+
+def resource_metadata_set(context, resource_id, metadata):
+    return IMPL.resource_metadata_set(context, resource_id, metadata)
+
+
 def resource_get_all(context):
     return IMPL.resource_get_all(context)
 
@@ -131,9 +151,11 @@ def stack_get_all_by_owner_id(context, owner_id):
 
 
 def stack_get_all_by_tenant(context, limit=None, sort_keys=None,
-                            marker=None, sort_dir=None, filters=None):
+                            marker=None, sort_dir=None, filters=None,
+                            load_parameters=True):
     return IMPL.stack_get_all_by_tenant(context, limit, sort_keys,
-                                        marker, sort_dir, filters)
+                                        marker, sort_dir, filters,
+                                        load_parameters)
 
 
 def stack_count_all_by_tenant(context, filters=None):
@@ -152,6 +174,10 @@ def stack_delete(context, stack_id):
     return IMPL.stack_delete(context, stack_id)
 
 
+def stack_lock_get_engine_id(stack_id):
+    return IMPL.stack_lock_get_engine_id(stack_id)
+
+
 def stack_lock_create(stack_id, engine_id):
     return IMPL.stack_lock_create(stack_id, engine_id)
 
@@ -180,12 +206,20 @@ def event_get_all(context):
     return IMPL.event_get_all(context)
 
 
-def event_get_all_by_tenant(context):
-    return IMPL.event_get_all_by_tenant(context)
+def event_get_all_by_tenant(context, limit=None, marker=None,
+                            sort_keys=None, sort_dir=None, filters=None,
+                            load_properties=True):
+    return IMPL.event_get_all_by_tenant(context, limit, marker, sort_keys,
+                                        sort_dir, filters,
+                                        load_properties=load_properties)
 
 
-def event_get_all_by_stack(context, stack_id):
-    return IMPL.event_get_all_by_stack(context, stack_id)
+def event_get_all_by_stack(context, stack_id, limit=None, marker=None,
+                           sort_keys=None, sort_dir=None, filters=None,
+                           load_properties=True):
+    return IMPL.event_get_all_by_stack(context, stack_id, limit, marker,
+                                       sort_keys, sort_dir, filters,
+                                       load_properties=load_properties)
 
 
 def event_count_all_by_stack(context, stack_id):
@@ -196,6 +230,10 @@ def event_create(context, values):
     return IMPL.event_create(context, values)
 
 
+def event_create_batch(context, values_list):
+    return IMPL.event_create_batch(context, values_list)
+
+
 def watch_rule_get(context, watch_rule_id):
     return IMPL.watch_rule_get(context, watch_rule_id)
 
@@ -14,12 +14,14 @@
 #    under the License.
 
 '''Implementation of SQLAlchemy backend.'''
+import collections
 import sys
 from datetime import datetime
 from datetime import timedelta
 
 from oslo.config import cfg
 import sqlalchemy
+from sqlalchemy import orm
 from sqlalchemy.orm.session import Session
 
 cfg.CONF.import_opt('max_events_per_stack', 'heat.common.config')
@@ -98,6 +100,26 @@ def resource_get(context, resource_id):
     return result
 
 
+def resource_metadata_version(context, resource_id):
+    result = model_query(context, models.Resource.metadata_version).\
+        filter(models.Resource.id == resource_id).first()
+
+    if result is None:
+        raise exception.NotFound(_("resource with id %s not found") %
+                                 resource_id)
+
+    return result[0]
+
+
+def resource_metadata_set(context, resource_id, metadata):
+    rs = resource_get(context, resource_id)
+    # Increment the version in the database, so that concurrent updates
+    # from other engines each get a new version
+    rs.update_and_save({'rsrc_metadata': metadata,
+                        'metadata_version':
+                        models.Resource.metadata_version + 1})
+
+
 def resource_get_by_name_and_stack(context, resource_name, stack_id):
     result = model_query(context, models.Resource).\
         filter_by(name=resource_name).\
@@ -156,9 +178,7 @@ def resource_data_get(resource, key):
     result = resource_data_get_by_key(resource.context,
                                       resource.id,
                                       key)
-    if result.redact:
-        return _decrypt(result.value, result.decrypt_method)
-    return result.value
+    return resource_data_decrypt(result)
 
 
 def _encrypt(value):
@@ -177,6 +197,21 @@ def _decrypt(enc_value, method):
         return unicode(value, 'utf-8')
 
 
+def resource_data_decrypt(data):
+    """Return the value of a resource_data row, decrypting it if necessary."""
+    if data.redact:
+        return _decrypt(data.value, data.decrypt_method)
+    return data.value
+
+
+def resource_data_get_all_by_resource(context, resource_id):
+    """Looks up all of the resource_data rows for a resource in a single
+    query. Does not unencrypt resource_data.
+    """
+    return (model_query(context, models.ResourceData)
+            .filter_by(resource_id=resource_id).all())
+
+
 def resource_data_get_by_key(context, resource_id, key):
     """Looks up resource_data by resource_id and key. Does not unencrypt
     resource_data.
@@ -209,6 +244,35 @@ def resource_data_set(resource, key, value, redact=False):
     return current
 
 
+def resource_data_set_all(resource, data, redact=False):
+    """Save a dict of resource's key/value pairs to database in a single
+    transaction.
+    """
+    session = _session(resource.context)
+    with session.begin(subtransactions=True):
+        existing = {}
+        if data:
+            existing = dict((d.key, d) for d in
+                            session.query(models.ResourceData).
+                            filter_by(resource_id=resource.id).
+                            filter(models.ResourceData.key.in_(data.keys())))
+        results = {}
+        for key, value in data.items():
+            current = existing.get(key)
+            if current is None:
+                current = models.ResourceData()
+                current.key = key
+                current.resource_id = resource.id
+                session.add(current)
+            if redact:
+                current.decrypt_method, current.value = _encrypt(value)
+            else:
+                current.decrypt_method, current.value = '', value
+            current.redact = redact
+            results[key] = current
+    return results
+
+
 def resource_exchange_stacks(context, resource_id1, resource_id2):
     query = model_query(context, models.Resource)
     session = query.session
@@ -236,7 +300,8 @@ def resource_create(context, values):
 
 def resource_get_all_by_stack(context, stack_id):
     results = model_query(context, models.Resource).\
-        filter_by(stack_id=stack_id).all()
+        filter_by(stack_id=stack_id).\
+        options(orm.joinedload('data')).all()
 
     if not results:
         raise exception.NotFound(_("no resources for stack_id %s were found")
@@ -343,8 +408,10 @@ def stack_get_all(context, limit=None, sort_keys=None, marker=None,
 
 
 def stack_get_all_by_tenant(context, limit=None, sort_keys=None, marker=None,
-                            sort_dir=None, filters=None):
+                            sort_dir=None, filters=None, load_parameters=True):
     query = _query_stack_get_all_by_tenant(context)
+    if not load_parameters:
+        query = query.options(orm.defer('parameters'))
     return _filter_and_page_query(context, query, limit, sort_keys,
                                   marker, sort_dir, filters).all()
 
@@ -409,6 +476,14 @@ def stack_delete(context, stack_id):
     session.flush()
 
 
+def stack_lock_get_engine_id(stack_id):
+    session = get_session()
+    with session.begin():
+        lock = session.query(models.StackLock).get(stack_id)
+        if lock is not None:
+            return lock.engine_id
+
+
 def stack_lock_create(stack_id, engine_id):
     session = get_session()
     with session.begin():
@@ -486,25 +561,55 @@ def event_get_all(context):
     return results
 
 
-def event_get_all_by_tenant(context):
-    stacks = soft_delete_aware_query(context, models.Stack).\
-        filter_by(tenant=context.tenant_id).all()
-    results = []
-    for stack in stacks:
-        results.extend(model_query(context, models.Event).
-                       filter_by(stack_id=stack.id).all())
+def _events_query(context, load_properties=True):
+    query = model_query(context, models.Event)
+    if not load_properties:
+        query = query.options(orm.defer('resource_properties'))
+    return query
 
-    return results
 
+def _events_filter_and_page_query(context, query, limit=None, marker=None,
+                                  sort_keys=None, sort_dir=None,
+                                  filters=None):
+    allowed_sort_keys = [models.Event.created_at.key,
+                         models.Event.resource_name.key,
+                         models.Event.resource_type.key,
+                         models.Event.resource_action.key,
+                         models.Event.resource_status.key]
+    whitelisted_sort_keys = _filter_sort_keys(sort_keys, allowed_sort_keys)
+    if not whitelisted_sort_keys:
+        # Unlike stacks, events are listed oldest first by default
+        whitelisted_sort_keys = [models.Event.created_at.key]
+        sort_dir = sort_dir or 'asc'
 
-def _query_all_by_stack(context, stack_id):
-    query = model_query(context, models.Event).\
+    query = db_filters.exact_filter(query, models.Event, filters)
+    return _paginate_query(context, query, models.Event, limit,
+                           whitelisted_sort_keys, marker, sort_dir)
+
+
+def event_get_all_by_tenant(context, limit=None, marker=None,
+                            sort_keys=None, sort_dir=None, filters=None,
+                            load_properties=True):
+    stack_ids = soft_delete_aware_query(context, models.Stack.id).\
+        filter_by(tenant=context.tenant_id).subquery()
+    query = _events_query(context, load_properties).\
+        filter(models.Event.stack_id.in_(stack_ids))
+    return _events_filter_and_page_query(context, query, limit, marker,
+                                         sort_keys, sort_dir, filters).all()
+
+
+def _query_all_by_stack(context, stack_id, load_properties=True):
+    query = _events_query(context, load_properties).\
         filter_by(stack_id=stack_id)
     return query
 
 
-def event_get_all_by_stack(context, stack_id):
-    return _query_all_by_stack(context, stack_id).all()
+def event_get_all_by_stack(context, stack_id, limit=None, marker=None,
+                           sort_keys=None, sort_dir=None, filters=None,
+                           load_properties=True):
+    query = _query_all_by_stack(context, stack_id, load_properties)
+    return _events_filter_and_page_query(context, query, limit, marker,
+                                         sort_keys, sort_dir, filters).all()
 
 
 def event_count_all_by_stack(context, stack_id):
@@ -546,6 +651,32 @@ def event_create(context, values):
     return event_ref
 
 
+def event_create_batch(context, values_list):
+    '''
+    Create a number of events with a single multi-row insert. Every event must
+    supply values for the same set of columns.
+    '''
+    if not values_list:
+        return
+
+    if cfg.CONF.max_events_per_stack:
+        new_events = collections.defaultdict(int)
+        for values in values_list:
+            new_events[values['stack_id']] += 1
+        for stack_id, count in new_events.items():
+            excess = (event_count_all_by_stack(context, stack_id) + count -
+                      cfg.CONF.max_events_per_stack)
+            if excess > 0:
+                # prune
+                _delete_event_rows(context, stack_id,
+                                   max(excess,
+                                       cfg.CONF.event_purge_batch_size))
+
+    session = _session(context)
+    with session.begin():
+        session.execute(models.Event.__table__.insert(), values_list)
+
+
 def watch_rule_get(context, watch_rule_id):
     result = model_query(context, models.WatchRule).get(watch_rule_id)
     return result
@@ -695,7 +826,26 @@ def software_deployment_delete(context, deployment_id):
     session.flush()
 
 
-def purge_deleted(age, granularity='days'):
+def _purge_rows(engine, table, where, batch_size, key=None):
+    '''
+    Delete the rows of a table matching a condition, committing after every
+    batch_size rows. Returns the number of rows deleted.
+    '''
+    key = key if key is not None else table.c.id
+    deleted = 0
+    while True:
+        with engine.begin() as conn:
+            # MySQL does not support LIMIT in subqueries, so we must
+            # manually supply the IN() values.
+            ids = [r[0] for r in conn.execute(
+                sqlalchemy.select([key]).where(where).limit(batch_size))]
+            if not ids:
+                return deleted
+            result = conn.execute(table.delete().where(key.in_(ids)))
+            deleted += result.rowcount
+
+
+def purge_deleted(age, granularity='days', batch_size=1000):
     try:
         age = int(age)
     except ValueError:
@@ -707,6 +857,13 @@ def purge_deleted(age, granularity='days'):
         raise exception.Error(
             _("granularity should be days, hours, minutes, or seconds"))
 
+    try:
+        batch_size = int(batch_size)
+    except ValueError:
+        raise exception.Error(_("batch_size should be an integer"))
+    if batch_size <= 0:
+        raise exception.Error(_("batch_size should be a positive integer"))
+
     if granularity == 'days':
         age = age * 86400
     elif granularity == 'hours':
@@ -720,26 +877,76 @@ def purge_deleted(age, granularity='days'):
     meta.bind = engine
 
     stack = sqlalchemy.Table('stack', meta, autoload=True)
+    stack_lock = sqlalchemy.Table('stack_lock', meta, autoload=True)
     event = sqlalchemy.Table('event', meta, autoload=True)
+    resource = sqlalchemy.Table('resource', meta, autoload=True)
+    resource_data = sqlalchemy.Table('resource_data', meta, autoload=True)
+    watch_rule = sqlalchemy.Table('watch_rule', meta, autoload=True)
+    watch_data = sqlalchemy.Table('watch_data', meta, autoload=True)
     raw_template = sqlalchemy.Table('raw_template', meta, autoload=True)
     user_creds = sqlalchemy.Table('user_creds', meta, autoload=True)
 
-    stmt = sqlalchemy.select([stack.c.id,
-                              stack.c.raw_template_id,
-                              stack.c.user_creds_id]).\
-        where(stack.c.deleted_at < time_line)
-    deleted_stacks = engine.execute(stmt)
-
-    for s in deleted_stacks:
-        event_del = event.delete().where(event.c.stack_id == s[0])
-        engine.execute(event_del)
-        stack_del = stack.delete().where(stack.c.id == s[0])
-        engine.execute(stack_del)
-        raw_template_del = raw_template.delete().\
-            where(raw_template.c.id == s[1])
-        engine.execute(raw_template_del)
-        user_creds_del = user_creds.delete().where(user_creds.c.id == s[2])
-        engine.execute(user_creds_del)
+    purged = collections.defaultdict(int)
+
+    # Each batch of stacks is removed together with everything referring to
+    # it, in transactions of at most batch_size rows of each table. The stack
+    # rows go last, so an interrupted purge is picked up again by the next
+    # run.
+    while True:
+        stmt = sqlalchemy.select([stack.c.id,
+                                  stack.c.raw_template_id,
+                                  stack.c.user_creds_id]).\
+            where(stack.c.deleted_at < time_line).limit(batch_size)
+        deleted_stacks = engine.execute(stmt).fetchall()
+        if not deleted_stacks:
+            break
+
+        stack_ids = [s[0] for s in deleted_stacks]
+        template_ids = set(s[1] for s in deleted_stacks)
+        creds_ids = set(s[2] for s in deleted_stacks if s[2] is not None)
+
+        resource_ids = sqlalchemy.select([resource.c.id]).\
+            where(resource.c.stack_id.in_(stack_ids))
+        watch_rule_ids = sqlalchemy.select([watch_rule.c.id]).\
+            where(watch_rule.c.stack_id.in_(stack_ids))
+
+        for table, where, key in (
+                (resource_data,
+                 resource_data.c.resource_id.in_(resource_ids), None),
+                (resource, resource.c.stack_id.in_(stack_ids), None),
+                (event, event.c.stack_id.in_(stack_ids), None),
+                (watch_data,
+                 watch_data.c.watch_rule_id.in_(watch_rule_ids), None),
+                (watch_rule, watch_rule.c.stack_id.in_(stack_ids), None),
+                (stack_lock, stack_lock.c.stack_id.in_(stack_ids),
+                 stack_lock.c.stack_id)):
+            purged[table.name] += _purge_rows(engine, table, where,
+                                              batch_size, key)
+
+        # The stacks are removed in the same transaction as their templates
+        # and credentials, so that an interrupted purge cannot leave those
+        # behind with nothing referring to them. Templates and credentials
+        # may be shared with a stack that has not been deleted (e.g. the
+        # backup stack during an update), so those are kept.
+        with engine.begin() as conn:
+            purged[stack.name] += conn.execute(
+                stack.delete().where(stack.c.id.in_(stack_ids))).rowcount
+
+            live_templates = sqlalchemy.select([stack.c.raw_template_id])
+            purged[raw_template.name] += conn.execute(
+                raw_template.delete().where(sqlalchemy.and_(
+                    raw_template.c.id.in_(template_ids),
+                    ~raw_template.c.id.in_(live_templates)))).rowcount
+
+            if creds_ids:
+                live_creds = sqlalchemy.select([stack.c.user_creds_id]).\
+                    where(stack.c.user_creds_id != None)  # noqa
+                purged[user_creds.name] += conn.execute(
+                    user_creds.delete().where(sqlalchemy.and_(
+                        user_creds.c.id.in_(creds_ids),
+                        ~user_creds.c.id.in_(live_creds)))).rowcount
+
+    return dict(purged)
 
 
 def db_sync(version=None):
@@ -0,0 +1,85 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import cPickle as pickle
+import json
+
+import sqlalchemy
+
+from heat.db.sqlalchemy.types import LongText
+
+
+# Number of events converted in each statement
+BATCH_SIZE = 1000
+
+
+def _convert_properties(migrate_engine, event, new_column, convert):
+    update = event.update().where(
+        event.c.id == sqlalchemy.bindparam('event_id')).values(
+            {new_column.name: sqlalchemy.bindparam('new_value',
+                                                   type_=new_column.type)})
+
+    last_id = None
+    while True:
+        query = sqlalchemy.select([event.c.id,
+                                   event.c.resource_properties]).\
+            order_by(event.c.id).limit(BATCH_SIZE)
+        if last_id is not None:
+            query = query.where(event.c.id > last_id)
+        rows = migrate_engine.execute(query).fetchall()
+        if not rows:
+            break
+
+        migrate_engine.execute(update, [{'event_id': event_id,
+                                         'new_value': convert(properties)}
+                                        for event_id, properties in rows])
+        last_id = rows[-1][0]
+
+
+def _replace_column(event, new_column):
+    event.c.resource_properties.drop()
+    new_column.alter(name='resource_properties')
+
+
+def upgrade(migrate_engine):
+    meta = sqlalchemy.MetaData(bind=migrate_engine)
+
+    event = sqlalchemy.Table('event', meta, autoload=True)
+    props_json = sqlalchemy.Column('resource_properties_json', LongText)
+    props_json.create(event)
+
+    def to_json(data):
+        try:
+            properties = pickle.loads(str(data)) if data is not None else {}
+        except Exception as ex:
+            properties = {'Error': str(ex)}
+        return json.dumps(properties, default=str)
+
+    _convert_properties(migrate_engine, event, props_json, to_json)
+    _replace_column(event, props_json)
+
+
+def downgrade(migrate_engine):
+    meta = sqlalchemy.MetaData(bind=migrate_engine)
+
+    event = sqlalchemy.Table('event', meta, autoload=True)
+    props_pickle = sqlalchemy.Column('resource_properties_pickle',
+                                     sqlalchemy.PickleType)
+    props_pickle.create(event)
+
+    def from_json(data):
+        return json.loads(data) if data is not None else {}
+
+    _convert_properties(migrate_engine, event, props_pickle, from_json)
+    _replace_column(event, props_pickle)
@@ -0,0 +1,71 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import json
+
+import sqlalchemy
+
+
+# Number of stacks updated in each statement
+BATCH_SIZE = 1000
+
+
+def _template_description(data):
+    try:
+        template = json.loads(data) if data is not None else {}
+    except ValueError:
+        template = {}
+
+    if 'heat_template_version' in template:
+        key = 'description'
+    else:
+        key = 'Description'
+    return template.get(key, 'No description')
+
+
+def upgrade(migrate_engine):
+    meta = sqlalchemy.MetaData(bind=migrate_engine)
+
+    stack = sqlalchemy.Table('stack', meta, autoload=True)
+    raw_template = sqlalchemy.Table('raw_template', meta, autoload=True)
+    description = sqlalchemy.Column('description', sqlalchemy.Text)
+    description.create(stack)
+
+    update = stack.update().where(
+        stack.c.id == sqlalchemy.bindparam('stack_id')).values(
+            description=sqlalchemy.bindparam('new_value'))
+
+    last_id = None
+    while True:
+        query = sqlalchemy.select([stack.c.id, raw_template.c.template]).\
+            where(stack.c.raw_template_id == raw_template.c.id).\
+            order_by(stack.c.id).limit(BATCH_SIZE)
+        if last_id is not None:
+            query = query.where(stack.c.id > last_id)
+        rows = migrate_engine.execute(query).fetchall()
+        if not rows:
+            break
+
+        migrate_engine.execute(update,
+                               [{'stack_id': stack_id,
+                                 'new_value': _template_description(data)}
+                                for stack_id, data in rows])
+        last_id = rows[-1][0]
+
+
+def downgrade(migrate_engine):
+    meta = sqlalchemy.MetaData(bind=migrate_engine)
+
+    stack = sqlalchemy.Table('stack', meta, autoload=True)
+    stack.c.description.drop()
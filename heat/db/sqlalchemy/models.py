@@ -97,6 +97,7 @@ class Stack(BASE, HeatBase, SoftDelete):
     id = sqlalchemy.Column(sqlalchemy.String(36), primary_key=True,
                            default=lambda: str(uuid.uuid4()))
     name = sqlalchemy.Column(sqlalchemy.String(255))
+    description = sqlalchemy.Column(sqlalchemy.Text)
     raw_template_id = sqlalchemy.Column(
         sqlalchemy.Integer,
         sqlalchemy.ForeignKey('raw_template.id'),
@@ -166,7 +167,7 @@ class Event(BASE, HeatBase):
     physical_resource_id = sqlalchemy.Column(sqlalchemy.String(255))
     resource_status_reason = sqlalchemy.Column(sqlalchemy.String(255))
     resource_type = sqlalchemy.Column(sqlalchemy.String(255))
-    resource_properties = sqlalchemy.Column(sqlalchemy.PickleType)
+    resource_properties = sqlalchemy.Column(Json)
 
 
 class ResourceData(BASE, HeatBase):
@@ -203,6 +204,9 @@ class Resource(BASE, HeatBase):
     status_reason = sqlalchemy.Column('status_reason', sqlalchemy.String(255))
     # odd name as "metadata" is reserved
     rsrc_metadata = sqlalchemy.Column('rsrc_metadata', Json)
+    # incremented whenever rsrc_metadata is changed
+    metadata_version = sqlalchemy.Column(sqlalchemy.Integer, default=0,
+                                         server_default='0')
 
     stack_id = sqlalchemy.Column(sqlalchemy.String(36),
                                  sqlalchemy.ForeignKey('stack.id'),
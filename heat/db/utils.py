@@ -45,5 +45,5 @@ IMPL = LazyPluggable('db_backend',
                      sqlalchemy='heat.db.sqlalchemy.api')
 
 
-def purge_deleted(age, granularity='days'):
-    IMPL.purge_deleted(age, granularity)
+def purge_deleted(age, granularity='days', batch_size=1000):
+    return IMPL.purge_deleted(age, granularity, batch_size)
@@ -12,6 +12,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from heat.common import identifier
 from heat.rpc import api
 from heat.openstack.common import timeutils
 from heat.engine import constraints as constr
@@ -99,6 +100,31 @@ def format_stack(stack):
     return info
 
 
+def format_stack_summary(db_stack):
+    '''
+    Return a summary representation of a stack, built directly from its
+    database row without loading the Stack or its template.
+    '''
+    stack_identity = identifier.HeatIdentifier(db_stack.tenant,
+                                               db_stack.name,
+                                               db_stack.id)
+    description = db_stack.description
+
+    return {
+        api.STACK_NAME: db_stack.name,
+        api.STACK_ID: dict(stack_identity),
+        api.STACK_CREATION_TIME: timeutils.isotime(db_stack.created_at),
+        api.STACK_UPDATED_TIME: timeutils.isotime(db_stack.updated_at),
+        api.STACK_DESCRIPTION: description,
+        api.STACK_TMPL_DESCRIPTION: description,
+        api.STACK_ACTION: db_stack.action or '',
+        api.STACK_STATUS: db_stack.status or '',
+        api.STACK_STATUS_DATA: db_stack.status_reason,
+        api.STACK_DISABLE_ROLLBACK: db_stack.disable_rollback,
+        api.STACK_TIMEOUT: db_stack.timeout,
+    }
+
+
 def format_stack_resource(resource, detail=True):
     '''
     Return a representation of the given resource that matches the API output
@@ -131,11 +157,12 @@ def format_stack_resource(resource, detail=True):
     return res
 
 
-def format_event(event):
-    stack_identifier = event.stack.identifier()
+def format_event(event, stack_identifier=None):
+    if stack_identifier is None:
+        stack_identifier = event.stack.identifier()
 
     result = {
-        api.EVENT_ID: dict(event.identifier()),
+        api.EVENT_ID: dict(event.identifier(stack_identifier)),
         api.EVENT_STACK_ID: dict(stack_identifier),
         api.EVENT_STACK_NAME: stack_identifier.stack_name,
         api.EVENT_TIMESTAMP: timeutils.isotime(event.timestamp),
@@ -145,7 +172,8 @@ def format_event(event):
         api.EVENT_RES_STATUS: event.status,
         api.EVENT_RES_STATUS_DATA: event.reason,
         api.EVENT_RES_TYPE: event.resource_type,
-        api.EVENT_RES_PROPERTIES: event.resource_properties,
+        # The properties are empty if they were not loaded
+        api.EVENT_RES_PROPERTIES: event.resource_properties or {},
     }
 
     return result
@@ -146,16 +146,21 @@ class Graph(collections.defaultdict):
 
         This is a destructive operation for the graph.
         '''
-        for iteration in xrange(len(graph)):
-            for key, node in graph.iteritems():
-                if not node:
-                    yield key
-                    del graph[key]
-                    break
-            else:
-                # There are nodes remaining, but none without
-                # dependencies: a cycle
-                raise CircularDependencyException(cycle=str(graph))
+        ready = collections.deque(key for key, node in graph.iteritems()
+                                  if not node)
+        while ready:
+            key = ready.popleft()
+            requirers = list(graph[key].required_by())
+            yield key
+            del graph[key]
+            for rqr in requirers:
+                if not graph[rqr]:
+                    ready.append(rqr)
+
+        if graph:
+            # There are nodes remaining, but none without
+            # dependencies: a cycle
+            raise CircularDependencyException(cycle=str(graph))
 
 
 class Dependencies(object):
@@ -200,23 +205,21 @@ class Dependencies(object):
         if last not in self._graph:
             raise KeyError
 
-        def get_edges(key):
-            def requirer_edges(rqr):
-                # Concatenate the dependency on the current node with the
-                # recursive generated list
-                return itertools.chain([(rqr, key)], get_edges(rqr))
-
-            # Get the edge list for each node that requires the current node
-            edge_lists = itertools.imap(requirer_edges,
-                                        self._graph[key].required_by())
-            # Combine the lists into one long list
-            return itertools.chain.from_iterable(edge_lists)
-
         if self._graph[last].stem():
             # Nothing requires this, so just add the node itself
             edges = [(last, None)]
         else:
-            edges = get_edges(last)
+            # Visit each node that (transitively) requires this one only once
+            edges = []
+            visited = set([last])
+            to_visit = collections.deque([last])
+            while to_visit:
+                key = to_visit.popleft()
+                for rqr in self._graph[key].required_by():
+                    edges.append((rqr, key))
+                    if rqr not in visited:
+                        visited.add(rqr)
+                        to_visit.append(rqr)
 
         return Dependencies(edges)
 
@@ -231,6 +234,17 @@ class Dependencies(object):
         edge_reprs = (repr(e) for e in self._graph.edges())
         return 'Dependencies([%s])' % ', '.join(edge_reprs)
 
+    def edges(self, reverse=False):
+        '''
+        Return an iterator over the edges of the dependency graph, optionally
+        with their directions reversed, without copying the graph.
+        '''
+        if not reverse:
+            return self._graph.edges()
+
+        return ((rqd, rqr) if rqd is not None else (rqr, None)
+                for rqr, rqd in self._graph.edges())
+
     def graph(self, reverse=False):
         '''Return a copy of the underlying dependency graph.'''
         if reverse:
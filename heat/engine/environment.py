@@ -317,8 +317,8 @@ class ResourceRegistry(object):
                 if is_plugin(name) and status_matches(cls)]
 
 
-SECTIONS = (PARAMETERS, RESOURCE_REGISTRY) = \
-           ('parameters', 'resource_registry')
+SECTIONS = (PARAMETERS, RESOURCE_REGISTRY, ENGINE_OPTIONS) = \
+           ('parameters', 'resource_registry', 'engine_options')
 
 
 class Environment(object):
@@ -341,21 +341,26 @@ class Environment(object):
 
         self.registry = ResourceRegistry(global_registry)
         self.registry.load(env.get(RESOURCE_REGISTRY, {}))
+        self.engine_options = dict(env.get(ENGINE_OPTIONS, {}))
 
         if 'parameters' in env:
             self.params = env['parameters']
         else:
             self.params = dict((k, v) for (k, v) in env.iteritems()
-                               if k != RESOURCE_REGISTRY)
+                               if k not in (RESOURCE_REGISTRY, ENGINE_OPTIONS))
 
     def load(self, env_snippet):
         self.registry.load(env_snippet.get(RESOURCE_REGISTRY, {}))
         self.params.update(env_snippet.get('parameters', {}))
+        self.engine_options.update(env_snippet.get(ENGINE_OPTIONS, {}))
 
     def user_env_as_dict(self):
         """Get the environment as a dict, ready for storing in the db."""
-        return {RESOURCE_REGISTRY: self.registry.as_dict(),
-                PARAMETERS: self.params}
+        env = {RESOURCE_REGISTRY: self.registry.as_dict(),
+               PARAMETERS: self.params}
+        if self.engine_options:
+            env[ENGINE_OPTIONS] = self.engine_options
+        return env
 
     def register_class(self, resource_type, resource_class):
         self.registry.register_class(resource_type, resource_class)
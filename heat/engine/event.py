@@ -13,66 +13,162 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import eventlet
+from eventlet import semaphore
+from oslo.config import cfg
+
 from heat.db import api as db_api
 from heat.common import exception
 from heat.common import identifier
 from heat.openstack.common import log as logging
 from heat.openstack.common.gettextutils import _
+from heat.openstack.common import timeutils
+from heat.openstack.common import uuidutils
+
+cfg.CONF.import_opt('event_batch_size', 'heat.common.config')
+cfg.CONF.import_opt('event_batch_interval', 'heat.common.config')
 
 logger = logging.getLogger(__name__)
 
 
+class EventJournal(object):
+    '''
+    A write-behind buffer for events, which writes them to the database in
+    batches rather than one at a time.
+
+    Buffered events are written when the buffer holds
+    cfg.CONF.event_batch_size events, when cfg.CONF.event_batch_interval
+    seconds have passed since the first of them was added, or when flush()
+    is called. The events for each stack are written in the order in which
+    they were added.
+    '''
+
+    def __init__(self):
+        self._events = []
+        self._timer = None
+        self._lock = semaphore.Semaphore()
+
+    def __len__(self):
+        return len(self._events)
+
+    def add(self, context, values):
+        '''Add the database representation of an event to the buffer.'''
+        self._events.append((context, values))
+
+        if len(self._events) >= cfg.CONF.event_batch_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = eventlet.spawn_after(cfg.CONF.event_batch_interval,
+                                               self._flush_timer)
+
+    def _flush_timer(self):
+        # Timers are not cancelled when the buffer is flushed early, so ignore
+        # any that have been superseded
+        if eventlet.getcurrent() is self._timer:
+            self._timer = None
+            self.flush()
+
+    def flush(self):
+        '''Write all of the buffered events to the database.'''
+        with self._lock:
+            events, self._events = self._events, []
+            self._timer = None
+
+            # Write the batches in the order their stacks were first seen
+            stack_ids = []
+            batches = {}
+            for context, values in events:
+                stack_id = values['stack_id']
+                if stack_id not in batches:
+                    stack_ids.append(stack_id)
+                    batches[stack_id] = (context, [])
+                batches[stack_id][1].append(values)
+
+            for stack_id in stack_ids:
+                context, values_list = batches[stack_id]
+                try:
+                    db_api.event_create_batch(context, values_list)
+                except Exception as ex:
+                    logger.error(_('DB error %s') % str(ex))
+
+
+_journal = EventJournal()
+
+
+def flush():
+    '''Write any events buffered in this engine to the database.'''
+    if len(_journal):
+        _journal.flush()
+
+
 class Event(object):
     '''Class representing a Resource state change.'''
 
     def __init__(self, context, stack, action, status, reason,
                  physical_resource_id, resource_properties, resource_name,
-                 resource_type, timestamp=None, id=None):
+                 resource_type, timestamp=None, id=None, stack_id=None):
         '''
         Initialise from a context, stack, and event information. The timestamp
         and database ID may also be initialised if the event is already in the
-        database.
+        database. The resource properties may be None if they have not been
+        loaded from the database. If only the stack ID is given, the stack is
+        loaded when it is first accessed.
         '''
         self.context = context
-        self.stack = stack
+        self._stack = stack
+        self.stack_id = stack.id if stack is not None else stack_id
         self.action = action
         self.status = status
         self.reason = reason
         self.physical_resource_id = physical_resource_id
         self.resource_name = resource_name
         self.resource_type = resource_type
-        try:
-            self.resource_properties = dict(resource_properties)
-        except ValueError as ex:
-            self.resource_properties = {'Error': str(ex)}
+        if resource_properties is None:
+            self.resource_properties = None
+        else:
+            try:
+                self.resource_properties = dict(resource_properties)
+            except ValueError as ex:
+                self.resource_properties = {'Error': str(ex)}
         self.timestamp = timestamp
         self.id = id
 
-    @classmethod
-    def load(cls, context, event_id, event=None, stack=None):
-        '''Retrieve an Event from the database.'''
-        from heat.engine import parser
+    @property
+    def stack(self):
+        if self._stack is None:
+            from heat.engine import parser
+            self._stack = parser.Stack.load(self.context, self.stack_id)
+        return self._stack
 
+    @classmethod
+    def load(cls, context, event_id, event=None, stack=None,
+             load_properties=True):
+        '''
+        Retrieve an Event from the database. If load_properties is False, the
+        resource properties are not loaded. If no stack is given, it is loaded
+        only when required.
+        '''
         ev = event if event is not None else\
             db_api.event_get(context, event_id)
         if ev is None:
             message = _('No event exists with id "%s"') % str(event_id)
             raise exception.NotFound(message)
 
-        st = stack if stack is not None else\
-            parser.Stack.load(context, ev.stack_id)
-
-        return cls(context, st, ev.resource_action, ev.resource_status,
+        return cls(context, stack, ev.resource_action, ev.resource_status,
                    ev.resource_status_reason, ev.physical_resource_id,
-                   ev.resource_properties, ev.resource_name,
-                   ev.resource_type, ev.created_at, ev.id)
+                   ev.resource_properties if load_properties else None,
+                   ev.resource_name,
+                   ev.resource_type, ev.created_at, ev.id, ev.stack_id)
 
     def store(self):
-        '''Store the Event in the database.'''
+        '''
+        Store the Event in the database. Unless batching is disabled, the
+        event is buffered and written later in a batch with others.
+        '''
         ev = {
             'resource_name': self.resource_name,
             'physical_resource_id': self.physical_resource_id,
-            'stack_id': self.stack.id,
+            'stack_id': self.stack_id,
             'resource_action': self.action,
             'resource_status': self.status,
             'resource_status_reason': self.reason,
@@ -80,22 +176,37 @@ class Event(object):
             'resource_properties': self.resource_properties,
         }
 
-        if self.timestamp is not None:
-            ev['created_at'] = self.timestamp
-
         if self.id is not None:
             logger.warning(_('Duplicating event'))
 
+        if cfg.CONF.event_batch_size:
+            if self.timestamp is None:
+                self.timestamp = timeutils.utcnow()
+            self.id = uuidutils.generate_uuid()
+            ev['created_at'] = self.timestamp
+            ev['id'] = self.id
+            _journal.add(self.context, ev)
+            return self.id
+
+        if self.timestamp is not None:
+            ev['created_at'] = self.timestamp
+
         new_ev = db_api.event_create(self.context, ev)
         self.id = new_ev.id
         return self.id
 
-    def identifier(self):
-        '''Return a unique identifier for the event.'''
+    def identifier(self, stack_identifier=None):
+        '''
+        Return a unique identifier for the event. The identifier of the stack
+        may be supplied to avoid having to load the stack.
+        '''
         if self.id is None:
             return None
 
+        if stack_identifier is None:
+            stack_identifier = self.stack.identifier()
+
         res_id = identifier.ResourceIdentifier(
-            resource_name=self.resource_name, **self.stack.identifier())
+            resource_name=self.resource_name, **stack_identifier)
 
         return identifier.EventIdentifier(event_id=str(self.id), **res_id)
@@ -82,10 +82,14 @@ class HOTemplate(template.Template):
         # This is a shortcut for now and might be changed in the future.
 
         if section == self.RESOURCES:
-            return self._translate_resources(the_section)
+            if section not in self._parsed:
+                self._parsed[section] = self._translate_resources(the_section)
+            return self._parsed[section]
 
         if section == self.OUTPUTS:
-            return self._translate_outputs(the_section)
+            if section not in self._parsed:
+                self._parsed[section] = self._translate_outputs(the_section)
+            return self._parsed[section]
 
         return the_section
 
@@ -149,7 +153,7 @@ class HOTemplate(template.Template):
                 raise exception.UserParameterMissing(key=ref)
 
         return template._resolve(match_param_ref, handle_param_ref, s,
-                                 transform)
+                                 transform, keys=('get_param', 'Ref'))
 
     @staticmethod
     def resolve_resource_refs(s, resources, transform=None):
@@ -163,7 +167,7 @@ class HOTemplate(template.Template):
             return resources[arg].FnGetRefId()
 
         return template._resolve(match_resource_ref, handle_resource_ref, s,
-                                 transform)
+                                 transform, keys=('get_resource', 'Ref'))
 
     @staticmethod
     def resolve_attributes(s, resources, transform=None):
@@ -204,7 +208,7 @@ class HOTemplate(template.Template):
                                                          key=rsrc_attr)
 
         return template._resolve(match_get_attr, handle_get_attr, s,
-                                 transform)
+                                 transform, keys=('get_attr',))
 
     @staticmethod
     def resolve_replace(s, transform=None):
@@ -251,7 +255,8 @@ class HOTemplate(template.Template):
 
         match_str_replace = lambda k, v: k in ['str_replace', 'Fn::Replace']
         return template._resolve(match_str_replace,
-                                 handle_str_replace, s, transform)
+                                 handle_str_replace, s, transform,
+                                 keys=('str_replace', 'Fn::Replace'))
 
     def param_schemata(self):
         params = self.t.get(self.PARAMETERS, {}).iteritems()
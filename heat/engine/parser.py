@@ -16,6 +16,8 @@
 import collections
 import copy
 import functools
+import hashlib
+import json
 import re
 import six
 
@@ -24,6 +26,7 @@ from oslo.config import cfg
 from heat.engine import environment
 from heat.common import exception
 from heat.engine import dependencies
+from heat.engine import event
 from heat.common import identifier
 from heat.engine import resource
 from heat.engine import resources
@@ -31,6 +34,7 @@ from heat.engine import scheduler
 from heat.engine import timestamp
 from heat.engine import update
 from heat.engine.notification import stack as notification
+from heat.engine.template import FunctionTable
 from heat.engine.template import Template
 from heat.engine.clients import Clients
 from heat.db import api as db_api
@@ -41,8 +45,28 @@ from heat.openstack.common import strutils
 
 from heat.common.exception import StackValidationFailed
 
+cfg.CONF.import_opt('max_concurrent_resource_actions', 'heat.common.config')
+cfg.CONF.import_opt('max_concurrent_resource_actions_per_engine',
+                    'heat.common.config')
+
 logger = logging.getLogger(__name__)
 
+MAX_CONCURRENT_RESOURCE_ACTIONS = 'max_concurrent_resource_actions'
+
+# Slots limiting the number of resource actions in progress across all of the
+# stacks in this engine
+_resource_action_slots = scheduler.SlotPool()
+
+
+def resource_action_slots():
+    '''
+    Return the pool of slots shared by all of the stacks in this engine for
+    limiting the number of resource actions in progress at the same time.
+    '''
+    _resource_action_slots.size = \
+        cfg.CONF.max_concurrent_resource_actions_per_engine
+    return _resource_action_slots
+
 
 class Stack(collections.Mapping):
 
@@ -53,12 +77,10 @@ class Stack(collections.Mapping):
     STATUSES = (IN_PROGRESS, FAILED, COMPLETE
                 ) = ('IN_PROGRESS', 'FAILED', 'COMPLETE')
 
-    created_time = timestamp.Timestamp(functools.partial(db_api.stack_get,
-                                                         show_deleted=True),
-                                       'created_at')
-    updated_time = timestamp.Timestamp(functools.partial(db_api.stack_get,
-                                                         show_deleted=True),
-                                       'updated_at')
+    created_time = timestamp.CachedTimestamp(
+        functools.partial(db_api.stack_get, show_deleted=True), 'created_at')
+    updated_time = timestamp.CachedTimestamp(
+        functools.partial(db_api.stack_get, show_deleted=True), 'updated_at')
 
     _zones = None
 
@@ -93,9 +115,12 @@ class Stack(collections.Mapping):
         self.disable_rollback = disable_rollback
         self.parent_resource = parent_resource
         self._resources = None
+        self._db_resources = None
         self._dependencies = None
         self._access_allowed_handlers = {}
         self.adopt_stack_data = adopt_stack_data
+        self._timestamps = {}
+        self._pending_timestamps = {}
 
         resources.initialise()
 
@@ -114,11 +139,47 @@ class Stack(collections.Mapping):
     def resources(self):
         if self._resources is None:
             template_resources = self.t[self.t.RESOURCES]
-            self._resources = dict((name, resource.Resource(name, data, self))
-                                   for (name, data) in
-                                   template_resources.items())
+            # Fetch all of the stored resources in a single query, rather
+            # than one query per resource as each one is initialised
+            self._db_resources = self._db_resources_get()
+            try:
+                self._resources = dict((name,
+                                        resource.Resource(name, data, self))
+                                       for (name, data) in
+                                       template_resources.items())
+            finally:
+                # The rows are only needed while the resources are being
+                # initialised, so don't hold on to stale data afterwards
+                self._db_resources = None
         return self._resources
 
+    def _db_resources_get(self):
+        '''
+        Return a dict of the stored resource rows (including their resource
+        data) for this stack, keyed by resource name.
+        '''
+        if self.id is None:
+            return {}
+        try:
+            db_resources = db_api.resource_get_all_by_stack(self.context,
+                                                            self.id)
+        except exception.NotFound:
+            return {}
+        return dict((r.name, r) for r in db_resources)
+
+    def db_resource_get(self, name):
+        '''
+        Return the stored row for the named resource, or None if the resource
+        has not been stored. Uses the rows fetched in bulk when the stack's
+        resources are being initialised, if available.
+        '''
+        if self.id is None:
+            return None
+        if self._db_resources is not None:
+            return self._db_resources.get(name)
+        return db_api.resource_get_by_name_and_stack(self.context,
+                                                     name, self.id)
+
     @property
     def dependencies(self):
         if self._dependencies is None:
@@ -183,10 +244,12 @@ class Stack(collections.Mapping):
 
         template = Template.load(context, stack.raw_template_id)
         env = environment.Environment(stack.parameters)
+        db_stack = stack
         stack = cls(context, stack.name, template, env,
                     stack.id, stack.action, stack.status, stack.status_reason,
                     stack.timeout, resolve_data, stack.disable_rollback,
                     parent_resource, owner_id=stack.owner_id)
+        stack._cache_timestamps(db_stack)
 
         return stack
 
@@ -199,6 +262,7 @@ class Stack(collections.Mapping):
         s = {
             'name': self._backup_name() if backup else self.name,
             'raw_template_id': self.t.store(self.context),
+            'description': self.t[self.t.DESCRIPTION],
             'parameters': self.env.user_env_as_dict(),
             'owner_id': self.owner_id,
             'username': self.context.username,
@@ -210,7 +274,9 @@ class Stack(collections.Mapping):
             'disable_rollback': self.disable_rollback,
         }
         if self.id:
+            s.update(self._flush_timestamps())
             db_api.stack_update(self.context, self.id, s)
+            self._timestamps.clear()
         else:
             # Create a context containing a trust_id and trustor_user_id
             # if trusts are enabled
@@ -222,11 +288,26 @@ class Stack(collections.Mapping):
             s['user_creds_id'] = new_creds.id
             new_s = db_api.stack_create(self.context, s)
             self.id = new_s.id
+            self._cache_timestamps(new_s)
 
         self._set_param_stackid()
 
         return self.id
 
+    def _cache_timestamps(self, db_stack):
+        '''Cache the timestamps from the database record of the stack.'''
+        self._timestamps = {'created_at': db_stack.created_at,
+                            'updated_at': db_stack.updated_at}
+
+    def _flush_timestamps(self):
+        '''
+        Return the timestamp updates that have not yet been written to the
+        database, and forget them.
+        '''
+        pending = self._pending_timestamps
+        self._pending_timestamps = {}
+        return pending
+
     def _backup_name(self):
         return '%s*' % self.name
 
@@ -319,6 +400,9 @@ class Stack(collections.Mapping):
         '''
         # TODO(sdake) Should return line number of invalid reference
 
+        # Check the concurrency limit from the environment is valid
+        self.max_concurrent_resource_actions()
+
         # Check duplicate names between parameters and resources
         dup_names = set(self.parameters.keys()) & set(self.keys())
 
@@ -365,16 +449,54 @@ class Stack(collections.Mapping):
 
         stack = db_api.stack_get(self.context, self.id)
         if stack is not None:
-            stack.update_and_save({'action': action,
-                                   'status': status,
-                                   'status_reason': reason})
+            values = {'action': action,
+                      'status': status,
+                      'status_reason': reason}
+            values.update(self._flush_timestamps())
+            stack.update_and_save(values)
+            self._cache_timestamps(stack)
             notification.send(self)
 
+        if status != self.IN_PROGRESS:
+            # Write out the events for the completed action
+            event.flush()
+
     @property
     def state(self):
         '''Returns state, tuple of action, status.'''
         return (self.action, self.status)
 
+    def max_concurrent_resource_actions(self):
+        '''
+        Return the maximum number of resource actions that may be in progress
+        at the same time in this stack, or None if there is no limit.
+        '''
+        value = self.env.engine_options.get(
+            MAX_CONCURRENT_RESOURCE_ACTIONS,
+            cfg.CONF.max_concurrent_resource_actions)
+        try:
+            limit = int(value)
+        except (TypeError, ValueError):
+            limit = -1
+        if limit < 0:
+            msg = _('Invalid %(opt)s "%(value)s", must be a non-negative '
+                    'integer') % {'opt': MAX_CONCURRENT_RESOURCE_ACTIONS,
+                                  'value': value}
+            raise StackValidationFailed(message=msg)
+
+        return limit or None
+
+    def resource_action_group(self, dependencies, task, reverse=False):
+        '''
+        Return a DependencyTaskGroup running the given task on each resource,
+        subject to the stack's and the engine's concurrency limits.
+        '''
+        return scheduler.DependencyTaskGroup(
+            dependencies, task, reverse,
+            max_concurrency=self.max_concurrent_resource_actions(),
+            slot_pool=resource_action_slots(),
+            needs_slot=lambda r: r.uses_resource_action_slot)
+
     def timeout_secs(self):
         '''
         Return the stack creation timeout in seconds, or None if no timeout
@@ -430,9 +552,9 @@ class Stack(collections.Mapping):
                                     '_%s_kwargs' % action_l, lambda x: {})
             return handle(**handle_kwargs(r))
 
-        action_task = scheduler.DependencyTaskGroup(self.dependencies,
-                                                    resource_action,
-                                                    reverse)
+        action_task = self.resource_action_group(self.dependencies,
+                                                 resource_action,
+                                                 reverse)
 
         try:
             yield action_task()
@@ -603,9 +725,9 @@ class Stack(collections.Mapping):
                                'Failed to %s : %s' % (action, failure))
                 return
 
-        action_task = scheduler.DependencyTaskGroup(self.dependencies,
-                                                    resource.Resource.destroy,
-                                                    reverse=True)
+        action_task = self.resource_action_group(self.dependencies,
+                                                 resource.Resource.destroy,
+                                                 reverse=True)
         try:
             scheduler.TaskRunner(action_task)(timeout=self.timeout_secs())
         except exception.ResourceFailure as ex:
@@ -721,8 +843,33 @@ class Stack(collections.Mapping):
                               for res in self.resources.values())
         }
 
+    def _static_data_cache(self, snippet):
+        '''
+        Return the cache and key for static data resolved from a snippet of
+        this stack's stored template, or None if it cannot be cached.
+        '''
+        if self.id is None:
+            return None
+
+        params = json.dumps(self.env.params, sort_keys=True, default=str)
+        params_key = hashlib.sha1('%s\n%s' % (self.identifier().arn(),
+                                               params)).hexdigest()
+        return self.t.static_data_cache(params_key, snippet)
+
     def resolve_static_data(self, snippet):
-        return resolve_static_data(self.t, self, self.parameters, snippet)
+        memo = self._static_data_cache(snippet)
+        if memo is None:
+            return resolve_static_data(self.t, self, self.parameters, snippet)
+
+        cache, key = memo
+        cached_snippet, data = cache.get(key, (None, None))
+        # The snippet may have been modified in place since it was resolved
+        if cached_snippet != snippet:
+            data = resolve_static_data(self.t, self, self.parameters, snippet)
+            cache[key] = (copy.deepcopy(snippet), data)
+        # The resolved data is modified by resources, so never hand out the
+        # cached copy itself.
+        return copy.deepcopy(data)
 
     def resolve_runtime_data(self, snippet):
         return resolve_runtime_data(self.t, self.resources, snippet)
@@ -771,12 +918,7 @@ def resolve_runtime_data(template, resources, snippet):
 
 def transform(data, transformations):
     '''
-    Apply each of the transformation functions in the supplied list to the data
-    in turn.
+    Apply the transformation functions in the supplied list to the data. This
+    is done in a single walk of the data, rather than a walk per function.
     '''
-    def sub_transform(d):
-        return transform(d, transformations)
-
-    for t in transformations:
-        data = t(data, transform=sub_transform)
-    return data
+    return FunctionTable(transformations).resolve(data)
@@ -14,6 +14,7 @@
 #    under the License.
 
 import collections
+import copy
 
 from heat.common import exception
 from heat.engine import parameters
@@ -150,6 +151,13 @@ class Schema(constr.Schema):
         raise KeyError(key)
 
 
+def _copy_value(value):
+    '''Return a copy of a resolved value that the caller may modify.'''
+    if isinstance(value, (dict, list)):
+        return copy.deepcopy(value)
+    return value
+
+
 def schemata(schema_dicts):
     """
     Return dictionary of Schema objects for given dictionary of schemata.
@@ -268,8 +276,22 @@ class Property(object):
 
 
 class Properties(collections.Mapping):
-
-    def __init__(self, schema, data, resolver=lambda d: d, parent_name=None):
+    '''
+    The properties of a resource, resolved and validated against a schema on
+    access.
+
+    If a reference_state function is supplied, resolved values are cached.
+    The references function is called with the data for a property, and only
+    again when that data changes, to find everything it refers to. The
+    reference_state function is called with those references on each access
+    and must return a comparable summary of their state, or None if the data
+    must be resolved afresh. A cached value is reused until either the data
+    or that summary changes. The cache_hits and cache_misses counters record
+    how effective the cache is.
+    '''
+
+    def __init__(self, schema, data, resolver=lambda d: d, parent_name=None,
+                 reference_state=None, references=lambda d: d):
         self.props = dict((k, Property(s, k)) for k, s in schema.items())
         self.resolve = resolver
         self.data = data
@@ -277,6 +299,11 @@ class Properties(collections.Mapping):
             self.error_prefix = ''
         else:
             self.error_prefix = '%s: ' % parent_name
+        self.reference_state = reference_state
+        self.references = references
+        self._cache = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
 
     @staticmethod
     def schema_from_params(params_snippet):
@@ -318,19 +345,45 @@ class Properties(collections.Mapping):
         prop = self.props[key]
 
         if key in self.data:
-            try:
-                value = self.resolve(self.data[key])
-                return prop.validate_data(value)
-            # the resolver function could raise any number of exceptions,
-            # so handle this generically
-            except Exception as e:
-                raise ValueError(self.error_prefix + '%s %s' % (key, str(e)))
+            if self.reference_state is None:
+                return self._resolve_data(key)
+
+            data = self.data[key]
+            cached = self._cache.get(key)
+            if cached is None or cached[0] != data:
+                cached = (copy.deepcopy(data), self.references(data),
+                          None, None)
+
+            cached_data, references, cached_state, value = cached
+            state = self.reference_state(references)
+            if state is not None and state == cached_state:
+                self.cache_hits += 1
+                # Don't let callers modify the cached value
+                return _copy_value(value)
+
+            self.cache_misses += 1
+            value = self._resolve_data(key)
+            if state is not None:
+                self._cache[key] = (cached_data, references, state,
+                                    _copy_value(value))
+            else:
+                self._cache[key] = (cached_data, references, None, None)
+            return value
         elif prop.has_default():
             return prop.default()
         elif prop.required():
             raise ValueError(self.error_prefix +
                              _('Property %s not assigned') % key)
 
+    def _resolve_data(self, key):
+        try:
+            value = self.resolve(self.data[key])
+            return self.props[key].validate_data(value)
+        # the resolver function could raise any number of exceptions,
+        # so handle this generically
+        except Exception as e:
+            raise ValueError(self.error_prefix + '%s %s' % (key, str(e)))
+
     def __len__(self):
         return len(self.props)
 
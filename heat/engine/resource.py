@@ -14,6 +14,8 @@
 #    under the License.
 
 import base64
+import collections
+import copy
 from datetime import datetime
 
 from heat.engine import event
@@ -24,6 +26,7 @@ from heat.common import identifier
 from heat.common import short_id
 from heat.engine import scheduler
 from heat.engine import resources
+from heat.engine import template
 from heat.engine import timestamp
 # import class to avoid name collisions and ugly aliasing
 from heat.engine.attributes import Attributes
@@ -51,6 +54,29 @@ def _register_class(resource_type, resource_class):
     resources.global_env().register_class(resource_type, resource_class)
 
 
+def _references(fragment):
+    '''
+    Generate the references in a template snippet, as (resource name,
+    attribute) pairs. The attribute is None for a reference to the resource
+    itself. The resource name need not be a string, since it may be given by
+    a function.
+    '''
+    if isinstance(fragment, dict):
+        for key, value in fragment.items():
+            if key in ('Ref', 'get_resource'):
+                yield value, None
+            elif key in ('Fn::GetAtt', 'get_attr'):
+                if isinstance(value, list) and len(value) >= 2:
+                    yield value[0], value[1]
+            else:
+                for ref in _references(value):
+                    yield ref
+    elif isinstance(fragment, list):
+        for item in fragment:
+            for ref in _references(item):
+                yield ref
+
+
 class UpdateReplace(Exception):
     '''
     Raised when resource update requires replacement
@@ -70,6 +96,9 @@ class Metadata(object):
     '''
     A descriptor for accessing the metadata of a resource while ensuring the
     most up-to-date data is always obtained from the database.
+
+    The metadata is cached in the resource along with its version, so that
+    only the version need be checked in the database on each access.
     '''
 
     def __get__(self, resource, resource_class):
@@ -78,16 +107,107 @@ class Metadata(object):
             return None
         if resource.id is None:
             return resource.parsed_template('Metadata')
-        rs = db_api.resource_get(resource.stack.context, resource.id)
-        rs.refresh(attrs=['rsrc_metadata'])
-        return rs.rsrc_metadata
+
+        context = resource.stack.context
+        cached = resource._metadata_cache
+        if (cached is None or
+                cached[0] != db_api.resource_metadata_version(context,
+                                                              resource.id)):
+            rs = db_api.resource_get(context, resource.id)
+            rs.refresh(attrs=['rsrc_metadata', 'metadata_version'])
+            cached = (rs.metadata_version, rs.rsrc_metadata)
+            resource._metadata_cache = cached
+
+        # Callers may modify the data they are given
+        return copy.deepcopy(cached[1])
 
     def __set__(self, resource, metadata):
         '''Update the metadata for the owning resource.'''
         if resource.id is None:
             raise exception.ResourceNotAvailable(resource_name=resource.name)
-        rs = db_api.resource_get(resource.stack.context, resource.id)
-        rs.update_and_save({'rsrc_metadata': metadata})
+        db_api.resource_metadata_set(resource.stack.context, resource.id,
+                                     metadata)
+        resource.clear_metadata_cache()
+
+
+class ResourceData(collections.Mapping):
+    '''
+    The data stored in the database for a resource, as a read-only mapping.
+
+    All of the rows are loaded at once on first access - from the resource's
+    database entry, where they are usually fetched along with it, or else in
+    a single query - and each value is decrypted only when it is first read.
+    Updates are written through to the database by set() and update(), the
+    latter storing any number of keys in a single transaction.
+
+    Once loaded, the rows are not reloaded automatically, so data written to
+    the database by other engines (or other Resource objects) is not seen
+    until refresh() is called.
+    '''
+
+    def __init__(self, resource, db_resource=None):
+        self.resource = resource
+        self._db_resource = db_resource
+        self._rows = None
+        self._values = {}
+
+    def _data_rows(self):
+        if self._rows is None:
+            if self._db_resource is not None:
+                data = self._db_resource.data
+            elif self.resource.id is not None:
+                data = db_api.resource_data_get_all_by_resource(
+                    self.resource.context, self.resource.id)
+            else:
+                return {}
+            self._rows = dict((d.key, d) for d in data)
+        return self._rows
+
+    def __getitem__(self, key):
+        if key not in self._values:
+            self._values[key] = db_api.resource_data_decrypt(
+                self._data_rows()[key])
+        return self._values[key]
+
+    def __contains__(self, key):
+        return key in self._values or key in self._data_rows()
+
+    def __iter__(self):
+        return iter(self._data_rows())
+
+    def __len__(self):
+        return len(self._data_rows())
+
+    def refresh(self):
+        '''Discard the loaded data, so that it is reloaded when next read.'''
+        self._db_resource = None
+        self._rows = None
+        self._values = {}
+
+    def set(self, key, value, redact=False):
+        '''Store a single key/value pair in the database.'''
+        self.update({key: value}, redact=redact)
+
+    def update(self, data, redact=False):
+        '''Store a dict of key/value pairs in the database.'''
+        # Load the existing rows first, since rows loaded afterwards from the
+        # resource's database entry would not include the new ones
+        self._data_rows()
+        rows = db_api.resource_data_set_all(self.resource, data,
+                                            redact=redact)
+        if self._rows is not None:
+            self._rows.update(rows)
+        self._values.update(data)
+
+    def delete(self, key):
+        '''
+        Remove a key from the database, raising NotFound if it is not there.
+        '''
+        self._data_rows()
+        self._values.pop(key, None)
+        if self._rows is not None:
+            self._rows.pop(key, None)
+        db_api.resource_data_delete(self.resource, key)
 
 
 class SupportStatus(object):
@@ -145,10 +265,23 @@ class Resource(object):
     # throughout its lifecycle
     requires_deferred_auth = False
 
+    # If True, actions on this resource count towards the limit on resource
+    # actions in progress across the engine
+    uses_resource_action_slot = True
+
     # Limit to apply to physical_resource_name() size reduction algorithm.
     # If set to None no limit will be applied.
     physical_resource_name_limit = 255
 
+    # Resource implementations that poll a remote API for the completion of
+    # their actions may set this to a scheduler.PollPolicy to back off
+    # between polls. If None, completion is checked on every scheduler step.
+    poll_policy = None
+
+    # Resource implementations may set this to a dictionary of the expected
+    # duration (in seconds) of each action, used as a hint when polling
+    expected_durations = {}
+
     support_status = SupportStatus()
 
     def __new__(cls, name, json, stack):
@@ -172,27 +305,27 @@ class Resource(object):
         self.name = name
         self.json_snippet = json_snippet
         self.t = stack.resolve_static_data(json_snippet)
+        # The unresolved snippet from which self.t was resolved
+        self._t_source = json_snippet
+        self._metadata_cache = None
         self.properties = Properties(self.properties_schema,
                                      self.t.get('Properties', {}),
                                      self._resolve_runtime_data,
-                                     self.name)
+                                     self.name,
+                                     self._reference_state,
+                                     self._snippet_references)
         self.attributes = Attributes(self.name,
                                      self.attributes_schema,
                                      self._resolve_attribute)
 
-        if stack.id:
-            resource = db_api.resource_get_by_name_and_stack(self.context,
-                                                             name, stack.id)
-        else:
-            resource = None
-
+        resource = stack.db_resource_get(name)
         if resource:
             self.resource_id = resource.nova_instance
             self.action = resource.action
             self.status = resource.status
             self.status_reason = resource.status_reason
             self.id = resource.id
-            self.data = resource.data
+            self.data = ResourceData(self, resource)
         else:
             self.resource_id = None
             # if the stack is being deleted, assume we've already been deleted
@@ -203,7 +336,7 @@ class Resource(object):
             self.status = self.COMPLETE
             self.status_reason = ''
             self.id = None
-            self.data = []
+            self.data = ResourceData(self)
 
     def __eq__(self, other):
         '''Allow == comparison of two resources.'''
@@ -235,6 +368,49 @@ class Resource(object):
     def _resolve_runtime_data(self, snippet):
         return self.stack.resolve_runtime_data(snippet)
 
+    @staticmethod
+    def _snippet_references(snippet):
+        '''Return the distinct references in a template snippet.'''
+        references = []
+        for ref in _references(snippet):
+            if ref not in references:
+                references.append(ref)
+        return references
+
+    def _reference_state(self, references):
+        '''
+        Return the state of the resources referred to by a template snippet,
+        given the references found in it. The resolved snippet may be
+        different whenever this changes.
+
+        Attributes may change without the state of their resource changing,
+        so the state includes the current value of each attribute referred
+        to. Return None if the state cannot be determined.
+        '''
+        def reference_state(name, attr):
+            res = self.stack.resources.get(name)
+            if res is None:
+                return None
+            state = (res.id, res.action, res.status, res.resource_id)
+            if (attr is not None and
+                    res.action in (res.CREATE, res.RESUME, res.UPDATE) and
+                    res.status in (res.IN_PROGRESS, res.COMPLETE)):
+                state += (res.FnGetAtt(attr),)
+            return state
+
+        if not all(isinstance(name, basestring) and
+                   (attr is None or isinstance(attr, basestring))
+                   for name, attr in references):
+            return None
+
+        try:
+            return (self.stack.id,
+                    [(name, attr, reference_state(name, attr))
+                     for name, attr in references])
+        except Exception:
+            # Leave it to resolving the snippet to report the error
+            return None
+
     def has_interface(self, resource_type):
         """Check to see if this resource is either mapped to resource_type
         or is a "resource_type".
@@ -335,36 +511,27 @@ class Resource(object):
                                    str(self.stack))
         return '%s "%s"' % (self.__class__.__name__, self.name)
 
-    def _add_dependencies(self, deps, path, fragment):
-        if isinstance(fragment, dict):
-            for key, value in fragment.items():
-                if key in ('DependsOn', 'Ref', 'Fn::GetAtt', 'get_attr',
-                           'get_resource'):
-                    if key in ('Fn::GetAtt', 'get_attr'):
-                        res_name = value[0]
-                        res_list = [res_name]
-                    elif key == 'DependsOn' and isinstance(value, list):
-                        res_list = value
-                    else:
-                        res_list = [value]
-
-                    for res in res_list:
-                        try:
-                            target = self.stack[res]
-                        except KeyError:
-                            raise exception.InvalidTemplateReference(
-                                resource=res,
-                                key=path)
-                        if key == 'DependsOn' or target.strict_dependency:
-                            deps += (self, target)
-                else:
-                    self._add_dependencies(deps, '%s.%s' % (path, key), value)
-        elif isinstance(fragment, list):
-            for index, item in enumerate(fragment):
-                self._add_dependencies(deps, '%s[%d]' % (path, index), item)
+    def _dependency_references(self):
+        tmpl = self.stack.t
+        if tmpl[tmpl.RESOURCES].get(self.name) is self._t_source:
+            # Use the template's index of references, which is built once
+            refs = tmpl.resource_references(self.name)
+            if refs is not None:
+                return refs
+        return template.dependency_references(self.name, self.t)
 
     def add_dependencies(self, deps):
-        self._add_dependencies(deps, self.name, self.t)
+        for key, res, path in self._dependency_references():
+            if key == 'Ref' and res in self.stack.parameters:
+                # A reference to a parameter, resolved with the static data
+                continue
+            try:
+                target = self.stack[res]
+            except KeyError:
+                raise exception.InvalidTemplateReference(resource=res,
+                                                         key=path)
+            if key == 'DependsOn' or target.strict_dependency:
+                deps += (self, target)
         deps += (self, None)
 
     def required_by(self):
@@ -399,6 +566,15 @@ class Resource(object):
     def heat(self):
         return self.stack.clients.heat()
 
+    def _poll_until(self, action, check, handle_data):
+        '''
+        Return a co-routine that polls check(handle_data) until it returns
+        True, at the rate given by the resource's poll_policy.
+        '''
+        return scheduler.poll_until(lambda: check(handle_data),
+                                    self.poll_policy,
+                                    self.expected_durations.get(action))
+
     def _do_action(self, action, pre_func=None, resource_data=None):
         '''
         Perform a transition to a new state via a specified action
@@ -413,26 +589,30 @@ class Resource(object):
         finished, and if no handle_$action function is declared, then we do
         nothing, useful e.g if the resource requires no action for a given
         state transition
+
+        If the action is cancelled or times out while waiting for
+        check_$action_complete, the data returned by handle_$action is passed
+        to handle_$action_cancel, if it is declared.
         '''
         assert action in self.ACTIONS, 'Invalid action %s' % action
 
+        action_l = action.lower()
+        handle_data = None
         try:
             self.state_set(action, self.IN_PROGRESS)
 
-            action_l = action.lower()
             handle = getattr(self, 'handle_%s' % action_l, None)
             check = getattr(self, 'check_%s_complete' % action_l, None)
 
             if callable(pre_func):
                 pre_func()
 
-            handle_data = None
             if callable(handle):
                 handle_data = (handle(resource_data) if resource_data else
                                handle())
                 yield
                 if callable(check):
-                    while not check(handle_data):
+                    for step in self._poll_until(action, check, handle_data):
                         yield
         except Exception as ex:
             logger.exception('%s : %s' % (action, str(self)))
@@ -441,6 +621,12 @@ class Resource(object):
             raise failure
         except:
             with excutils.save_and_reraise_exception():
+                cancel = getattr(self, 'handle_%s_cancel' % action_l, None)
+                if handle_data is not None and callable(cancel):
+                    try:
+                        cancel(handle_data)
+                    except Exception:
+                        logger.exception(_('Error cancelling %s') % action)
                 try:
                     self.state_set(action, self.FAILED,
                                    '%s aborted' % action)
@@ -467,10 +653,13 @@ class Resource(object):
         # the parser.Stack is stored (which is after the resources
         # are __init__'d, but before they are create()'d)
         self.t = self.stack.resolve_static_data(self.json_snippet)
+        self._t_source = self.json_snippet
         self.properties = Properties(self.properties_schema,
                                      self.t.get('Properties', {}),
                                      self._resolve_runtime_data,
-                                     self.name)
+                                     self.name,
+                                     self._reference_state,
+                                     self._snippet_references)
         return self._do_action(action, self.properties.validate)
 
     def set_deletion_policy(self, policy):
@@ -484,8 +673,7 @@ class Resource(object):
             'action': self.action,
             'status': self.status,
             'metadata': self.metadata,
-            'resource_data': dict((r.key, r.value)
-                                  for r in db_api.resource_data_get_all(self))
+            'resource_data': dict(self.data)
         }
 
     def adopt(self, resource_data):
@@ -508,8 +696,7 @@ class Resource(object):
 
         # save the resource data
         if data and isinstance(data, dict):
-            for key, value in data.iteritems():
-                db_api.resource_data_set(self, key, value)
+            self.data.update(data)
 
         # save the resource metadata
         self.metadata = metadata
@@ -555,7 +742,9 @@ class Resource(object):
             properties = Properties(self.properties_schema,
                                     after.get('Properties', {}),
                                     self._resolve_runtime_data,
-                                    self.name)
+                                    self.name,
+                                    self._reference_state,
+                                    self._snippet_references)
             properties.validate()
             tmpl_diff = self.update_template_diff(after, before)
             prop_diff = self.update_template_diff_properties(after, before)
@@ -563,7 +752,9 @@ class Resource(object):
                 handle_data = self.handle_update(after, tmpl_diff, prop_diff)
                 yield
                 if callable(getattr(self, 'check_update_complete', None)):
-                    while not self.check_update_complete(handle_data):
+                    for step in self._poll_until(action,
+                                                 self.check_update_complete,
+                                                 handle_data):
                         yield
         except UpdateReplace:
             with excutils.save_and_reraise_exception():
@@ -576,6 +767,7 @@ class Resource(object):
             raise failure
         else:
             self.t = self.stack.resolve_static_data(after)
+            self._t_source = after
             self.state_set(action, self.COMPLETE)
 
     def suspend(self):
@@ -698,7 +890,9 @@ class Resource(object):
 
             if (deletion_policy != RETAIN and
                     callable(getattr(self, 'check_delete_complete', None))):
-                while not self.check_delete_complete(handle_data):
+                for step in self._poll_until(action,
+                                             self.check_delete_complete,
+                                             handle_data):
                     yield
 
         except Exception as ex:
@@ -735,6 +929,8 @@ class Resource(object):
             pass
 
         self.id = None
+        self.clear_metadata_cache()
+        self.data = ResourceData(self)
 
     def resource_id_set(self, inst):
         self.resource_id = inst
@@ -760,6 +956,7 @@ class Resource(object):
 
             new_rs = db_api.resource_create(self.context, rs)
             self.id = new_rs.id
+            self.clear_metadata_cache()
 
             self.stack.updated_time = datetime.utcnow()
 
@@ -916,6 +1113,13 @@ class Resource(object):
     def handle_update(self, json_snippet=None, tmpl_diff=None, prop_diff=None):
         raise UpdateReplace(self.name)
 
+    def clear_metadata_cache(self):
+        '''
+        Discard the cached copy of the metadata, so that it is read in full
+        from the database the next time it is accessed.
+        '''
+        self._metadata_cache = None
+
     def metadata_update(self, new_metadata=None):
         '''
         No-op for resources which don't explicitly override this method
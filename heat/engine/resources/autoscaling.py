@@ -237,18 +237,17 @@ class InstanceGroup(stack_resource.StackResource):
             id_list = [inst.FnGetRefId() for inst in self.get_instances()]
             for lb in self.properties['LoadBalancerNames']:
                 lb_resource = self.stack[lb]
+                # The definition belongs to the (possibly shared) template
+                lb_snippet = copy.deepcopy(lb_resource.json_snippet)
                 if 'Instances' in lb_resource.properties_schema:
-                    lb_resource.json_snippet['Properties']['Instances'] = (
-                        id_list)
+                    lb_snippet['Properties']['Instances'] = id_list
                 elif 'members' in lb_resource.properties_schema:
-                    lb_resource.json_snippet['Properties']['members'] = (
-                        id_list)
+                    lb_snippet['Properties']['members'] = id_list
                 else:
                     raise exception.Error(
                         "Unsupported resource '%s' in LoadBalancerNames" %
                         (lb,))
-                resolved_snippet = self.stack.resolve_static_data(
-                    lb_resource.json_snippet)
+                resolved_snippet = self.stack.resolve_static_data(lb_snippet)
                 scheduler.TaskRunner(lb_resource.update, resolved_snippet)()
 
     def FnGetRefId(self):
@@ -298,6 +298,10 @@ class Instance(resource.Resource):
     # linux HOST_NAME_MAX of 64, minus the .novalocal appended to the name
     physical_resource_name_limit = 53
 
+    # Back off between polls of Nova while the server is building
+    poll_policy = scheduler.PollPolicy()
+    expected_durations = {resource.Resource.CREATE: 10}
+
     def __init__(self, name, json_snippet, stack):
         super(Instance, self).__init__(name, json_snippet, stack)
         self.ipaddress = None
@@ -467,7 +471,7 @@ class Instance(resource.Resource):
 
     def _check_active(self, server):
         if server.status != 'ACTIVE':
-            server.get()
+            nova_utils.refresh_server(server)
 
         if server.status == 'ACTIVE':
             return True
@@ -533,7 +537,10 @@ class Instance(resource.Resource):
         Refresh the metadata if new_metadata is None
         '''
         if new_metadata is None:
-            self.metadata = self.parsed_template('Metadata')
+            metadata = self.parsed_template('Metadata')
+            # Avoid rewriting the metadata if it has not changed
+            if metadata != self.metadata:
+                self.metadata = metadata
 
     def validate(self):
         '''
@@ -654,7 +661,7 @@ class Instance(resource.Resource):
                 if server.status == 'SUSPENDED':
                     return True
 
-                server.get()
+                nova_utils.refresh_server(server, 'SUSPENDED')
                 logger.debug("%s check_suspend_complete status = %s" %
                              (self.name, server.status))
                 if server.status in list(nova_utils.deferred_server_statuses +
@@ -10,8 +10,6 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-from heat.common import exception
-from heat.db import api as db_api
 from heat.engine import properties
 from heat.engine import resource
 from heat.engine.resources import nova_utils
@@ -78,11 +76,7 @@ class KeyPair(resource.Resource):
         """Return the private SSH key for the resource."""
         if (self._private_key is None and self.id and
                 self.properties[self.SAVE_PRIVATE_KEY]):
-                try:
-                    self._private_key = db_api.resource_data_get(self,
-                                                                 'private_key')
-                except exception.NotFound:
-                    pass
+                self._private_key = self.data.get('private_key')
         return self._private_key or ""
 
     @property
@@ -103,9 +97,8 @@ class KeyPair(resource.Resource):
                                                   public_key=pub_key)
         if (self.properties[self.SAVE_PRIVATE_KEY] and
                 hasattr(new_keypair, 'private_key')):
-            db_api.resource_data_set(self, 'private_key',
-                                     new_keypair.private_key,
-                                     True)
+            self.data.set('private_key', new_keypair.private_key,
+                          redact=True)
         self.resource_id_set(new_keypair.id)
 
     def handle_delete(self):
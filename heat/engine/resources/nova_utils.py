@@ -21,6 +21,7 @@ import json
 import os
 import pkgutil
 import six
+import time
 
 from oslo.config import cfg
 
@@ -33,6 +34,8 @@ from heat.openstack.common import uuidutils
 from heat.openstack.common.py3kcompat import urlutils
 
 
+cfg.CONF.import_opt('server_status_cache_ttl', 'heat.common.config')
+
 logger = logging.getLogger(__name__)
 
 
@@ -48,6 +51,115 @@ deferred_server_statuses = ['BUILD',
                             'VERIFY_RESIZE']
 
 
+class ServerStatusPoller(object):
+    '''
+    Refreshes the status of servers that are being polled, using a single
+    detailed server list query for all of the servers being polled on the
+    same Nova endpoint (i.e. in the same tenant, whichever stack they belong
+    to) instead of a GET for each one.
+
+    The list query asks only for the servers that have changed since the
+    least recently updated of the servers being polled, according to the
+    update times reported by Nova itself. Its result is shared between all of
+    the servers refreshed within cfg.CONF.server_status_cache_ttl seconds of
+    it. A list query is only made when more than one server is being polled;
+    a lone server is simply refreshed with a GET.
+    '''
+
+    # Time (in seconds) after which a server that has not been refreshed is
+    # no longer considered to be polling
+    POLLING_EXPIRY = 60
+
+    def __init__(self):
+        self._endpoints = {}
+
+    @staticmethod
+    def _endpoint(manager):
+        url = getattr(manager.api.client, 'management_url', None)
+        return url or manager
+
+    def _state(self, endpoint):
+        try:
+            return self._endpoints[endpoint]
+        except KeyError:
+            state = {'polling': {}, 'servers': {}, 'listed_at': None}
+            self._endpoints[endpoint] = state
+            return state
+
+    def _list(self, manager, state, now):
+        search_opts = {}
+        updated = [u for t, u in state['polling'].values()]
+        if None not in updated:
+            search_opts['changes-since'] = min(updated)
+        state['servers'] = dict((s.id, s._info)
+                                for s in manager.list(detailed=True,
+                                                      search_opts=search_opts))
+        state['listed_at'] = now
+
+    @staticmethod
+    def _still_polling(server, target_status):
+        # Some clouds append extra (STATUS) strings to the status
+        status = server.status.split('(')[0]
+        if status == target_status:
+            return False
+        return status == 'ACTIVE' or status in deferred_server_statuses
+
+    def refresh(self, server, target_status='ACTIVE'):
+        '''
+        Refresh the details of the given server from Nova. The server is
+        considered to be polling until it reaches the target status or a
+        status that is not a transitional one.
+        '''
+        ttl = cfg.CONF.server_status_cache_ttl
+        if not ttl:
+            server.get()
+            return
+
+        now = time.time()
+        endpoint = self._endpoint(server.manager)
+        state = self._state(endpoint)
+        polling = state['polling']
+        polling[server.id] = (now, getattr(server, 'updated', None))
+        for server_id, (last_poll, updated) in polling.items():
+            if now - last_poll > self.POLLING_EXPIRY:
+                del polling[server_id]
+
+        try:
+            if len(polling) < 2:
+                server.get()
+                return
+
+            listed_at = state['listed_at']
+            if listed_at is None or not (0 <= now - listed_at < ttl):
+                self._list(server.manager, state, now)
+
+            info = state['servers'].get(server.id)
+            if info is None:
+                # Not in the listing (e.g. paginated out); fetch it directly
+                server.get()
+            else:
+                server._add_details(info)
+        finally:
+            if self._still_polling(server, target_status):
+                polling[server.id] = (now, getattr(server, 'updated', None))
+            else:
+                polling.pop(server.id, None)
+                if not polling and self._endpoints.get(endpoint) is state:
+                    del self._endpoints[endpoint]
+
+
+_server_status_poller = ServerStatusPoller()
+
+
+def refresh_server(server, target_status='ACTIVE'):
+    '''
+    Refresh the details of a server whose status is being polled until it
+    reaches the target status. The status of many servers may be refreshed
+    with a single API call.
+    '''
+    _server_status_poller.refresh(server, target_status)
+
+
 def get_image_id(nova_client, image_identifier):
     '''
     Return an id for the specified image name or identifier.
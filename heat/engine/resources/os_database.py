@@ -24,6 +24,7 @@ from heat.common import exception
 from heat.engine import constraints
 from heat.engine import properties
 from heat.engine import resource
+from heat.engine import scheduler
 from heat.engine.resources import nova_utils
 from heat.openstack.common import log as logging
 
@@ -174,6 +175,8 @@ class OSDBInstance(resource.Resource):
         "href": _("Api endpoint reference of the instance")
     }
 
+    poll_policy = scheduler.PollPolicy()
+
     def __init__(self, name, json_snippet, stack):
         super(OSDBInstance, self).__init__(name, json_snippet, stack)
         self._href = None
@@ -13,7 +13,6 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-from heat.db import api as db_api
 from heat.engine import resource
 from heat.engine import properties
 from heat.engine import constraints
@@ -85,11 +84,11 @@ class RandomString(resource.Resource):
         length = self.properties.get(self.LENGTH)
         sequence = self._sequences[self.properties.get(self.SEQUENCE)]
         random_string = self._generate_random_string(sequence, length)
-        db_api.resource_data_set(self, 'value', random_string, redact=True)
+        self.data.set('value', random_string, redact=True)
 
     def _resolve_attribute(self, name):
         if name == 'value':
-            return db_api.resource_data_get(self, 'value')
+            return self.data['value']
 
 
 def resource_mapping():
@@ -258,6 +258,10 @@ class Server(resource.Resource):
     # linux HOST_NAME_MAX of 64, minus the .novalocal appended to the name
     physical_resource_name_limit = 53
 
+    # Back off between polls of Nova while the server is building
+    poll_policy = scheduler.PollPolicy()
+    expected_durations = {resource.Resource.CREATE: 10}
+
     def __init__(self, name, json_snippet, stack):
         super(Server, self).__init__(name, json_snippet, stack)
 
@@ -335,7 +339,7 @@ class Server(resource.Resource):
     def _check_active(self, server):
 
         if server.status != 'ACTIVE':
-            server.get()
+            nova_utils.refresh_server(server)
 
         # Some clouds append extra (STATUS) strings to the status
         short_server_status = server.status.split('(')[0]
@@ -492,7 +496,10 @@ class Server(resource.Resource):
         Refresh the metadata if new_metadata is None
         '''
         if new_metadata is None:
-            self.metadata = self.parsed_template('Metadata')
+            metadata = self.parsed_template('Metadata')
+            # Avoid rewriting the metadata if it has not changed
+            if metadata != self.metadata:
+                self.metadata = metadata
 
     def validate(self):
         '''
@@ -618,7 +625,7 @@ class Server(resource.Resource):
             if server.status == 'SUSPENDED':
                 return True
 
-            server.get()
+            nova_utils.refresh_server(server, 'SUSPENDED')
             logger.debug(_('%(name)s check_suspend_complete status '
                          '= %(status)s') % {
                          'name': self.name, 'status': server.status})
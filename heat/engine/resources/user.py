@@ -14,7 +14,6 @@
 #    under the License.
 
 from heat.common import exception
-from heat.db import api as db_api
 from heat.engine import constraints
 from heat.engine import properties
 from heat.engine import resource
@@ -224,13 +223,11 @@ class AccessKey(resource.Resource):
 
         # Store the secret key, encrypted, in the DB so we don't have to
         # re-request it from keystone every time someone requests the
-        # SecretAccessKey attribute
-        db_api.resource_data_set(self, 'secret_key', kp.secret,
-                                 redact=True)
-        # Also store the credential ID as this should be used to manage
-        # the credential rather than the access key via v3/credentials
-        db_api.resource_data_set(self, 'credential_id', kp.id,
-                                 redact=True)
+        # SecretAccessKey attribute. Also store the credential ID as this
+        # should be used to manage the credential rather than the access key
+        # via v3/credentials
+        self.data.update({'secret_key': kp.secret,
+                          'credential_id': kp.id}, redact=True)
 
     def handle_delete(self):
         self._secret = None
@@ -265,19 +262,18 @@ class AccessKey(resource.Resource):
                 # for backwards compatibility, fall back to requesting from
                 # keystone
                 try:
-                    self._secret = db_api.resource_data_get(self, 'secret_key')
-                except exception.NotFound:
+                    self._secret = self.data['secret_key']
+                except KeyError:
                     try:
                         user_id = self._get_user().resource_id
                         kp = self.keystone().get_ec2_keypair(
                             user_id=user_id, access=self.resource_id)
                         self._secret = kp.secret
-                        # Store the key in resource_data
-                        db_api.resource_data_set(self, 'secret_key',
-                                                 kp.secret, redact=True)
-                        # And the ID of the v3 credential
-                        db_api.resource_data_set(self, 'credential_id',
-                                                 kp.id, redact=True)
+                        # Store the key in resource_data, along with
+                        # the ID of the v3 credential
+                        self.data.update({'secret_key': kp.secret,
+                                          'credential_id': kp.id},
+                                         redact=True)
                     except Exception as ex:
                         logger.warn(_('could not get secret for %(username)s '
                                       'Error:%(msg)s') % {
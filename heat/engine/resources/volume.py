@@ -81,6 +81,8 @@ class Volume(resource.Resource):
 
     _volume_creating_status = ['creating', 'restoring-backup']
 
+    poll_policy = scheduler.PollPolicy()
+
     def _display_name(self):
         return self.physical_resource_name()
 
@@ -327,6 +329,8 @@ class VolumeAttachment(resource.Resource):
         ),
     }
 
+    poll_policy = scheduler.PollPolicy()
+
     def handle_create(self):
         server_id = self.properties[self.INSTANCE_ID]
         volume_id = self.properties[self.VOLUME_ID]
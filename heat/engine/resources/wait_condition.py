@@ -13,7 +13,11 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
 import json
+import time
+
+from oslo.config import cfg
 
 from heat.common import exception
 from heat.common import identifier
@@ -27,6 +31,58 @@ from heat.openstack.common import log as logging
 
 logger = logging.getLogger(__name__)
 
+cfg.CONF.import_opt('wait_condition_poll_interval', 'heat.common.config')
+
+# The WaitConditions waiting in this engine, indexed by the ID of the
+# handle resource they are waiting on
+_waiters = collections.defaultdict(set)
+
+
+def notify_signal(handle_id):
+    '''
+    Wake any WaitConditions in this engine that are waiting on the handle
+    with the given resource ID, so that they check its status on their next
+    step.
+    '''
+    for waiter in _waiters.get(handle_id, ()):
+        waiter.signalled = True
+
+
+class SignalWaiter(object):
+    '''
+    Records whether a handle has been signalled since it was last checked,
+    while registered (as a context manager) to be notified of signals.
+    '''
+
+    def __init__(self, handle_id):
+        self.handle_id = handle_id
+        # Signals may have arrived before the wait started
+        self.signalled = True
+        self.last_checked = None
+
+    def check_due(self):
+        '''
+        Return True if the handle has been signalled, or has not been checked
+        for a while in case a notification was lost.
+        '''
+        now = time.time()
+        interval = cfg.CONF.wait_condition_poll_interval
+        if self.signalled or now - self.last_checked >= interval:
+            self.signalled = False
+            self.last_checked = now
+            return True
+        return False
+
+    def __enter__(self):
+        _waiters[self.handle_id].add(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        waiters = _waiters[self.handle_id]
+        waiters.discard(self)
+        if not waiters:
+            del _waiters[self.handle_id]
+
 
 class WaitConditionHandle(signal_responder.SignalResponder):
     '''
@@ -86,6 +142,7 @@ class WaitConditionHandle(signal_responder.SignalResponder):
             # is a Metadata descriptor object which only supports get/set
             rsrc_metadata.update({new_metadata['UniqueId']: safe_metadata})
             self.metadata = rsrc_metadata
+            notify_signal(self.id)
         else:
             logger.error(_("Metadata failed validation for %s") % self.name)
             raise ValueError(_("Metadata format invalid"))
@@ -94,8 +151,8 @@ class WaitConditionHandle(signal_responder.SignalResponder):
         '''
         Return a list of the Status values for the handle signals
         '''
-        return [self.metadata[s]['Status']
-                for s in self.metadata]
+        metadata = self.metadata
+        return [metadata[s]['Status'] for s in metadata]
 
     def get_status_reason(self, status):
         '''
@@ -103,9 +160,10 @@ class WaitConditionHandle(signal_responder.SignalResponder):
         If there is more than one handle signal matching the specified status
         then return a semicolon delimited string containing all reasons
         '''
-        return ';'.join([self.metadata[s]['Reason']
-                        for s in self.metadata
-                        if self.metadata[s]['Status'] == status])
+        metadata = self.metadata
+        return ';'.join([metadata[s]['Reason']
+                        for s in metadata
+                        if metadata[s]['Status'] == status])
 
 
 WAIT_STATUSES = (
@@ -214,26 +272,32 @@ class WaitCondition(resource.Resource):
         return handle_id.resource_name
 
     def _wait(self, handle):
-        while True:
-            try:
-                yield
-            except scheduler.Timeout:
-                timeout = WaitConditionTimeout(self, handle)
-                logger.info(_('%(name)s Timed out (%(timeout)s)') % {
-                            'name': str(self), 'timeout': str(timeout)})
-                raise timeout
-
-            handle_status = handle.get_status()
-
-            if any(s != STATUS_SUCCESS for s in handle_status):
-                failure = WaitConditionFailure(self, handle)
-                logger.info(_('%(name)s Failed (%(failure)s)') % {
-                            'name': str(self), 'failure': str(failure)})
-                raise failure
-
-            if len(handle_status) >= self.properties[self.COUNT]:
-                logger.info(_("%s Succeeded") % str(self))
-                return
+        with SignalWaiter(handle.id) as waiter:
+            while True:
+                try:
+                    yield
+                except scheduler.Timeout:
+                    timeout = WaitConditionTimeout(self, handle)
+                    logger.info(_('%(name)s Timed out (%(timeout)s)') % {
+                                'name': str(self), 'timeout': str(timeout)})
+                    raise timeout
+
+                # Only read the handle's metadata once a signal has been
+                # received, rather than polling the database on every step
+                if not waiter.check_due():
+                    continue
+
+                handle_status = handle.get_status()
+
+                if any(s != STATUS_SUCCESS for s in handle_status):
+                    failure = WaitConditionFailure(self, handle)
+                    logger.info(_('%(name)s Failed (%(failure)s)') % {
+                                'name': str(self), 'failure': str(failure)})
+                    raise failure
+
+                if len(handle_status) >= self.properties[self.COUNT]:
+                    logger.info(_("%s Succeeded") % str(self))
+                    return
 
     def handle_create(self):
         self._validate_handle_url()
@@ -13,10 +13,13 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
 import eventlet
 import functools
 import itertools
+import random
 import sys
+import time
 import types
 from time import time as wallclock
 
@@ -288,13 +291,210 @@ def wrappertask(task):
     return wrapper
 
 
+class PollPolicy(object):
+    """
+    A policy for how often to poll for the completion of a long-running
+    operation, such as a server boot.
+
+    The interval between polls starts at initial_interval seconds and grows
+    by backoff_factor after each poll, up to a maximum of max_interval
+    seconds. Each interval is randomly varied by up to the given proportion
+    of jitter, so that operations started together do not poll together.
+    """
+
+    def __init__(self, initial_interval=1.0, backoff_factor=2.0,
+                 max_interval=10.0, jitter=0.2):
+        self.initial_interval = initial_interval
+        self.backoff_factor = backoff_factor
+        self.max_interval = max_interval
+        self.jitter = jitter
+
+    def _jittered(self, interval):
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def intervals(self, expected_duration=None):
+        """
+        Return an iterator over the intervals (in seconds) to wait between
+        polls.
+
+        If the expected duration of the operation is known, the first interval
+        is half of it.
+        """
+        if expected_duration:
+            yield self._jittered(expected_duration / 2.0)
+
+        interval = self.initial_interval
+        while True:
+            yield self._jittered(interval)
+            interval = min(interval * self.backoff_factor, self.max_interval)
+
+
+def poll_until(check, policy=None, expected_duration=None):
+    """
+    Return a co-routine that calls check() until it returns True, yielding
+    control between calls.
+
+    If a PollPolicy is supplied, steps are skipped without calling check()
+    until the next interval given by the policy has elapsed; otherwise
+    check() is called at every step. If the expected duration of the
+    operation is also known, check() is not called until the first interval
+    (half of the expected duration) has elapsed.
+    """
+    # When sleeping is disabled (e.g. in unit tests), steps take no real time
+    # and so check() is called at every step.
+    if policy is None or not ENABLE_SLEEP:
+        while not check():
+            yield
+        return
+
+    intervals = policy.intervals(expected_duration)
+    done = False if expected_duration else check()
+    while not done:
+        next_poll = wallclock() + next(intervals)
+        yield
+        while wallclock() < next_poll:
+            yield
+        done = check()
+
+
+class TickStats(object):
+    """
+    Timing statistics for the scheduling ticks of a task group.
+
+    A tick is the work done by the task group between being resumed and
+    yielding control again, i.e. starting and stepping its subtasks.
+    """
+
+    def __init__(self):
+        self.ticks = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self._tick_start = None
+
+    def start(self):
+        """Mark the start of a tick."""
+        # Use a separate timer from the one used for timeouts, so that the
+        # statistics don't interfere with tests that stub out wallclock().
+        self._tick_start = time.time()
+
+    def stop(self):
+        """Mark the end of a tick and record its duration."""
+        if self._tick_start is None:
+            return
+
+        elapsed = time.time() - self._tick_start
+        self._tick_start = None
+
+        self.ticks += 1
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+
+    def mean_time(self):
+        """Return the mean duration of a tick in seconds."""
+        if not self.ticks:
+            return 0.0
+        return self.total_time / self.ticks
+
+    def to_dict(self):
+        return {'ticks': self.ticks,
+                'total_time': self.total_time,
+                'mean_time': self.mean_time(),
+                'max_time': self.max_time}
+
+    def __str__(self):
+        return ('%(ticks)d ticks, %(total_time).3fs total, '
+                '%(mean_time).3fs mean, %(max_time).3fs max' % self.to_dict())
+
+
+class SlotPool(object):
+    """
+    A pool of slots limiting the number of subtasks that may run concurrently
+    across a number of task groups (e.g. all of the stacks in an engine).
+
+    Slots are shared fairly between the task groups using the pool: a group
+    that already holds its fair share of the slots may not take another while
+    other groups are waiting for one.
+
+    A subtask holding a slot must not wait for a subtask in another group that
+    needs a slot from the same pool, or the two groups could deadlock.
+    """
+
+    def __init__(self, size=None):
+        """
+        Initialise with the number of slots available. If size is None or 0,
+        the number of concurrent subtasks is unlimited.
+        """
+        self.size = size
+        self._held = {}
+        self._waiting = set()
+        self._in_use = 0
+
+    def in_use(self):
+        """Return the number of slots currently held."""
+        return self._in_use
+
+    def held(self, owner):
+        """Return the number of slots currently held by the given owner."""
+        return self._held.get(owner, 0)
+
+    def _fair_share(self, owner):
+        others = len(self._waiting) - (owner in self._waiting)
+        if not others:
+            return True
+        return self.held(owner) < max(1, self.size // (others + 1))
+
+    def acquire(self, owner):
+        """
+        Try to take a slot for the given owner, and return True if successful.
+
+        If no slot is available, the owner is registered as waiting for one
+        until it either succeeds in acquiring a slot or withdraws.
+        """
+        if self.size:
+            if self._in_use >= self.size or not self._fair_share(owner):
+                self._waiting.add(owner)
+                return False
+
+        self._waiting.discard(owner)
+        self._held[owner] = self.held(owner) + 1
+        self._in_use += 1
+        return True
+
+    def withdraw(self, owner):
+        """Stop the given owner waiting for a slot."""
+        self._waiting.discard(owner)
+
+    def release(self, owner):
+        """Return a slot held by the given owner to the pool."""
+        held = self.held(owner)
+        if not held:
+            return
+
+        if held > 1:
+            self._held[owner] = held - 1
+        else:
+            del self._held[owner]
+        self._in_use -= 1
+
+    def release_all(self, owner):
+        """Return all of the slots held by the given owner to the pool."""
+        self._in_use -= self._held.pop(owner, 0)
+        self._waiting.discard(owner)
+
+
 class DependencyTaskGroup(object):
     """
     A task which manages a group of subtasks that have ordering dependencies.
+
+    Rather than rescanning the whole dependency graph on every step, the
+    number of outstanding requirements of each subtask is tracked, so that
+    completing a subtask only touches the subtasks that directly require it.
     """
 
     def __init__(self, dependencies, task=lambda o: o(),
-                 reverse=False, name=None, aggregate_exceptions=False):
+                 reverse=False, name=None, aggregate_exceptions=False,
+                 max_concurrency=None, slot_pool=None,
+                 needs_slot=lambda o: True):
         """
         Initialise with the task dependencies and (optionally) a task to run on
         each.
@@ -306,10 +506,24 @@ class DependencyTaskGroup(object):
         If aggregate_exceptions is set to True, then all the tasks will be run
         and any raised exceptions will be stored to be re-raised after all
         tasks are done.
+
+        If max_concurrency is set, no more than that number of subtasks will
+        be run at the same time. If a SlotPool is supplied, each subtask for
+        which needs_slot returns True must also acquire a slot from it before
+        being started.
         """
         self._runners = dict((o, TaskRunner(task, o)) for o in dependencies)
         self._graph = dependencies.graph(reverse=reverse)
         self.aggregate_exceptions = aggregate_exceptions
+        self.max_concurrency = max_concurrency
+        self._slot_pool = slot_pool
+        self._needs_slot = needs_slot
+
+        self._indegree = dict((k, len(n)) for k, n in self._graph.iteritems())
+        self._ready = collections.deque(
+            k for k, n in self._indegree.iteritems() if not n)
+        self._running = {}
+        self.stats = TickStats()
 
         if name is None:
             name = '(%s) %s' % (getattr(task, '__name__',
@@ -324,17 +538,24 @@ class DependencyTaskGroup(object):
     def __call__(self):
         """Return a co-routine which runs the task group."""
         raised_exceptions = []
+        self.stats.start()
         try:
-            while any(self._runners.itervalues()):
+            while self._ready or self._running:
                 try:
-                    for k, r in self._ready():
+                    k = self._next_startable()
+                    while k is not None:
+                        r = self._runners[k]
+                        self._running[k] = r
                         r.start()
+                        k = self._next_startable()
 
+                    self.stats.stop()
                     yield
+                    self.stats.start()
 
-                    for k, r in self._running():
+                    for k, r in self._running.items():
                         if r.step():
-                            del self._graph[k]
+                            self._complete(k)
                 except Exception as e:
                     self._cancel_recursively(k, r)
                     if not self.aggregate_exceptions:
@@ -344,37 +565,68 @@ class DependencyTaskGroup(object):
             with excutils.save_and_reraise_exception():
                 for r in self._runners.itervalues():
                     r.cancel()
+        finally:
+            if self._slot_pool is not None:
+                self._slot_pool.release_all(self)
+            self.stats.stop()
+            logger.debug(_('%(task)s scheduling: %(stats)s') %
+                         {'task': str(self), 'stats': str(self.stats)})
 
         if raised_exceptions:
             raise ExceptionGroup(raised_exceptions)
 
-    def _cancel_recursively(self, key, runner):
-        runner.cancel()
-        node = self._graph[key]
-        for dependent_node in node.required_by():
-            node_runner = self._runners[dependent_node]
-            self._cancel_recursively(dependent_node, node_runner)
-
-        del self._graph[key]
-
-    def _ready(self):
+    def _next_startable(self):
         """
-        Iterate over all subtasks that are ready to start - i.e. all their
-        dependencies have been satisfied but they have not yet been started.
+        Remove and return the first subtask that is ready to run and may be
+        started now, taking a slot from the slot pool (if any) for it. Return
+        None if there is no such subtask.
         """
-        for k, n in self._graph.iteritems():
-            if not n:
-                runner = self._runners[k]
-                if not runner.started():
-                    yield k, runner
-
-    def _running(self):
+        if (self.max_concurrency and
+                len(self._running) >= self.max_concurrency):
+            if self._slot_pool is not None:
+                self._slot_pool.withdraw(self)
+            return None
+
+        pool_full = False
+        for i, k in enumerate(self._ready):
+            if self._slot_pool is not None and self._needs_slot(k):
+                # Subtasks that need no slot may still be started
+                if pool_full or not self._slot_pool.acquire(self):
+                    pool_full = True
+                    continue
+            del self._ready[i]
+            return k
+        return None
+
+    def _release_slot(self, key):
+        """Release the slot (if any) held by a running subtask."""
+        if self._running.pop(key, None) is not None:
+            if self._slot_pool is not None and self._needs_slot(key):
+                self._slot_pool.release(self)
+
+    def _complete(self, key):
         """
-        Iterate over all subtasks that are currently running - i.e. they have
-        been started but have not yet completed.
+        Mark a subtask as complete, and queue any subtasks that require it and
+        now have all of their requirements satisfied.
         """
-        running = lambda (k, r): k in self._graph and r.started()
-        return itertools.ifilter(running, self._runners.iteritems())
+        self._release_slot(key)
+
+        for dependent in self._graph[key].required_by():
+            if self._runners[dependent].done():
+                # Already cancelled
+                continue
+            self._indegree[dependent] -= 1
+            if not self._indegree[dependent]:
+                self._ready.append(dependent)
+
+    def _cancel_recursively(self, key, runner):
+        runner.cancel()
+        self._release_slot(key)
+
+        for dependent in self._graph[key].required_by():
+            dependent_runner = self._runners[dependent]
+            if not dependent_runner.done():
+                self._cancel_recursively(dependent, dependent_runner)
 
 
 class PollingTaskGroup(object):
@@ -14,6 +14,7 @@
 #    under the License.
 
 import functools
+import hashlib
 import json
 
 from oslo.config import cfg
@@ -21,6 +22,8 @@ import webob
 
 cfg.CONF.import_opt('max_resources_per_stack', 'heat.common.config')
 cfg.CONF.import_opt('max_stacks_per_tenant', 'heat.common.config')
+cfg.CONF.import_opt('num_engine_workers', 'heat.common.config')
+cfg.CONF.import_opt('user_creds_cache_size', 'heat.common.config')
 
 from heat.openstack.common import timeutils
 from heat.common import context
@@ -29,23 +32,29 @@ from heat.engine import api
 from heat.rpc import api as rpc_api
 from heat.engine import attributes
 from heat.engine import clients
+from heat.engine import event
 from heat.engine.event import Event
 from heat.engine import environment
 from heat.common import exception
 from heat.common import identifier
 from heat.common import heat_keystoneclient as hkc
+from heat.common import lru_cache
+from heat.common import urlfetch
 from heat.engine import parser
 from heat.engine import properties
 from heat.engine import resource
 from heat.engine import resources
+from heat.engine.resources import wait_condition
 from heat.engine import stack_lock
 from heat.engine import watchrule
 
 from heat.openstack.common import log as logging
 from heat.openstack.common import threadgroup
 from heat.openstack.common.gettextutils import _
+from heat.openstack.common.rpc import proxy
 from heat.openstack.common.rpc import service
 from heat.openstack.common.rpc import common as rpc_common
+from heat.openstack.common.rpc import dispatcher as rpc_dispatcher
 from heat.openstack.common import excutils
 from heat.openstack.common import uuidutils
 
@@ -147,12 +156,37 @@ class ThreadGroupManager(object):
         self.groups[stack_id].add_timer(cfg.CONF.periodic_interval,
                                         func, *args, **kwargs)
 
+    def stop(self, stack_id):
+        """
+        Stop any threads and timers running for the given stack. Locks held
+        by the threads are released as they exit.
+        """
+        if stack_id in self.groups:
+            self.groups.pop(stack_id).stop()
+
 
 class EngineListener(service.Service):
     '''
     Listen on an AMQP queue while a stack action is in-progress and
     respond to stack-related questions.  Used for multi-engine support.
     '''
+    def __init__(self, host, engine_id, thread_group_mgr,
+                 worker_topic=None, watch_task_starter=None):
+        super(EngineListener, self).__init__(host, engine_id)
+        self.thread_group_mgr = thread_group_mgr
+        self.worker_topic = worker_topic
+        self.watch_task_starter = watch_task_starter
+
+    def initialize_service_hook(self, service):
+        '''
+        Also listen on the topic of this engine worker, so that the other
+        workers on this host can hand it the stacks it watches.
+        '''
+        if self.worker_topic is not None:
+            dispatcher = rpc_dispatcher.RpcDispatcher([self])
+            self.conn.create_consumer(self.worker_topic, dispatcher,
+                                      fanout=False)
+
     def listening(self, ctxt):
         '''
         Respond affirmatively to confirm that the engine performing the
@@ -160,6 +194,28 @@ class EngineListener(service.Service):
         '''
         return True
 
+    def metadata_updated(self, ctxt, resource_id):
+        '''
+        Notify any WaitConditions waiting in this engine that the handle
+        with the given resource ID has been signalled.
+        '''
+        wait_condition.notify_signal(resource_id)
+
+    def stop_stack(self, ctxt, stack_id):
+        '''
+        Stop any action on the given stack that is in progress in this
+        engine, e.g. because the parent of a nested stack has given up on it.
+        '''
+        self.thread_group_mgr.stop(stack_id)
+
+    def start_watch_task(self, ctxt, stack_id):
+        '''
+        Start the periodic watcher task for a stack that was created by
+        another engine worker but is watched by this one.
+        '''
+        if self.watch_task_starter is not None:
+            self.watch_task_starter(stack_id, context.get_admin_context())
+
 
 class EngineService(service.Service):
     """
@@ -174,15 +230,17 @@ class EngineService(service.Service):
 
     RPC_API_VERSION = '1.1'
 
-    def __init__(self, host, topic, manager=None):
+    def __init__(self, host, topic, manager=None, worker=0):
         super(EngineService, self).__init__(host, topic)
         resources.initialise()
 
+        self.worker = worker
         self.engine_id = stack_lock.StackLock.generate_engine_id()
         self.thread_group_mgr = ThreadGroupManager()
-        self.listener = EngineListener(host, self.engine_id)
-        logger.debug(_("Starting listener for engine %s") % self.engine_id)
-        self.listener.start()
+        self.listener = None
+        # Decrypted stored credentials, keyed by user_creds_id
+        self._user_creds = lru_cache.LRUCache(
+            lambda: cfg.CONF.user_creds_cache_size)
 
     def _start_watch_task(self, stack_id, cnxt):
 
@@ -211,14 +269,81 @@ class EngineService(service.Service):
                                             self._periodic_watcher_task,
                                             sid=stack_id)
 
+    @staticmethod
+    def _watcher_worker(stack_id):
+        '''
+        Return the index of the engine worker that runs the periodic watcher
+        task for the given stack. When several workers are running, the
+        stacks are divided between them so that each watch rule is only
+        evaluated once.
+        '''
+        workers = cfg.CONF.num_engine_workers
+        if workers <= 1:
+            return 0
+        digest = hashlib.sha1(stack_id.encode('utf-8')).hexdigest()
+        return int(digest, 16) % workers
+
+    def _is_watcher_for(self, stack_id):
+        '''
+        Return True if this engine worker should run the periodic watcher
+        task for the given stack.
+        '''
+        return self._watcher_worker(stack_id) == self.worker
+
+    def _worker_topic(self, worker):
+        return '%s.%s.worker-%d' % (self.topic, self.host, worker)
+
+    def _schedule_watch_task(self, cnxt, stack_id):
+        '''
+        Start the periodic watcher task for a new stack in the engine worker
+        that watches it, which need not be the one that created the stack.
+        '''
+        if self._is_watcher_for(stack_id):
+            self._start_watch_task(stack_id, cnxt)
+            return
+
+        topic = self._worker_topic(self._watcher_worker(stack_id))
+        rpc = proxy.RpcProxy(topic, '1.0')
+        msg = rpc.make_msg('start_watch_task', stack_id=stack_id)
+        try:
+            rpc.cast(cnxt, msg, topic=topic)
+        except Exception as ex:
+            # Better to watch the stack from here than not at all
+            logger.warning(_('Failed to hand stack %(stack)s to engine '
+                             'worker %(topic)s: %(ex)s') %
+                           {'stack': stack_id, 'topic': topic, 'ex': ex})
+            self._start_watch_task(stack_id, cnxt)
+
     def start(self):
+        # When running multiple workers, this is called in each worker
+        # process after it has been forked, so every process (including one
+        # that replaces a worker which died) gets its own engine ID, and
+        # with it its own stack locks and listener.
+        self.engine_id = stack_lock.StackLock.generate_engine_id()
+        self.listener = EngineListener(self.host, self.engine_id,
+                                       self.thread_group_mgr,
+                                       self._worker_topic(self.worker),
+                                       self._start_watch_task)
+        logger.debug(_("Starting listener for engine %s") % self.engine_id)
+        self.listener.start()
+
         super(EngineService, self).start()
+        urlfetch.enable_cache()
 
         # Create a periodic_watcher_task per-stack
         admin_context = context.get_admin_context()
         stacks = db_api.stack_get_all(admin_context)
         for s in stacks:
-            self._start_watch_task(s.id, admin_context)
+            if self._is_watcher_for(s.id):
+                self._start_watch_task(s.id, admin_context)
+
+    def stop(self):
+        if self.listener is not None:
+            self.listener.stop()
+        super(EngineService, self).stop()
+
+        # Write out any events still buffered in this engine
+        event.flush()
 
     @rpc_common.client_exceptions(exception.StackNotFound)
     @request_context
@@ -295,24 +420,13 @@ class EngineService(service.Service):
         :param sort_keys: an array of fields used to sort the list
         :param sort_dir: the direction of the sort ('asc' or 'desc')
         :param filters: a dict with attribute:value to filter the list
-        :returns: a list of formatted stacks
+        :returns: a list of formatted stack summaries
         """
 
-        def format_stack_details(stacks):
-            for s in stacks:
-                try:
-                    stack = parser.Stack.load(cnxt, stack=s,
-                                              resolve_data=False)
-                except exception.NotFound:
-                    # The stack may have been deleted between listing
-                    # and formatting
-                    pass
-                else:
-                    yield api.format_stack(stack)
-
         stacks = db_api.stack_get_all_by_tenant(cnxt, limit, sort_keys, marker,
-                                                sort_dir, filters) or []
-        return list(format_stack_details(stacks))
+                                                sort_dir, filters,
+                                                load_parameters=False) or []
+        return [api.format_stack_summary(s) for s in stacks]
 
     @request_context
     def count_stacks(self, cnxt, filters=None):
@@ -363,7 +477,7 @@ class EngineService(service.Service):
             if (stack.action in (stack.CREATE, stack.ADOPT)
                     and stack.status == stack.COMPLETE):
                 # Schedule a periodic watcher task for this stack
-                self._start_watch_task(stack.id, cnxt)
+                self._schedule_watch_task(cnxt, stack.id)
             else:
                 logger.warning(_("Stack create failed, status %s") %
                                stack.status)
@@ -399,6 +513,74 @@ class EngineService(service.Service):
 
         return dict(stack.identifier())
 
+    def _load_nested_stack(self, cnxt, db_stack):
+        '''
+        Load a stack from the database along with the chain of parent
+        resources that own it, so that limits such as the maximum nesting
+        depth are applied as they would be in the parent's engine.
+        '''
+        if db_stack.owner_id is None:
+            return parser.Stack.load(cnxt, stack=db_stack)
+
+        db_parent = db_api.stack_get(cnxt, db_stack.owner_id)
+        if db_parent is None:
+            raise exception.NotFound(_('Parent of stack %s not found')
+                                     % db_stack.id)
+        parent = self._load_nested_stack(cnxt, db_parent)
+        for rsrc in parent.itervalues():
+            if (rsrc.resource_id == db_stack.id and
+                    hasattr(rsrc, 'nested')):
+                return rsrc.nested()
+
+        raise exception.NotFound(_('No resource in stack %(parent)s owns '
+                                   'stack %(stack)s') %
+                                 {'parent': db_parent.id,
+                                  'stack': db_stack.id})
+
+    @request_context
+    def create_nested_stack(self, cnxt, stack_id):
+        """
+        The create_nested_stack method creates a nested stack that has
+        already been stored by its parent resource, possibly in another
+        engine. The parent resource polls the status of the stack in the
+        database to find out when it is complete.
+
+        :param cnxt: RPC context.
+        :param stack_id: ID of the nested stack to create.
+        """
+        db_stack = db_api.stack_get(cnxt, stack_id)
+        if db_stack is None or db_stack.owner_id is None:
+            raise exception.NotFound(_('Nested stack %s not found')
+                                     % stack_id)
+
+        lock = stack_lock.StackLock(cnxt, db_stack, self.engine_id)
+        lock.acquire()
+        try:
+            # Now that the lock is held, the state is up to date
+            db_stack.refresh(attrs=['action', 'status', 'status_reason'])
+            if db_stack.action is not None:
+                # The parent resource gave up waiting and cancelled the
+                # stack before this message was received
+                logger.info(_('not creating nested stack %(name)s in state '
+                              '%(action)s %(status)s') %
+                            {'name': db_stack.name,
+                             'action': db_stack.action,
+                             'status': db_stack.status})
+                stack = None
+            else:
+                stack = self._load_nested_stack(cnxt, db_stack)
+        except:
+            with excutils.save_and_reraise_exception():
+                lock.release()
+
+        if stack is None:
+            lock.release()
+            return
+
+        logger.info(_('creating nested stack %s') % stack.name)
+        self.thread_group_mgr.start_with_acquired_lock(stack, lock,
+                                                       stack.create)
+
     @request_context
     def update_stack(self, cnxt, stack_identity, template, params,
                      files, args):
@@ -621,32 +803,58 @@ class EngineService(service.Service):
             raise exception.ResourceTypeNotFound(type_name=type_name)
 
     @request_context
-    def list_events(self, cnxt, stack_identity):
+    def list_events(self, cnxt, stack_identity, include_properties=True,
+                    filters=None, limit=None, marker=None, sort_keys=None,
+                    sort_dir=None):
         """
         The list_events method lists all events associated with a given stack.
+        It supports pagination (``limit`` and ``marker``), sorting
+        (``sort_keys`` and ``sort_dir``) and filtering (``filters``) of the
+        results.
 
         :param cnxt: RPC context.
         :param stack_identity: Name of the stack you want to get events for.
+        :param include_properties: whether to include the resource properties
+                                   in the events
+        :param filters: a dict with attribute:value to filter the list
+        :param limit: the number of events to list (integer or string)
+        :param marker: the ID of the last event in the previous page
+        :param sort_keys: an array of fields used to sort the list
+        :param sort_dir: the direction of the sort ('asc' or 'desc')
         """
 
+        # Include any events still buffered in this engine
+        event.flush()
+
         if stack_identity is not None:
             st = self._get_stack(cnxt, stack_identity, show_deleted=True)
 
-            events = db_api.event_get_all_by_stack(cnxt, st.id)
+            events = db_api.event_get_all_by_stack(
+                cnxt, st.id, limit, marker, sort_keys, sort_dir, filters,
+                load_properties=include_properties)
         else:
-            events = db_api.event_get_all_by_tenant(cnxt)
+            events = db_api.event_get_all_by_tenant(
+                cnxt, limit, marker, sort_keys, sort_dir, filters,
+                load_properties=include_properties)
 
-        stacks = {}
+        # Build the stack identifiers from the database rows, rather than
+        # loading every stack just to format its events
+        stack_identifiers = {}
 
-        def get_stack(stack_id):
-            if stack_id not in stacks:
-                stacks[stack_id] = parser.Stack.load(cnxt, stack_id)
-            return stacks[stack_id]
+        def get_stack_identifier(db_event):
+            if db_event.stack_id not in stack_identifiers:
+                db_stack = db_event.stack
+                stack_identifiers[db_event.stack_id] = \
+                    identifier.HeatIdentifier(cnxt.tenant_id,
+                                              db_stack.name, db_stack.id)
+            return stack_identifiers[db_event.stack_id]
 
-        return [api.format_event(Event.load(cnxt,
-                                            e.id, e,
-                                            get_stack(e.stack_id)))
-                for e in events]
+        def format_event(db_event):
+            ev = Event.load(cnxt, db_event.id, db_event,
+                            load_properties=include_properties)
+            return api.format_event(ev, get_stack_identifier(db_event))
+
+        return [format_event(e) for e in events]
 
     def _authorize_stack_user(self, cnxt, stack, resource_name):
         '''
@@ -780,14 +988,40 @@ class EngineService(service.Service):
                                               _stack_resume, stack)
 
     def _load_user_creds(self, creds_id):
-        user_creds = db_api.user_creds_get(creds_id)
+        user_creds = self._user_creds.get(creds_id)
+        if user_creds is None:
+            user_creds = db_api.user_creds_get(creds_id)
+            self._user_creds.put(creds_id, user_creds)
         stored_context = context.RequestContext.from_dict(user_creds)
         # heat_keystoneclient populates the context with an auth_token
         # either via the stored user/password or trust_id, depending
-        # on how deferred_auth_method is configured in the conf file
+        # on how deferred_auth_method is configured in the conf file. A
+        # trust-scoped token is reused until shortly before it expires.
         hkc.KeystoneClient(stored_context)
         return stored_context
 
+    def _notify_metadata_updated(self, cnxt, stack_id, resource_id):
+        '''
+        Notify the engine acting on a stack that the metadata of one of its
+        resources has been updated, so that a WaitCondition waiting for it
+        need not poll the database. WaitConditions in this engine have
+        already been notified by the resource itself.
+        '''
+        engine_id = stack_lock.StackLock.get_engine_id(cnxt, stack_id)
+        if engine_id is None or engine_id == self.engine_id:
+            return
+
+        rpc = proxy.RpcProxy(engine_id, '1.0')
+        msg = rpc.make_msg('metadata_updated', resource_id=resource_id)
+        try:
+            rpc.cast(cnxt, msg, topic=engine_id)
+        except Exception as ex:
+            # The WaitCondition will still notice the signal when it next
+            # polls the database
+            logger.warning(_('Failed to notify engine %(engine)s of '
+                             'metadata update: %(err)s') %
+                           {'engine': engine_id, 'err': str(ex)})
+
     @request_context
     def metadata_update(self, cnxt, stack_identity,
                         resource_name, metadata):
@@ -803,21 +1037,24 @@ class EngineService(service.Service):
 
         resource = stack[resource_name]
         resource.metadata_update(new_metadata=metadata)
-
-        # This is not "nice" converting to the stored context here,
-        # but this happens because the keystone user associated with the
-        # WaitCondition doesn't have permission to read the secret key of
-        # the user associated with the cfn-credentials file
-        stack_context = self._load_user_creds(s.user_creds_id)
-        refresh_stack = parser.Stack.load(stack_context, stack=s)
-
-        # Refresh the metadata for all other resources, since we expect
-        # resource_name to be a WaitCondition resource, and other
-        # resources may refer to WaitCondition Fn::GetAtt Data, which
-        # is updated here.
-        for res in refresh_stack.dependencies:
-            if res.name != resource_name and res.id is not None:
-                res.metadata_update()
+        self._notify_metadata_updated(cnxt, s.id, resource.id)
+
+        # Refresh the metadata of the other resources which refer to this
+        # one in their Metadata, since we expect resource_name to be a
+        # WaitCondition handle, and other resources may refer to the
+        # WaitCondition's Fn::GetAtt Data, which is updated here.
+        dependents = stack.t.metadata_dependents(resource_name)
+        if dependents:
+            # This is not "nice" converting to the stored context here,
+            # but this happens because the keystone user associated with the
+            # WaitCondition doesn't have permission to read the secret key of
+            # the user associated with the cfn-credentials file
+            stack_context = self._load_user_creds(s.user_creds_id)
+            refresh_stack = parser.Stack.load(stack_context, stack=s)
+
+            for res in refresh_stack.dependencies:
+                if res.name in dependents and res.id is not None:
+                    res.metadata_update()
 
         return resource.metadata
 
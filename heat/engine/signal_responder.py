@@ -18,7 +18,6 @@ from oslo.config import cfg
 from keystoneclient.contrib.ec2 import utils as ec2_utils
 import keystoneclient.exceptions as kc_exception
 
-from heat.db import api as db_api
 from heat.common import exception
 from heat.engine import resource
 
@@ -49,30 +48,26 @@ class SignalResponder(resource.Resource):
         user_id = self.keystone().create_stack_user(
             self.physical_resource_name())
 
-        db_api.resource_data_set(self, 'user_id', user_id)
+        self.data.set('user_id', user_id)
 
         kp = self.keystone().create_ec2_keypair(user_id)
         if not kp:
             raise exception.Error(_("Error creating ec2 keypair for user %s") %
                                   user_id)
         else:
-            db_api.resource_data_set(self, 'credential_id', kp.id,
-                                     redact=True)
-            db_api.resource_data_set(self, 'access_key', kp.access,
-                                     redact=True)
-            db_api.resource_data_set(self, 'secret_key', kp.secret,
-                                     redact=True)
+            self.data.update({'credential_id': kp.id,
+                              'access_key': kp.access,
+                              'secret_key': kp.secret}, redact=True)
 
     def _get_user_id(self):
-        try:
-            return db_api.resource_data_get(self, 'user_id')
-        except exception.NotFound:
-            # Assume this is a resource that was created with
-            # a previous version of heat and that the resource_id
-            # is the user_id
-            if self.resource_id:
-                db_api.resource_data_set(self, 'user_id', self.resource_id)
-                return self.resource_id
+        if 'user_id' in self.data:
+            return self.data['user_id']
+        # Assume this is a resource that was created with
+        # a previous version of heat and that the resource_id
+        # is the user_id
+        if self.resource_id:
+            self.data.set('user_id', self.resource_id)
+            return self.resource_id
 
     def handle_delete(self):
         user_id = self._get_user_id()
@@ -84,10 +79,11 @@ class SignalResponder(resource.Resource):
             pass
         for data_key in ('ec2_signed_url', 'access_key', 'secret_key',
                          'credential_id'):
-            try:
-                db_api.resource_data_delete(self, data_key)
-            except exception.NotFound:
-                pass
+            if data_key in self.data:
+                try:
+                    self.data.delete(data_key)
+                except exception.NotFound:
+                    pass
 
     def _get_signed_url(self, signal_type=SIGNAL):
         """Create properly formatted and pre-signed URL.
@@ -98,17 +94,14 @@ class SignalResponder(resource.Resource):
 
         :param signal_type: either WAITCONDITION or SIGNAL.
         """
-        try:
-            stored = db_api.resource_data_get(self, 'ec2_signed_url')
-        except exception.NotFound:
-            stored = None
+        stored = self.data.get('ec2_signed_url')
         if stored is not None:
             return stored
 
         try:
-            access_key = db_api.resource_data_get(self, 'access_key')
-            secret_key = db_api.resource_data_get(self, 'secret_key')
-        except exception.NotFound:
+            access_key = self.data['access_key']
+            secret_key = self.data['secret_key']
+        except KeyError:
             logger.warning(_('Cannot generate signed url, '
                              'no stored access/secret key'))
             return
@@ -141,5 +134,5 @@ class SignalResponder(resource.Resource):
         url = "%s%s?%s" % (signal_url.lower(),
                            path, qs)
 
-        db_api.resource_data_set(self, 'ec2_signed_url', url)
+        self.data.set('ec2_signed_url', url)
         return url
@@ -48,6 +48,20 @@ class StackLock(object):
     def generate_engine_id():
         return str(uuid.uuid4())
 
+    @staticmethod
+    def get_engine_id(context, stack_id):
+        '''
+        Return the ID of the engine holding the lock on a stack, or on the
+        nearest stack that owns it if a nested stack is not itself locked.
+        Return None if no lock is held.
+        '''
+        while stack_id is not None:
+            engine_id = db_api.stack_lock_get_engine_id(stack_id)
+            if engine_id is not None:
+                return engine_id
+            db_stack = db_api.stack_get(context, stack_id)
+            stack_id = db_stack.owner_id if db_stack is not None else None
+
     @rpc_common.client_exceptions(exception.ActionInProgress)
     def acquire(self, retry=True):
         """
@@ -102,6 +116,29 @@ class StackLock(object):
             raise exception.ActionInProgress(
                 stack_name=self.stack.name, action=self.stack.action)
 
+    def _stop_engine_action(self, engine_id):
+        topic = engine_id
+        rpc = proxy.RpcProxy(topic, "1.0")
+        msg = rpc.make_msg("stop_stack", stack_id=self.stack.id)
+        try:
+            rpc.call(self.context, msg, topic=topic,
+                     timeout=cfg.CONF.engine_life_check_timeout)
+        except rpc_common.Timeout:
+            # The engine is no longer alive, so acquire() will steal its lock
+            logger.info(_("Engine %(engine)s did not stop acting on stack "
+                          "%(stack)s") % {'engine': engine_id,
+                                          'stack': self.stack.id})
+
+    def take_over(self):
+        """
+        Acquire a lock on the stack, first asking the engine that holds it
+        (if any) to stop whatever action it is performing on the stack.
+        """
+        lock_engine_id = db_api.stack_lock_get_engine_id(self.stack.id)
+        if lock_engine_id is not None:
+            self._stop_engine_action(lock_engine_id)
+        self.acquire()
+
     def release(self):
         """Release a stack lock."""
         # Only the engine that owns the lock will be releasing it.
@@ -16,17 +16,94 @@
 from oslo.config import cfg
 
 from heat.common import exception
+from heat.db import api as db_api
 from heat.engine import attributes
 from heat.engine import environment
 from heat.engine import parser
 from heat.engine import resource
 from heat.engine import scheduler
+from heat.engine import stack_lock
+from heat.rpc import client as rpc_client
 
 from heat.openstack.common import log as logging
 from heat.openstack.common.gettextutils import _
+from heat.openstack.common import timeutils
 
 logger = logging.getLogger(__name__)
 
+cfg.CONF.import_opt('dispatch_nested_stacks', 'heat.common.config')
+cfg.CONF.import_opt('nested_stack_dispatch_timeout', 'heat.common.config')
+
+
+class NestedStackPoller(object):
+    '''
+    Track an action on a nested stack that is being performed by another
+    engine, by polling the status of the nested stack in the database.
+
+    If no engine has started the action within nested_stack_dispatch_timeout
+    seconds, e.g. because the message was lost or the receiving engine could
+    not load the stack, the nested stack is cancelled.
+    '''
+
+    def __init__(self, stack_resource, action):
+        self.stack_resource = stack_resource
+        self.action = action
+        self.dispatched_at = timeutils.utcnow_ts()
+
+    def _db_stack(self):
+        rsrc = self.stack_resource
+        db_stack = db_api.stack_get(rsrc.context, rsrc.resource_id)
+        if db_stack is None:
+            raise exception.NotFound(_('Nested stack not found in DB'))
+        # The stack may be cached in the session, so get the latest status
+        db_stack.refresh(attrs=['action', 'status', 'status_reason'])
+        return db_stack
+
+    def step(self):
+        '''
+        Return True once the action on the nested stack has finished.
+
+        When it has, the nested stack is reloaded from the database so that
+        its final state may be inspected.
+        '''
+        db_stack = self._db_stack()
+
+        if db_stack.action != self.action:
+            waited = timeutils.utcnow_ts() - self.dispatched_at
+            if waited > cfg.CONF.nested_stack_dispatch_timeout:
+                self.cancel()
+                raise exception.Error(_('No engine started to %(action)s '
+                                        'the nested stack within %(secs)d '
+                                        'seconds') %
+                                      {'action': self.action.lower(),
+                                       'secs': waited})
+            return False
+
+        if db_stack.status == parser.Stack.IN_PROGRESS:
+            return False
+
+        rsrc = self.stack_resource
+        rsrc._nested = None
+        rsrc.nested()
+        return True
+
+    def cancel(self):
+        '''
+        Stop the action on the nested stack, in whichever engine it is
+        running, and mark the nested stack as failed unless it has finished.
+        '''
+        rsrc = self.stack_resource
+        rsrc._nested = None
+        lock = rsrc._lock_nested(rsrc.nested())
+        try:
+            db_stack = self._db_stack()
+            if db_stack.status in (None, parser.Stack.IN_PROGRESS):
+                rsrc.nested().state_set(self.action, parser.Stack.FAILED,
+                                        'Nested stack %s cancelled' %
+                                        self.action.lower())
+        finally:
+            lock.release()
+
 
 class StackResource(resource.Resource):
     '''
@@ -39,6 +116,10 @@ class StackResource(resource.Resource):
     # template parsing.
     requires_deferred_auth = True
 
+    # Actions on the nested stack's resources are limited instead, so that
+    # this resource never holds a slot they are waiting for
+    uses_resource_action_slot = False
+
     def __init__(self, name, json_snippet, stack):
         super(StackResource, self).__init__(name, json_snippet, stack)
         self._nested = None
@@ -108,12 +189,19 @@ class StackResource(resource.Resource):
         action = self._nested.CREATE
         if adopt_data:
             action = self._nested.ADOPT
+        elif cfg.CONF.dispatch_nested_stacks:
+            rpc_client.EngineClient().create_nested_stack(self.context,
+                                                          nested_id)
+            return NestedStackPoller(self, action)
 
         stack_creator = scheduler.TaskRunner(self._nested.stack_task,
                                              action=action)
         stack_creator.start(timeout=self._nested.timeout_secs())
         return stack_creator
 
+    def handle_create_cancel(self, stack_creator):
+        stack_creator.cancel()
+
     def check_create_complete(self, stack_creator):
         done = stack_creator.step()
         if done:
@@ -178,6 +266,23 @@ class StackResource(resource.Resource):
                                   nested_stack.status_reason)
         return True
 
+    def _lock_nested(self, stack):
+        '''
+        Acquire the lock on the nested stack on behalf of the engine acting on
+        the parent stack, first stopping any action on the nested stack that
+        is in progress in another engine. The parent stack must be locked.
+        '''
+        engine_id = stack_lock.StackLock.get_engine_id(self.context,
+                                                       self.stack.id)
+        if engine_id is None:
+            raise exception.Error(_('Cannot lock nested stack %(nested)s, '
+                                    'stack %(stack)s is not locked') %
+                                  {'nested': stack.name,
+                                   'stack': self.stack.name})
+        lock = stack_lock.StackLock(self.context, stack, engine_id)
+        lock.take_over()
+        return lock
+
     def delete_nested(self):
         '''
         Delete the nested stack.
@@ -188,10 +293,25 @@ class StackResource(resource.Resource):
             logger.info(_("Stack not found to delete"))
         else:
             if stack is not None:
-                delete_task = scheduler.TaskRunner(stack.delete)
+                lock = self._lock_nested(stack)
+                delete_task = scheduler.TaskRunner(self._delete_locked,
+                                                   stack, lock)
                 delete_task.start()
                 return delete_task
 
+    def _delete_locked(self, stack, lock):
+        '''
+        Delete the nested stack, holding the given lock on it until the delete
+        is complete, has failed or is cancelled.
+        '''
+        try:
+            delete_task = scheduler.TaskRunner(stack.delete)
+            delete_task.start()
+            while not delete_task.step():
+                yield
+        finally:
+            lock.release()
+
     def check_delete_complete(self, delete_task):
         if delete_task is None:
             return True
@@ -16,11 +16,32 @@
 import collections
 import json
 
+from oslo.config import cfg
+
 from heat.api.aws import utils as aws_utils
 from heat.db import api as db_api
 from heat.common import exception
+from heat.common import lru_cache
 from heat.engine import parameters
 
+cfg.CONF.import_opt('template_cache_size', 'heat.common.config')
+
+
+# Stored templates are never modified, so a parsed template remains valid for
+# as long as it stays in the cache. Its data is shared, read-only, by all of
+# the Templates loaded from it.
+_template_cache = lru_cache.LRUCache(lambda: cfg.CONF.template_cache_size)
+
+# Static data resolved from the sections of a stored template, keyed by the
+# template id and a digest of the stack parameters it was resolved against.
+_static_data_cache = lru_cache.LRUCache(lambda: cfg.CONF.template_cache_size)
+
+
+def clear_caches():
+    '''Discard all cached templates and resolved static data.'''
+    _template_cache.clear()
+    _static_data_cache.clear()
+
 
 class Template(collections.Mapping):
     '''A stack template.'''
@@ -51,13 +72,26 @@ class Template(collections.Mapping):
         self.id = template_id
         self.t = template
         self.files = files or {}
+        # Data derived from the template as stored, which may be shared
+        # between the Templates loaded from the same stored template
+        self._parsed = {}
         self.maps = self[self.MAPPINGS]
 
     @classmethod
     def load(cls, context, template_id):
         '''Retrieve a Template with the given ID from the database.'''
-        t = db_api.raw_template_get(context, template_id)
-        return cls(t.template, template_id)
+        cached = _template_cache.get(template_id)
+        if cached is None:
+            t = db_api.raw_template_get(context, template_id)
+            cached = cls(t.template, template_id)
+            _template_cache.put(template_id, cached)
+
+        # The template data and everything derived from it are shared with
+        # the other Templates loaded from the cache, so must not be modified
+        # in place. Only the files dict belongs to each caller.
+        tmpl = type(cached)(cached.t, cached.id)
+        tmpl._parsed = cached._parsed
+        return tmpl
 
     def store(self, context=None):
         '''Store the Template in the database and return its ID.'''
@@ -85,6 +119,91 @@ class Template(collections.Mapping):
 
         return self.t.get(section, default)
 
+    def static_data_cache(self, params_key, snippet):
+        '''
+        Return a (cache, key) pair, giving the dict in which the static
+        resolution of a snippet against the given parameters may be memoised
+        and the key under which to store it, or None if it may not be.
+
+        Only the resource definitions and outputs of a stored template are
+        memoised, and only when the template does not use any functions
+        (Fn::GetAZs, Fn::ResourceFacade) whose result can change while the
+        template and parameters stay the same. Since snippets may be changed
+        in place, the memoised data must be stored along with a copy of the
+        snippet it was resolved from, and only used while they are equal.
+        '''
+        if self.id is None:
+            return None
+
+        if 'dynamic' not in self._parsed:
+            dynamic = ('Fn::GetAZs', 'Fn::ResourceFacade')
+            raw = json.dumps(self.t)
+            self._parsed['dynamic'] = any(fn in raw for fn in dynamic)
+        if self._parsed['dynamic']:
+            return None
+
+        if 'snippet_keys' not in self._parsed:
+            snippet_keys = dict(
+                (id(definition), (self.RESOURCES, name))
+                for name, definition in self[self.RESOURCES].items())
+            snippet_keys[id(self[self.OUTPUTS])] = (self.OUTPUTS,)
+            self._parsed['snippet_keys'] = snippet_keys
+
+        snippet_key = self._parsed['snippet_keys'].get(id(snippet))
+        if snippet_key is None:
+            return None
+
+        key = (self.id, params_key)
+        cache = _static_data_cache.get(key)
+        if cache is None:
+            cache = {}
+            _static_data_cache.put(key, cache)
+        return cache, snippet_key
+
+    def resource_references(self, resource_name):
+        '''
+        Return the references to other resources in the definition of the
+        named resource, as (function, resource name, path) tuples, or None
+        if the name of any referenced resource is given by a function (and
+        so is only known once the definition is resolved).
+
+        The index of references is built once for the whole template.
+        '''
+        def references(name, definition):
+            refs = tuple(dependency_references(name, definition))
+            if all(isinstance(res, basestring) for key, res, path in refs):
+                return refs
+            return None
+
+        if 'references' not in self._parsed:
+            self._parsed['references'] = dict(
+                (name, references(name, definition))
+                for name, definition in self[self.RESOURCES].items())
+        return self._parsed['references'][resource_name]
+
+    def metadata_dependents(self, resource_name):
+        '''
+        Return the names of the resources whose Metadata refers to the named
+        resource, either directly or through another resource that refers
+        to it (as a WaitCondition refers to its handle).
+        '''
+        resources = self[self.RESOURCES]
+        targets = set([resource_name])
+        targets.update(name for name in resources
+                       if any(target == resource_name for key, target, path
+                              in self.resource_references(name)))
+
+        def in_metadata(name, path):
+            prefix = '%s.Metadata' % name
+            return (path == prefix or
+                    path.startswith((prefix + '.', prefix + '[')))
+
+        return set(name for name in resources
+                   if name != resource_name and
+                   any(target in targets and in_metadata(name, path)
+                       for key, target, path
+                       in self.resource_references(name)))
+
     def __iter__(self):
         '''Return an iterator over the section names.'''
         return (s for s in self.SECTIONS
@@ -108,7 +227,8 @@ class Template(collections.Mapping):
                 raise KeyError(str(ex))
 
         return _resolve(lambda k, v: k == 'Fn::FindInMap',
-                        handle_find_in_map, s, transform)
+                        handle_find_in_map, s, transform,
+                        keys=('Fn::FindInMap',))
 
     @staticmethod
     def resolve_availability_zones(s, stack, transform=None):
@@ -125,7 +245,8 @@ class Template(collections.Mapping):
             else:
                 return stack.get_availability_zones()
 
-        return _resolve(match_get_az, handle_get_az, s, transform)
+        return _resolve(match_get_az, handle_get_az, s, transform,
+                        keys=('Fn::GetAZs',))
 
     @staticmethod
     def resolve_param_refs(s, params, transform=None):
@@ -143,7 +264,8 @@ class Template(collections.Mapping):
             except (KeyError, ValueError):
                 raise exception.UserParameterMissing(key=ref)
 
-        return _resolve(match_param_ref, handle_param_ref, s, transform)
+        return _resolve(match_param_ref, handle_param_ref, s, transform,
+                        keys=('Ref',))
 
     @staticmethod
     def resolve_resource_refs(s, resources, transform=None):
@@ -156,7 +278,8 @@ class Template(collections.Mapping):
         def handle_resource_ref(arg):
             return resources[arg].FnGetRefId()
 
-        return _resolve(match_resource_ref, handle_resource_ref, s, transform)
+        return _resolve(match_resource_ref, handle_resource_ref, s, transform,
+                        keys=('Ref',))
 
     @staticmethod
     def resolve_attributes(s, resources, transform=None):
@@ -181,7 +304,7 @@ class Template(collections.Mapping):
                                                          key=att)
 
         return _resolve(lambda k, v: k == 'Fn::GetAtt', handle_getatt, s,
-                        transform)
+                        transform, keys=('Fn::GetAtt',))
 
     @staticmethod
     def reduce_joins(s, transform=None):
@@ -221,7 +344,7 @@ class Template(collections.Mapping):
             return {'Fn::Join': [delim, reduced]}
 
         return _resolve(lambda k, v: k == 'Fn::Join', handle_join, s,
-                        transform)
+                        transform, keys=('Fn::Join',))
 
     @staticmethod
     def resolve_select(s, transform=None):
@@ -288,7 +411,7 @@ class Template(collections.Mapping):
             raise TypeError(_('Arguments to "Fn::Select" not fully resolved'))
 
         return _resolve(lambda k, v: k == 'Fn::Select', handle_select, s,
-                        transform)
+                        transform, keys=('Fn::Select',))
 
     @staticmethod
     def resolve_joins(s, transform=None):
@@ -321,7 +444,7 @@ class Template(collections.Mapping):
             return delim.join(empty_for_none(value) for value in strings)
 
         return _resolve(lambda k, v: k == 'Fn::Join', handle_join, s,
-                        transform)
+                        transform, keys=('Fn::Join',))
 
     @staticmethod
     def resolve_split(s, transform=None):
@@ -348,7 +471,7 @@ class Template(collections.Mapping):
                                 example)
             return strings.split(delim)
         return _resolve(lambda k, v: k == 'Fn::Split', handle_split, s,
-                        transform)
+                        transform, keys=('Fn::Split',))
 
     @staticmethod
     def resolve_replace(s, transform=None):
@@ -397,7 +520,7 @@ class Template(collections.Mapping):
             return string
 
         return _resolve(lambda k, v: k == 'Fn::Replace', handle_replace, s,
-                        transform)
+                        transform, keys=('Fn::Replace',))
 
     @staticmethod
     def resolve_base64(s, transform=None):
@@ -411,7 +534,7 @@ class Template(collections.Mapping):
             return string
 
         return _resolve(lambda k, v: k == 'Fn::Base64', handle_base64, s,
-                        transform)
+                        transform, keys=('Fn::Base64',))
 
     @staticmethod
     def resolve_member_list_to_map(s, transform=None):
@@ -451,7 +574,8 @@ class Template(collections.Mapping):
                                                  valuename=args[1])
 
         return _resolve(lambda k, v: k == 'Fn::MemberListToMap',
-                        handle_member_list_to_map, s, transform)
+                        handle_member_list_to_map, s, transform,
+                        keys=('Fn::MemberListToMap',))
 
     @staticmethod
     def resolve_resource_facade(s, stack, transform=None):
@@ -476,7 +600,7 @@ class Template(collections.Mapping):
 
         return _resolve(lambda k, v: k == 'Fn::ResourceFacade',
                         handle_resource_facade,
-                        s, transform)
+                        s, transform, keys=('Fn::ResourceFacade',))
 
     def param_schemata(self):
         params = self.t.get(self.PARAMETERS, {}).iteritems()
@@ -489,7 +613,82 @@ class Template(collections.Mapping):
                                      validate_value=validate_value)
 
 
-def _resolve(match, handle, snippet, transform=None):
+DEPENDENCY_KEYS = ('DependsOn', 'Ref', 'Fn::GetAtt', 'get_attr',
+                   'get_resource')
+
+
+def dependency_references(path, fragment):
+    '''
+    Generate a (function, resource name, path) tuple for each reference to
+    a resource in a template snippet, where the path describes the location
+    of the reference within the snippet.
+    '''
+    if isinstance(fragment, dict):
+        for key, value in fragment.items():
+            if key in DEPENDENCY_KEYS:
+                if key in ('Fn::GetAtt', 'get_attr'):
+                    res_list = [value[0]]
+                elif key == 'DependsOn' and isinstance(value, list):
+                    res_list = value
+                else:
+                    res_list = [value]
+
+                for res in res_list:
+                    yield key, res, path
+            else:
+                for ref in dependency_references('%s.%s' % (path, key),
+                                                 value):
+                    yield ref
+    elif isinstance(fragment, list):
+        for index, item in enumerate(fragment):
+            for ref in dependency_references('%s[%d]' % (path, index), item):
+                yield ref
+
+
+class FunctionTable(object):
+    '''
+    A table of the intrinsic functions applied by a list of transformations
+    (such as the resolve_* methods of a Template), keyed by function name.
+
+    This allows a snippet to be resolved in a single walk, rather than with
+    one complete walk (and copy) of the snippet for each transformation.
+    '''
+
+    def __init__(self, transformations):
+        self._functions = collections.defaultdict(list)
+        for t in transformations:
+            # Applying a transformation to the table registers its functions
+            t(self)
+
+    def register(self, match, handle, keys):
+        '''
+        Register the match and handle functions for the given keys. Where more
+        than one function is registered for a key, the first to match is used.
+        '''
+        for key in keys:
+            self._functions[key].append((match, handle))
+
+    def resolve(self, snippet):
+        '''
+        Return a copy of a snippet with all of the registered functions
+        resolved. The arguments to a function are resolved before it is
+        called.
+        '''
+        if isinstance(snippet, dict):
+            if len(snippet) == 1:
+                k, v = next(snippet.iteritems())
+                args = self.resolve(v)
+                for match, handle in self._functions.get(k, []):
+                    if match(k, args):
+                        return handle(args)
+                return {k: args}
+            return dict((k, self.resolve(v)) for k, v in snippet.iteritems())
+        elif isinstance(snippet, list):
+            return [self.resolve(s) for s in snippet]
+        return snippet
+
+
+def _resolve(match, handle, snippet, transform=None, keys=None):
     '''
     Resolve constructs in a snippet of a template. The supplied match function
     should return True if a particular key-value pair should be substituted,
@@ -497,8 +696,12 @@ def _resolve(match, handle, snippet, transform=None):
     the argument list as parameters.
 
     Returns a copy of the original snippet with the substitutions to handle
-    functions performed.
+    functions performed. If the snippet is a FunctionTable, the functions are
+    instead registered with it under the given keys.
     '''
+    if isinstance(snippet, FunctionTable):
+        snippet.register(match, handle, keys)
+        return snippet
 
     recurse = lambda s: _resolve(match, handle, s, transform)
 
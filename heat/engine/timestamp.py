@@ -46,3 +46,35 @@ class Timestamp(object):
             raise exception.ResourceNotAvailable(resource_name=obj.name)
         o = self.db_fetch(obj.context, obj.id)
         o.update_and_save({self.attribute: timestamp})
+
+
+class CachedTimestamp(Timestamp):
+    '''
+    A descriptor for a timestamp which is cached on the object, so that the
+    database need not be accessed every time it is read.
+
+    Writes are cached too, and are recorded in the object's
+    _pending_timestamps dictionary; the object is responsible for writing
+    them to the database the next time it is stored. The object must
+    initialise both the _timestamps cache and _pending_timestamps to empty
+    dictionaries.
+    '''
+
+    def __get__(self, obj, obj_class):
+        '''
+        Get timestamp for the given object and class.
+        '''
+        if obj is None or obj.id is None:
+            return None
+
+        if self.attribute not in obj._timestamps:
+            value = super(CachedTimestamp, self).__get__(obj, obj_class)
+            obj._timestamps[self.attribute] = value
+        return obj._timestamps[self.attribute]
+
+    def __set__(self, obj, timestamp):
+        '''Update the timestamp for the given object.'''
+        if obj.id is None:
+            raise exception.ResourceNotAvailable(resource_name=obj.name)
+        obj._timestamps[self.attribute] = timestamp
+        obj._pending_timestamps[self.attribute] = timestamp
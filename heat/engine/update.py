@@ -57,8 +57,8 @@ class StackUpdate(object):
             self._remove_backup_resource,
             reverse=True)
 
-        update = scheduler.DependencyTaskGroup(self.dependencies(),
-                                               self._resource_update)
+        update = self.existing_stack.resource_action_group(
+            self.dependencies(), self._resource_update)
 
         if not self.rollback:
             yield cleanup_prev()
@@ -181,10 +181,10 @@ class StackUpdate(object):
 
         def edges():
             # Create/update the new stack's resources in create order
-            for e in new_deps.graph().edges():
+            for e in new_deps.edges():
                 yield e
             # Destroy/cleanup the old stack's resources in delete order
-            for e in existing_deps.graph(reverse=True).edges():
+            for e in existing_deps.edges(reverse=True):
                 yield e
             # Don't cleanup old resources until after they have been replaced
             for name, res in self.existing_stack.iteritems():
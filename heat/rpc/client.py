@@ -109,6 +109,18 @@ class EngineClient(heat.openstack.common.rpc.proxy.RpcProxy):
                                        template=template,
                                        params=params, files=files, args=args))
 
+    def create_nested_stack(self, ctxt, stack_id):
+        """
+        The create_nested_stack method creates a nested stack that has
+        already been stored by its parent resource. The message is cast, and
+        the parent resource polls the status of the nested stack.
+
+        :param ctxt: RPC context.
+        :param stack_id: ID of the nested stack to create.
+        """
+        return self.cast(ctxt, self.make_msg('create_nested_stack',
+                                             stack_id=stack_id))
+
     def update_stack(self, ctxt, stack_identity, template, params,
                      files, args):
         """
@@ -215,15 +227,27 @@ class EngineClient(heat.openstack.common.rpc.proxy.RpcProxy):
         return self.call(ctxt, self.make_msg('generate_template',
                                              type_name=type_name))
 
-    def list_events(self, ctxt, stack_identity):
+    def list_events(self, ctxt, stack_identity, include_properties=True,
+                    filters=None, limit=None, marker=None, sort_keys=None,
+                    sort_dir=None):
         """
         The list_events method lists all events associated with a given stack.
 
         :param ctxt: RPC context.
         :param stack_identity: Name of the stack you want to get events for.
+        :param include_properties: whether to include the resource properties
+                                   in the events
+        :param filters: a dict with attribute:value to filter the list
+        :param limit: the number of events to list (integer or string)
+        :param marker: the ID of the last event in the previous page
+        :param sort_keys: an array of fields used to sort the list
+        :param sort_dir: the direction of the sort ('asc' or 'desc')
         """
-        return self.call(ctxt, self.make_msg('list_events',
-                                             stack_identity=stack_identity))
+        return self.call(ctxt, self.make_msg(
+            'list_events', stack_identity=stack_identity,
+            include_properties=include_properties, filters=filters,
+            limit=limit, marker=marker, sort_keys=sort_keys,
+            sort_dir=sort_dir))
 
     def describe_stack_resource(self, ctxt, stack_identity, resource_name):
         """
@@ -29,6 +29,7 @@ from heat.openstack.common.fixture import mockpatch
 from heat.engine import environment
 from heat.engine import resources
 from heat.engine import scheduler
+from heat.engine import template
 
 
 class HeatTestCase(testscenarios.WithScenarios, testtools.TestCase):
@@ -58,7 +59,12 @@ class HeatTestCase(testscenarios.WithScenarios, testtools.TestCase):
         cfg.CONF.set_default('environment_dir', env_dir)
         cfg.CONF.set_override('allowed_rpc_exception_modules',
                               ['heat.common.exception', 'exceptions'])
+        # Write events synchronously, so tests can check for them
+        cfg.CONF.set_override('event_batch_size', 0)
         self.addCleanup(cfg.CONF.reset)
+        # Database ids are reused between tests
+        template.clear_caches()
+        self.addCleanup(template.clear_caches)
 
         tri = resources.global_env().get_resource_info(
             'AWS::RDS::DBInstance',
@@ -20,6 +20,8 @@ properly both upgrading and downgrading, and that no data loss occurs
 if possible.
 """
 
+import cPickle as pickle
+import json
 import os
 import shutil
 import sqlalchemy
@@ -172,3 +174,25 @@ class TestHeatMigrations(test_migrations.BaseMigrationTestCase,
         self.assertColumnExists(engine, 'stack_lock', 'engine_id')
         self.assertColumnExists(engine, 'stack_lock', 'created_at')
         self.assertColumnExists(engine, 'stack_lock', 'updated_at')
+
+    def _pre_upgrade_034(self, engine):
+        event = get_table(engine, 'event')
+        data = [dict(id=str(uuid.uuid4()),
+                     stack_id='967aaefb-152e-405d-b13a-35d4c816390c',
+                     resource_name='res',
+                     resource_properties=pickle.dumps({'Foo': ['bar', 1]})),
+                dict(id=str(uuid.uuid4()),
+                     stack_id='967aaefb-152e-405d-b13a-35d4c816390c',
+                     resource_name='res',
+                     resource_properties=None)]
+        engine.execute(event.insert(), data)
+        return data
+
+    def _check_034(self, engine, data):
+        event = get_table(engine, 'event')
+        properties = dict(engine.execute(
+            sqlalchemy.select([event.c.id,
+                               event.c.resource_properties])).fetchall())
+        self.assertEqual({'Foo': ['bar', 1]},
+                         json.loads(properties[data[0]['id']]))
+        self.assertEqual({}, json.loads(properties[data[1]['id']]))
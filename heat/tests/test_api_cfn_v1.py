@@ -1236,7 +1236,10 @@ class CfnStackControllerTest(HeatTestCase):
         rpc.call(dummy_req.context, self.topic,
                  {'namespace': None,
                   'method': 'list_events',
-                  'args': {'stack_identity': identity},
+                  'args': {'stack_identity': identity,
+                           'include_properties': True,
+                           'filters': None, 'limit': None, 'marker': None,
+                           'sort_keys': None, 'sort_dir': None},
                   'version': self.api_version}, None).AndReturn(engine_resp)
 
         self.m.ReplayAll()
@@ -1278,7 +1281,10 @@ class CfnStackControllerTest(HeatTestCase):
         rpc.call(dummy_req.context, self.topic,
                  {'namespace': None,
                   'method': 'list_events',
-                  'args': {'stack_identity': identity},
+                  'args': {'stack_identity': identity,
+                           'include_properties': True,
+                           'filters': None, 'limit': None, 'marker': None,
+                           'sort_keys': None, 'sort_dir': None},
                   'version': self.api_version}, None
                  ).AndRaise(Exception())
 
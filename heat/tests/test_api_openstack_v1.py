@@ -526,12 +526,10 @@ class StackControllerTest(ControllerTest, HeatTestCase):
         }
 
         self.assertEqual(expected, result)
-        default_args = {'limit': None, 'sort_keys': None, 'marker': None,
-                        'sort_dir': None, 'filters': None}
         mock_call.assert_called_once_with(req.context, self.topic,
                                           {'namespace': None,
-                                           'method': 'list_stacks',
-                                           'args': default_args,
+                                           'method': 'show_stack',
+                                           'args': {'stack_identity': None},
                                            'version': self.api_version},
                                           None)
 
@@ -2193,7 +2191,11 @@ class EventControllerTest(ControllerTest, HeatTestCase):
         rpc.call(req.context, self.topic,
                  {'namespace': None,
                   'method': 'list_events',
-                  'args': {'stack_identity': stack_identity},
+                  'args': {'stack_identity': stack_identity,
+                           'include_properties': False,
+                           'filters': {'resource_name': res_name},
+                           'limit': None, 'marker': None,
+                           'sort_keys': None, 'sort_dir': None},
                   'version': self.api_version},
                  None).AndReturn(engine_resp)
         self.m.ReplayAll()
@@ -2263,7 +2265,11 @@ class EventControllerTest(ControllerTest, HeatTestCase):
         rpc.call(req.context, self.topic,
                  {'namespace': None,
                   'method': 'list_events',
-                  'args': {'stack_identity': stack_identity},
+                  'args': {'stack_identity': stack_identity,
+                           'include_properties': False,
+                           'filters': {},
+                           'limit': None, 'marker': None,
+                           'sort_keys': None, 'sort_dir': None},
                   'version': self.api_version},
                  None).AndReturn(engine_resp)
         self.m.ReplayAll()
@@ -2306,7 +2312,11 @@ class EventControllerTest(ControllerTest, HeatTestCase):
         rpc.call(req.context, self.topic,
                  {'namespace': None,
                   'method': 'list_events',
-                  'args': {'stack_identity': stack_identity},
+                  'args': {'stack_identity': stack_identity,
+                           'include_properties': False,
+                           'filters': {},
+                           'limit': None, 'marker': None,
+                           'sort_keys': None, 'sort_dir': None},
                   'version': self.api_version},
                  None).AndRaise(to_remote_error(error))
         self.m.ReplayAll()
@@ -2369,7 +2379,11 @@ class EventControllerTest(ControllerTest, HeatTestCase):
         rpc.call(req.context, self.topic,
                  {'namespace': None,
                   'method': 'list_events',
-                  'args': {'stack_identity': stack_identity},
+                  'args': {'stack_identity': stack_identity,
+                           'include_properties': False,
+                           'filters': {'resource_name': res_name},
+                           'limit': None, 'marker': None,
+                           'sort_keys': None, 'sort_dir': None},
                   'version': self.api_version},
                  None).AndReturn(engine_resp)
         self.m.ReplayAll()
@@ -2436,7 +2450,11 @@ class EventControllerTest(ControllerTest, HeatTestCase):
         rpc.call(req.context, self.topic,
                  {'namespace': None,
                   'method': 'list_events',
-                  'args': {'stack_identity': stack_identity},
+                  'args': {'stack_identity': stack_identity,
+                           'include_properties': True,
+                           'filters': {'resource_name': res_name},
+                           'limit': None, 'marker': None,
+                           'sort_keys': None, 'sort_dir': None},
                   'version': self.api_version},
                  None).AndReturn(engine_resp)
         self.m.ReplayAll()
@@ -2510,7 +2528,11 @@ class EventControllerTest(ControllerTest, HeatTestCase):
         rpc.call(req.context, self.topic,
                  {'namespace': None,
                   'method': 'list_events',
-                  'args': {'stack_identity': stack_identity},
+                  'args': {'stack_identity': stack_identity,
+                           'include_properties': True,
+                           'filters': {'resource_name': res_name},
+                           'limit': None, 'marker': None,
+                           'sort_keys': None, 'sort_dir': None},
                   'version': self.api_version},
                  None).AndReturn(engine_resp)
         self.m.ReplayAll()
@@ -2556,7 +2578,11 @@ class EventControllerTest(ControllerTest, HeatTestCase):
         rpc.call(req.context, self.topic,
                  {'namespace': None,
                   'method': 'list_events',
-                  'args': {'stack_identity': stack_identity},
+                  'args': {'stack_identity': stack_identity,
+                           'include_properties': True,
+                           'filters': {'resource_name': res_name},
+                           'limit': None, 'marker': None,
+                           'sort_keys': None, 'sort_dir': None},
                   'version': self.api_version},
                  None).AndReturn(engine_resp)
         self.m.ReplayAll()
@@ -2584,7 +2610,11 @@ class EventControllerTest(ControllerTest, HeatTestCase):
         rpc.call(req.context, self.topic,
                  {'namespace': None,
                   'method': 'list_events',
-                  'args': {'stack_identity': stack_identity},
+                  'args': {'stack_identity': stack_identity,
+                           'include_properties': True,
+                           'filters': {'resource_name': res_name},
+                           'limit': None, 'marker': None,
+                           'sort_keys': None, 'sort_dir': None},
                   'version': self.api_version},
                  None).AndRaise(to_remote_error(error))
         self.m.ReplayAll()
@@ -53,6 +53,13 @@ class dependenciesTest(testtools.TestCase):
         dp = Dependencies(input_edges)
         self.assertEqual(set(input_edges), set(dp.graph().edges()))
 
+    def test_edges_reverse(self):
+        input_edges = [('1', None), ('2', '3'), ('2', '4')]
+        dp = Dependencies(input_edges)
+        self.assertEqual(set(dp.graph(reverse=True).edges()),
+                         set(dp.edges(reverse=True)))
+        self.assertEqual(set(input_edges), set(dp.edges()))
+
     def test_repr(self):
         dp = Dependencies([('1', None), ('2', '3'), ('2', '4')])
         s = "Dependencies([('1', None), ('2', '3'), ('2', '4')])"
@@ -200,6 +207,22 @@ class dependenciesTest(testtools.TestCase):
             self.assertTrue(n in order,
                             "'%s' not found in dependency order" % n)
 
+    def test_diamond_chain_partial(self):
+        # Each level of diamonds doubles the number of paths to the first
+        # node, so the partial graph must not be built by following paths
+        edges = []
+        for level in range(40):
+            top = 'top%d' % level
+            edges.extend([('left%d' % level, top), ('right%d' % level, top),
+                          ('top%d' % (level + 1), 'left%d' % level),
+                          ('top%d' % (level + 1), 'right%d' % level)])
+        d = Dependencies(edges)
+
+        partial = d['top0']
+        self.assertEqual(set(e for e in edges), set(partial.edges()))
+        self.assertEqual('top0', next(iter(partial)))
+        self.assertEqual('top40', list(partial)[-1])
+
     def test_required_by(self):
         d = Dependencies([('last', 'e1'), ('last', 'mid1'), ('last', 'mid2'),
                           ('mid1', 'e2'), ('mid1', 'mid3'),
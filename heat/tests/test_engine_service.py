@@ -17,6 +17,7 @@ import functools
 from eventlet import greenpool
 import json
 import sys
+import uuid
 
 import mock
 import mox
@@ -24,6 +25,7 @@ import mox
 from oslo.config import cfg
 
 from heat.engine import environment
+from heat.engine import event
 from heat.common import exception
 from heat.common import urlfetch
 from heat.tests import fakes as test_fakes
@@ -40,10 +42,14 @@ from heat.engine.properties import Properties
 from heat.engine import resource as res
 from heat.engine.resources import instance as instances
 from heat.engine.resources import nova_utils
+from heat.engine.resources import wait_condition
 from heat.engine import resource as rsrs
+from heat.engine import stack_lock
 from heat.engine import watchrule
 from heat.openstack.common import threadgroup
 from heat.openstack.common.rpc import common as rpc_common
+from heat.openstack.common.rpc import proxy
+from heat.openstack.common.rpc import service as rpc_service
 from heat.tests.common import HeatTestCase
 from heat.tests import generic_resource as generic_rsrc
 from heat.tests import utils
@@ -419,9 +425,6 @@ class StackServiceCreateUpdateDeleteTest(HeatTestCase):
         utils.reset_dummy_db()
         self.ctx = utils.dummy_context()
 
-        self.m.StubOutWithMock(service.EngineListener, 'start')
-        service.EngineListener.start().AndReturn(None)
-        self.m.ReplayAll()
         self.man = service.EngineService('a-host', 'a-topic')
 
     def _test_stack_create(self, stack_name):
@@ -669,6 +672,22 @@ class StackServiceCreateUpdateDeleteTest(HeatTestCase):
                           self.ctx, stack.identifier())
         self.m.VerifyAll()
 
+    def test_create_nested_stack_not_nested(self):
+        stack = get_wordpress_stack('service_create_nested_test_stack',
+                                    self.ctx)
+        sid = stack.store()
+
+        self.m.StubOutWithMock(self.man.thread_group_mgr,
+                               'start_with_acquired_lock')
+        self.m.ReplayAll()
+
+        self.assertRaises(exception.NotFound,
+                          self.man.create_nested_stack, self.ctx, sid)
+        self.assertRaises(exception.NotFound,
+                          self.man.create_nested_stack, self.ctx,
+                          str(uuid.uuid4()))
+        self.m.VerifyAll()
+
     def test_stack_update(self):
         stack_name = 'service_update_test_stack'
         params = {'foo': 'bar'}
@@ -1066,9 +1085,6 @@ class StackServiceUpdateNotSupportedTest(HeatTestCase):
         utils.reset_dummy_db()
         self.ctx = utils.dummy_context()
 
-        self.m.StubOutWithMock(service.EngineListener, 'start')
-        service.EngineListener.start().AndReturn(None)
-        self.m.ReplayAll()
         self.man = service.EngineService('a-host', 'a-topic')
 
     def test_stack_update_during(self):
@@ -1103,9 +1119,6 @@ class StackServiceSuspendResumeTest(HeatTestCase):
         utils.setup_dummy_db()
         self.ctx = utils.dummy_context()
 
-        self.m.StubOutWithMock(service.EngineListener, 'start')
-        service.EngineListener.start().AndReturn(None)
-        self.m.ReplayAll()
         self.man = service.EngineService('a-host', 'a-topic')
 
     def test_stack_suspend(self):
@@ -1174,9 +1187,6 @@ class StackServiceAuthorizeTest(HeatTestCase):
         super(StackServiceAuthorizeTest, self).setUp()
 
         self.ctx = utils.dummy_context(tenant_id='stack_service_test_tenant')
-        self.m.StubOutWithMock(service.EngineListener, 'start')
-        service.EngineListener.start().AndReturn(None)
-        self.m.ReplayAll()
 
         self.eng = service.EngineService('a-host', 'a-topic')
         cfg.CONF.set_default('heat_stack_user_role', 'stack_user_role')
@@ -1249,9 +1259,6 @@ class StackServiceTest(HeatTestCase):
 
         self.ctx = utils.dummy_context(tenant_id='stack_service_test_tenant')
 
-        self.m.StubOutWithMock(service.EngineListener, 'start')
-        service.EngineListener.start().AndReturn(None)
-        self.m.ReplayAll()
 
         self.eng = service.EngineService('a-host', 'a-topic')
         cfg.CONF.set_default('heat_stack_user_role', 'stack_user_role')
@@ -1353,6 +1360,17 @@ class StackServiceTest(HeatTestCase):
 
         self.m.VerifyAll()
 
+    @stack_context('service_event_list_test_stack')
+    def test_stack_event_list_without_properties(self):
+        events = self.eng.list_events(self.ctx, self.stack.identifier(),
+                                      include_properties=False)
+
+        self.assertEqual(2, len(events))
+        for ev in events:
+            self.assertEqual('WebServer', ev['resource_name'])
+            self.assertEqual('CREATE', ev['resource_action'])
+            self.assertEqual({}, ev['resource_properties'])
+
     @stack_context('event_list_deleted_stack')
     def test_stack_event_list_deleted_resource(self):
         rsrs._register_class('GenericResourceType',
@@ -1415,6 +1433,30 @@ class StackServiceTest(HeatTestCase):
 
         self.m.VerifyAll()
 
+    def test_stack_event_list_filtered(self):
+        stack = get_stack('service_event_list_filter_test_stack', self.ctx,
+                          '{"HeatTemplateFormatVersion": "2012-12-12"}')
+        stack.store()
+        self.addCleanup(stack.delete)
+        for name in ('res1', 'res2', 'res1'):
+            event.Event(self.ctx, stack, 'CREATE', 'COMPLETE', 'state changed',
+                        None, {}, name, 'GenericResourceType').store()
+
+        # Formatting the events should not require loading the stack
+        self.m.StubOutWithMock(parser.Stack, 'load')
+        self.m.ReplayAll()
+
+        events = self.eng.list_events(self.ctx, stack.identifier(),
+                                      filters={'resource_name': 'res1'},
+                                      limit=1)
+
+        self.assertEqual(1, len(events))
+        self.assertEqual('res1', events[0]['resource_name'])
+        self.assertEqual(dict(stack.identifier()),
+                         events[0]['stack_identity'])
+        self.assertEqual(stack.name, events[0]['stack_name'])
+        self.m.VerifyAll()
+
     @stack_context('service_event_list_test_stack')
     def test_stack_event_list_by_tenant(self):
         events = self.eng.list_events(self.ctx, None)
@@ -1461,9 +1503,6 @@ class StackServiceTest(HeatTestCase):
     @stack_context('service_list_all_test_stack')
     def test_stack_list_all(self):
         self.m.StubOutWithMock(parser.Stack, 'load')
-        parser.Stack.load(self.ctx, stack=mox.IgnoreArg(), resolve_data=False)\
-            .AndReturn(self.stack)
-
         self.m.ReplayAll()
         sl = self.eng.list_stacks(self.ctx)
 
@@ -1479,9 +1518,25 @@ class StackServiceTest(HeatTestCase):
             self.assertIn('stack_status_reason', s)
             self.assertIn('description', s)
             self.assertIn('WordPress', s['description'])
+            self.assertEqual(dict(self.stack.identifier()),
+                             s['stack_identity'])
 
         self.m.VerifyAll()
 
+    def test_stack_list_hot_description(self):
+        tmpl = parser.Template({'heat_template_version': '2013-05-23',
+                                'description': 'A HOT template'})
+        stack = parser.Stack(self.ctx, 'service_list_hot', tmpl)
+        stack.store()
+        self.addCleanup(stack.delete)
+
+        sl = self.eng.list_stacks(self.ctx,
+                                  filters={'name': 'service_list_hot'})
+
+        self.assertEqual(1, len(sl))
+        self.assertEqual('A HOT template', sl[0]['description'])
+        self.assertEqual('A HOT template', sl[0]['template_description'])
+
     @mock.patch.object(db_api, 'stack_get_all_by_tenant')
     def test_stack_list_passes_filtering_info(self, mock_stack_get_all_by_t):
 
@@ -1492,7 +1547,8 @@ class StackServiceTest(HeatTestCase):
                                                         mock.ANY,
                                                         mock.ANY,
                                                         mock.ANY,
-                                                        filters
+                                                        filters,
+                                                        load_parameters=False
                                                         )
 
     @stack_context('service_abandon_stack')
@@ -1906,6 +1962,35 @@ class StackServiceTest(HeatTestCase):
 
         self.m.VerifyAll()
 
+    def test_load_user_creds_cached(self):
+        user_creds = {'username': 'test_username', 'password': 'password',
+                      'tenant': 'test_tenant', 'tenant_id': 'test_tenant_id',
+                      'trust_id': None, 'trustor_user_id': None,
+                      'auth_url': 'http://server.test:5000/v2.0',
+                      'is_admin': False}
+        with mock.patch.object(db_api, 'user_creds_get',
+                               return_value=user_creds) as creds_get:
+            with mock.patch.object(service.hkc, 'KeystoneClient') as ksc:
+                ctx1 = self.eng._load_user_creds('1234')
+                ctx2 = self.eng._load_user_creds('1234')
+
+        creds_get.assert_called_once_with('1234')
+        self.assertEqual(2, ksc.call_count)
+        self.assertIsNot(ctx1, ctx2)
+        self.assertEqual('test_username', ctx2.username)
+        self.assertEqual('password', ctx2.password)
+
+    def test_load_user_creds_cache_disabled(self):
+        cfg.CONF.set_override('user_creds_cache_size', 0)
+        user_creds = {'is_admin': False}
+        with mock.patch.object(db_api, 'user_creds_get',
+                               return_value=user_creds) as creds_get:
+            with mock.patch.object(service.hkc, 'KeystoneClient'):
+                self.eng._load_user_creds('1234')
+                self.eng._load_user_creds('1234')
+
+        self.assertEqual(2, creds_get.call_count)
+
     def test_signal_reception(self):
         stack = get_stack('signal_reception',
                           self.ctx,
@@ -1977,9 +2062,9 @@ class StackServiceTest(HeatTestCase):
                                          self.stack.identifier()).AndReturn(s)
         self.m.StubOutWithMock(instances.Instance, 'metadata_update')
         instances.Instance.metadata_update(new_metadata=test_metadata)
+        # No other resources refer to WebServer in their Metadata, so the
+        # stack is not reloaded to refresh them
         self.m.StubOutWithMock(service.EngineService, '_load_user_creds')
-        service.EngineService._load_user_creds(
-            mox.IgnoreArg()).AndReturn(self.ctx)
         self.m.ReplayAll()
 
         result = self.eng.metadata_update(self.ctx,
@@ -2066,6 +2151,121 @@ class StackServiceTest(HeatTestCase):
                          self.eng.thread_group_mgr.groups[stack.id].threads)
         self.stack.delete()
 
+    @mock.patch.object(proxy.RpcProxy, 'cast')
+    @mock.patch.object(stack_lock.StackLock, 'get_engine_id')
+    def test_notify_metadata_updated(self, mock_get_engine_id, mock_cast):
+        mock_get_engine_id.return_value = 'other-engine-id'
+        self.eng._notify_metadata_updated(self.ctx, 'stack-id', 'res-id')
+
+        mock_get_engine_id.assert_called_once_with(self.ctx, 'stack-id')
+        msg = {'method': 'metadata_updated',
+               'namespace': None,
+               'args': {'resource_id': 'res-id'}}
+        mock_cast.assert_called_once_with(self.ctx, msg,
+                                          topic='other-engine-id')
+
+    @mock.patch.object(proxy.RpcProxy, 'cast')
+    @mock.patch.object(stack_lock.StackLock, 'get_engine_id')
+    def test_notify_metadata_updated_local(self, mock_get_engine_id,
+                                           mock_cast):
+        for engine_id in (None, self.eng.engine_id):
+            mock_get_engine_id.return_value = engine_id
+            self.eng._notify_metadata_updated(self.ctx, 'stack-id', 'res-id')
+        self.assertFalse(mock_cast.called)
+
+    def test_listener_metadata_updated(self):
+        listener = service.EngineListener('a-host', 'an-engine-id',
+                                          self.eng.thread_group_mgr)
+        with wait_condition.SignalWaiter('res-id') as waiter:
+            waiter.check_due()
+            listener.metadata_updated(self.ctx, 'res-id')
+            self.assertTrue(waiter.check_due())
+
+    def test_listener_stop_stack(self):
+        thread_group = DummyThreadGroup()
+        self.eng.thread_group_mgr.groups['stack-id'] = thread_group
+        listener = service.EngineListener('a-host', 'an-engine-id',
+                                          self.eng.thread_group_mgr)
+
+        with mock.patch.object(thread_group, 'stop') as stop:
+            listener.stop_stack(self.ctx, 'stack-id')
+            listener.stop_stack(self.ctx, 'stack-id')
+
+        stop.assert_called_once_with()
+        self.assertNotIn('stack-id', self.eng.thread_group_mgr.groups)
+
+    @mock.patch.object(urlfetch, 'enable_cache')
+    @mock.patch.object(rpc_service.Service, 'start')
+    def test_start_new_engine_id_and_listener(self, mock_start, mock_cache):
+        engine_id = self.eng.engine_id
+        self.eng.start()
+
+        self.assertNotEqual(engine_id, self.eng.engine_id)
+        self.assertEqual(self.eng.engine_id, self.eng.listener.topic)
+        # Both the engine and its listener are started
+        self.assertEqual(2, mock_start.call_count)
+
+    @mock.patch.object(urlfetch, 'enable_cache')
+    @mock.patch.object(rpc_service.Service, 'start')
+    def test_start_watch_tasks_divided_between_workers(self, mock_start,
+                                                        mock_cache):
+        cfg.CONF.set_override('num_engine_workers', 3)
+        stacks = [mock.Mock(id=str(uuid.uuid4())) for i in range(20)]
+        self.m.StubOutWithMock(db_api, 'stack_get_all')
+        db_api.stack_get_all(mox.IgnoreArg()).MultipleTimes().AndReturn(
+            stacks)
+        self.m.ReplayAll()
+
+        watched = []
+        for worker in range(3):
+            eng = service.EngineService('a-host', 'a-topic', worker=worker)
+            with mock.patch.object(eng, '_start_watch_task') as mock_watch:
+                eng.start()
+            watched.append(set(c[0][0] for c in mock_watch.call_args_list))
+
+        self.assertEqual(set(s.id for s in stacks), set.union(*watched))
+        self.assertEqual(20, sum(len(w) for w in watched))
+        self.m.VerifyAll()
+
+    @mock.patch.object(proxy.RpcProxy, 'cast')
+    def test_schedule_watch_task_local(self, mock_cast):
+        cfg.CONF.set_override('num_engine_workers', 3)
+        stack_id = str(uuid.uuid4())
+        worker = service.EngineService._watcher_worker(stack_id)
+        eng = service.EngineService('a-host', 'a-topic', worker=worker)
+        with mock.patch.object(eng, '_start_watch_task') as mock_watch:
+            eng._schedule_watch_task(self.ctx, stack_id)
+
+        mock_watch.assert_called_once_with(stack_id, self.ctx)
+        self.assertFalse(mock_cast.called)
+
+    @mock.patch.object(proxy.RpcProxy, 'cast')
+    def test_schedule_watch_task_other_worker(self, mock_cast):
+        cfg.CONF.set_override('num_engine_workers', 3)
+        stack_id = str(uuid.uuid4())
+        worker = service.EngineService._watcher_worker(stack_id)
+        eng = service.EngineService('a-host', 'a-topic',
+                                    worker=(worker + 1) % 3)
+        with mock.patch.object(eng, '_start_watch_task') as mock_watch:
+            eng._schedule_watch_task(self.ctx, stack_id)
+
+        self.assertFalse(mock_watch.called)
+        msg = {'method': 'start_watch_task',
+               'namespace': None,
+               'args': {'stack_id': stack_id}}
+        mock_cast.assert_called_once_with(
+            self.ctx, msg, topic='a-topic.a-host.worker-%d' % worker)
+
+    def test_listener_start_watch_task(self):
+        starter = mock.Mock()
+        listener = service.EngineListener('a-host', 'an-engine-id',
+                                          self.eng.thread_group_mgr,
+                                          'a-topic.a-host.worker-1',
+                                          starter)
+        listener.start_watch_task(self.ctx, 'stack-id')
+
+        starter.assert_called_once_with('stack-id', mock.ANY)
+
     @stack_context('service_show_watch_test_stack', False)
     @utils.wr_delete_after
     def test_show_watch(self):
@@ -48,6 +48,16 @@ class EnvironmentTest(common.HeatTestCase):
         env = environment.Environment(new_env)
         self.assertEqual(new_env, env.user_env_as_dict())
 
+    def test_load_engine_options(self):
+        new_env = {u'parameters': {u'a': u'ff'},
+                   u'resource_registry': {u'resources': {}},
+                   u'engine_options': {u'max_concurrent_resource_actions': 2}}
+        env = environment.Environment(new_env)
+        self.assertEqual({u'max_concurrent_resource_actions': 2},
+                         env.engine_options)
+        self.assertEqual({u'a': u'ff'}, env.params)
+        self.assertEqual(new_env, env.user_env_as_dict())
+
     def test_global_registry(self):
         self.g_env.register_class('CloudX::Nova::Server',
                                   generic_resource.GenericResource)
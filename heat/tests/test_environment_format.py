@@ -39,6 +39,18 @@ resource_regis: {}
 '''
         self.assertRaises(ValueError, environment_format.parse, env)
 
+    def test_engine_options(self):
+        env = '''
+engine_options:
+  max_concurrent_resource_actions: 5
+'''
+        tpl = environment_format.parse(env)
+        environment_format.default_for_missing(tpl)
+        self.assertEqual({'parameters': {}, 'resource_registry': {},
+                          'engine_options': {
+                              'max_concurrent_resource_actions': 5}},
+                         tpl)
+
     def test_bad_yaml(self):
         env = '''
 parameters: }
@@ -12,6 +12,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import eventlet
 from oslo.config import cfg
 
 cfg.CONF.import_opt('event_purge_batch_size', 'heat.common.config')
@@ -123,6 +124,78 @@ class EventTest(HeatTestCase):
         self.assertEqual(1, len(events))
         self.assertEqual('arizona', events[0].physical_resource_id)
 
+    def _batched_events(self, *physical_ids):
+        events = [event.Event(self.ctx, self.stack, 'TEST', 'IN_PROGRESS',
+                              'Testing', physical_id,
+                              self.resource.properties, self.resource.name,
+                              self.resource.type())
+                  for physical_id in physical_ids]
+        for e in events:
+            e.store()
+        return events
+
+    def _enable_batching(self, batch_size):
+        cfg.CONF.set_override('event_batch_size', batch_size)
+        cfg.CONF.set_override('event_batch_interval', 3600)
+        self.addCleanup(event.flush)
+
+    def test_store_batched(self):
+        self._enable_batching(10)
+        events = self._batched_events('alabama', 'arizona', 'arkansas')
+        self.assertTrue(all(e.id is not None for e in events))
+        self.assertEqual([], db_api.event_get_all_by_stack(self.ctx,
+                                                           self.stack.id))
+
+        event.flush()
+        stored = db_api.event_get_all_by_stack(self.ctx, self.stack.id)
+        self.assertEqual(['alabama', 'arizona', 'arkansas'],
+                         [e.physical_resource_id for e in stored])
+        self.assertEqual([e.id for e in events], [e.id for e in stored])
+
+        loaded_e = event.Event.load(self.ctx, events[0].id)
+        self.assertEqual(events[0].timestamp, loaded_e.timestamp)
+        self.assertEqual({'Foo': 'goo'}, loaded_e.resource_properties)
+
+    def test_store_batch_full(self):
+        self._enable_batching(2)
+        self._batched_events('alabama')
+        self.assertEqual(0, db_api.event_count_all_by_stack(self.ctx,
+                                                            self.stack.id))
+        self._batched_events('arizona')
+        self.assertEqual(2, db_api.event_count_all_by_stack(self.ctx,
+                                                            self.stack.id))
+
+    def test_store_batched_timer(self):
+        self._enable_batching(10)
+        cfg.CONF.set_override('event_batch_interval', 0)
+        self._batched_events('alabama')
+        self.assertEqual(0, db_api.event_count_all_by_stack(self.ctx,
+                                                            self.stack.id))
+        eventlet.sleep(0.01)
+        self.assertEqual(1, db_api.event_count_all_by_stack(self.ctx,
+                                                            self.stack.id))
+
+    def test_store_batched_caps_events(self):
+        cfg.CONF.set_override('event_purge_batch_size', 1)
+        cfg.CONF.set_override('max_events_per_stack', 2)
+        self._enable_batching(10)
+        self._batched_events('alabama', 'arizona')
+        event.flush()
+        self._batched_events('arkansas')
+        event.flush()
+        self.assertEqual(2, db_api.event_count_all_by_stack(self.ctx,
+                                                            self.stack.id))
+
+    def test_store_batched_flushed_on_stack_complete(self):
+        self._enable_batching(10)
+        self._batched_events('alabama')
+        self.stack.state_set(self.stack.CREATE, self.stack.IN_PROGRESS, '')
+        self.assertEqual(0, db_api.event_count_all_by_stack(self.ctx,
+                                                            self.stack.id))
+        self.stack.state_set(self.stack.CREATE, self.stack.COMPLETE, '')
+        self.assertEqual(1, db_api.event_count_all_by_stack(self.ctx,
+                                                            self.stack.id))
+
     def test_identifier(self):
         e = event.Event(self.ctx, self.stack, 'TEST', 'IN_PROGRESS', 'Testing',
                         'wibble', self.resource.properties,
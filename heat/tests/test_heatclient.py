@@ -30,6 +30,8 @@ class KeystoneClientTest(HeatTestCase):
 
     def setUp(self):
         super(KeystoneClientTest, self).setUp()
+        heat_keystoneclient.clear_trust_token_cache()
+        self.addCleanup(heat_keystoneclient.clear_trust_token_cache)
         self.addCleanup(self.m.VerifyAll)
 
     def _stub_config(self):
@@ -274,6 +276,71 @@ class KeystoneClientTest(HeatTestCase):
         heat_ks_client = heat_keystoneclient.KeystoneClient(ctx)
         self.assertIsNotNone(heat_ks_client.client_v3)
 
+    def _trust_context(self):
+        ctx = utils.dummy_context()
+        ctx.username = None
+        ctx.password = None
+        ctx.auth_token = None
+        ctx.trust_id = 'atrust123'
+        ctx.trustor_user_id = 'trustor_user_id'
+        return ctx
+
+    def _stub_trust_client(self):
+        mock_client = kc_v3.Client(
+            username='heat',
+            password='verybadpass',
+            project_name='service',
+            auth_url='http://server.test:5000/v3',
+            endpoint='http://server.test:5000/v3',
+            trust_id='atrust123',
+            cacert=None,
+            cert=None,
+            insecure=False,
+            key=None)
+        for cfg in ('ca_file', 'insecure', 'cert_file', 'key_file'):
+            self.mock_config.import_opt(cfg,
+                                        'heat.common.config',
+                                        group='clients_keystone')
+        return mock_client
+
+    def test_trust_init_cached_token(self):
+
+        """Test a trust-scoped token is reused by later clients."""
+
+        self._stubs_v3(method='trust')
+        auth_ref = self.mock_ks_v3_client.auth_ref
+        auth_ref.will_expire_soon(300).AndReturn(False)
+        self._stub_trust_client().process_token()
+        self.m.ReplayAll()
+
+        ctx = self._trust_context()
+        heat_keystoneclient.KeystoneClient(ctx)
+        self.assertEqual('atrusttoken', ctx.auth_token)
+
+        ctx = self._trust_context()
+        heat_ks_client = heat_keystoneclient.KeystoneClient(ctx)
+        self.assertIs(auth_ref, heat_ks_client.client_v3.auth_ref)
+        self.assertEqual('atrusttoken', ctx.auth_token)
+
+    def test_trust_init_cached_token_expiring(self):
+
+        """Test a new trust-scoped token is obtained near expiry."""
+
+        self._stubs_v3(method='trust')
+        self.mock_ks_v3_client.auth_ref.will_expire_soon(300).AndReturn(True)
+        mock_client = self._stub_trust_client()
+        mock_client.auth_ref = self.m.CreateMockAnything()
+        mock_client.auth_ref.user_id = 'trustor_user_id'
+        mock_client.auth_ref.trust_scoped = True
+        mock_client.auth_ref.auth_token = 'anewtrusttoken'
+        mock_client.authenticate().AndReturn(True)
+        self.m.ReplayAll()
+
+        heat_keystoneclient.KeystoneClient(self._trust_context())
+        ctx = self._trust_context()
+        heat_keystoneclient.KeystoneClient(ctx)
+        self.assertEqual('anewtrusttoken', ctx.auth_token)
+
     def test_trust_init_fail(self):
 
         """Test consuming a trust when initializing, error scoping."""
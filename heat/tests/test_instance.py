@@ -21,6 +21,7 @@ from heat.engine import environment
 from heat.tests.v1_1 import fakes
 from heat.common import exception
 from heat.common import template_format
+from heat.db import api as db_api
 from heat.engine import parser
 from heat.engine import resource
 from heat.engine import scheduler
@@ -322,6 +323,25 @@ class InstancesTest(HeatTestCase):
         scheduler.TaskRunner(instance.update, update_template)()
         self.assertEqual({'test': 123}, instance.metadata)
 
+    def test_instance_metadata_update_unchanged(self):
+        return_server = self.fc.servers.list()[1]
+        instance = self._create_test_instance(return_server,
+                                              'md_unchanged')
+
+        self.m.StubOutWithMock(db_api, 'resource_metadata_set')
+        self.m.ReplayAll()
+        instance.metadata_update()
+        self.m.VerifyAll()
+
+    def test_instance_metadata_update_changed(self):
+        return_server = self.fc.servers.list()[1]
+        instance = self._create_test_instance(return_server,
+                                              'md_changed')
+
+        instance.t['Metadata'] = {'test': 123}
+        instance.metadata_update()
+        self.assertEqual({'test': 123}, instance.metadata)
+
     def test_instance_update_instance_type(self):
         """
         Instance.handle_update supports changing the InstanceType, and makes
@@ -0,0 +1,102 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+import testtools
+
+from heat.common import lru_cache
+
+
+class LRUCacheTest(testtools.TestCase):
+
+    def test_evicts_least_recently_used(self):
+        cache = lru_cache.LRUCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(1, cache.get('a'))
+        cache.put('c', 3)
+        self.assertEqual(2, len(cache))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(1, cache.get('a'))
+        self.assertEqual(3, cache.get('c'))
+
+    def test_put_existing(self):
+        cache = lru_cache.LRUCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.put('a', 3)
+        cache.put('c', 4)
+        self.assertEqual(['a', 'c'], list(cache))
+        self.assertEqual(3, cache.get('a'))
+
+    def test_max_size_callable(self):
+        sizes = [1]
+        cache = lru_cache.LRUCache(lambda: sizes[0])
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(['b'], list(cache))
+        sizes[0] = 2
+        cache.put('c', 3)
+        self.assertEqual(['b', 'c'], list(cache))
+
+    def test_disabled(self):
+        cache = lru_cache.LRUCache(0)
+        cache.put('a', 1)
+        self.assertEqual(0, len(cache))
+        self.assertIsNone(cache.get('a'))
+
+    def test_unbounded(self):
+        cache = lru_cache.LRUCache()
+        for i in range(100):
+            cache.put(i, i)
+        self.assertEqual(100, len(cache))
+
+    def test_contains_does_not_touch(self):
+        cache = lru_cache.LRUCache()
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertIn('a', cache)
+        self.assertNotIn('c', cache)
+        self.assertEqual(['a', 'b'], list(cache))
+
+    def test_get_default(self):
+        cache = lru_cache.LRUCache()
+        self.assertEqual('x', cache.get('a', 'x'))
+
+    def test_pop(self):
+        cache = lru_cache.LRUCache()
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.put('c', 3)
+        self.assertEqual(2, cache.pop('b'))
+        self.assertIsNone(cache.pop('b'))
+        self.assertEqual(['a', 'c'], list(cache))
+
+    def test_popitem(self):
+        cache = lru_cache.LRUCache()
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        self.assertEqual(('b', 2), cache.popitem())
+        self.assertEqual(('a', 1), cache.popitem())
+        self.assertRaises(KeyError, cache.popitem)
+
+    def test_clear(self):
+        cache = lru_cache.LRUCache()
+        cache.put('a', 1)
+        cache.clear()
+        self.assertEqual(0, len(cache))
+        self.assertEqual([], list(cache))
+        cache.put('b', 2)
+        self.assertEqual(['b'], list(cache))
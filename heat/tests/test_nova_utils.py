@@ -16,6 +16,10 @@
 
 import uuid
 
+import mock
+from novaclient.v1_1 import servers
+from oslo.config import cfg
+
 from heat.common import exception
 from heat.engine.resources import nova_utils
 from heat.tests.common import HeatTestCase
@@ -85,6 +89,123 @@ class NovaUtilsTests(HeatTestCase):
         self.m.VerifyAll()
 
 
+class ServerStatusPollerTest(HeatTestCase):
+
+    def setUp(self):
+        super(ServerStatusPollerTest, self).setUp()
+        self.manager = mock.Mock()
+        self.poller = nova_utils.ServerStatusPoller()
+
+    def _server(self, server_id, status='BUILD', manager=None, **info):
+        info.update({'id': server_id, 'status': status})
+        return servers.Server(manager or self.manager, info, loaded=True)
+
+    def test_single_server(self):
+        server = self._server('1')
+        self.manager.get.return_value = self._server('1', 'ACTIVE')
+
+        self.poller.refresh(server)
+
+        self.assertEqual('ACTIVE', server.status)
+        self.manager.get.assert_called_once_with('1')
+        self.assertFalse(self.manager.list.called)
+
+    def test_many_servers(self):
+        build = [self._server(str(i)) for i in range(10)]
+        self.manager.get.side_effect = lambda i: self._server(i)
+        self.manager.list.return_value = [self._server(str(i))
+                                          for i in range(10)]
+
+        for server in build:
+            self.poller.refresh(server)
+
+        # Only the first server is refreshed individually, before any other
+        # server is known to be polling
+        self.manager.get.assert_called_once_with('0')
+        self.manager.list.assert_called_once_with(detailed=True,
+                                                  search_opts={})
+
+    def test_list_changes_since(self):
+        build = [self._server('0', updated='2014-01-01T00:00:02Z'),
+                 self._server('1', updated='2014-01-01T00:00:01Z')]
+        self.manager.get.side_effect = lambda i: self._server(
+            i, updated='2014-01-01T00:00:02Z')
+        self.manager.list.return_value = []
+
+        for server in build:
+            self.poller.refresh(server)
+
+        self.manager.list.assert_called_once_with(
+            detailed=True,
+            search_opts={'changes-since': '2014-01-01T00:00:01Z'})
+
+    def test_servers_batched_across_clients(self):
+        other_manager = mock.Mock()
+        other_manager.api.client.management_url = \
+            self.manager.api.client.management_url = 'http://nova/v2/tenant'
+        build = [self._server('0'), self._server('1', manager=other_manager)]
+        self.manager.get.side_effect = lambda i: self._server(i)
+        other_manager.list.return_value = [self._server('0'),
+                                           self._server('1')]
+
+        for server in build:
+            self.poller.refresh(server)
+
+        self.manager.get.assert_called_once_with('0')
+        self.assertFalse(other_manager.get.called)
+        self.assertEqual(1, other_manager.list.call_count)
+
+    def test_suspending_servers_keep_polling(self):
+        active = [self._server(str(i), 'ACTIVE') for i in range(2)]
+        self.manager.get.side_effect = lambda i: self._server(i, 'ACTIVE')
+        self.manager.list.return_value = [self._server('0', 'ACTIVE'),
+                                          self._server('1', 'ACTIVE')]
+
+        for server in active:
+            self.poller.refresh(server, 'SUSPENDED')
+
+        self.assertEqual(1, self.manager.get.call_count)
+        self.assertEqual(1, self.manager.list.call_count)
+
+    def test_finished_servers_stop_polling(self):
+        build = [self._server(str(i)) for i in range(2)]
+        self.manager.get.side_effect = lambda i: self._server(i)
+        self.manager.list.return_value = [self._server('0'),
+                                          self._server('1', 'ACTIVE')]
+
+        for server in build:
+            self.poller.refresh(server)
+        self.assertEqual('ACTIVE', build[1].status)
+
+        self.poller.refresh(build[0])
+        self.assertEqual(2, self.manager.get.call_count)
+        self.assertEqual(1, self.manager.list.call_count)
+
+    def test_server_not_listed(self):
+        build = [self._server(str(i)) for i in range(2)]
+        statuses = {'0': 'BUILD', '1': 'ERROR'}
+        self.manager.get.side_effect = lambda i: self._server(i, statuses[i])
+        self.manager.list.return_value = [self._server('0')]
+
+        for server in build:
+            self.poller.refresh(server)
+
+        self.assertEqual('BUILD', build[0].status)
+        self.assertEqual('ERROR', build[1].status)
+        self.assertEqual(2, self.manager.get.call_count)
+
+    def test_ttl_disabled(self):
+        cfg.CONF.set_override('server_status_cache_ttl', 0)
+        build = [self._server(str(i)) for i in range(3)]
+        self.manager.get.side_effect = lambda i: self._server(i)
+
+        for server in build:
+            self.poller.refresh(server)
+
+        self.assertEqual(3, self.manager.get.call_count)
+        self.assertFalse(self.manager.list.called)
+
+
 class NovaUtilsUserdataTests(HeatTestCase):
 
     scenarios = [
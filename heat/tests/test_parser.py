@@ -11,10 +11,14 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
+import copy
 
+import datetime
 import json
 import time
 
+import mock
+
 from keystoneclient import exceptions as kc_exceptions
 
 from oslo.config import cfg
@@ -149,6 +153,29 @@ Mappings:
         self.assertRaises(ValueError, template_format.parse, scanner_error)
         self.assertRaises(ValueError, template_format.parse, parser_error)
 
+    def test_metadata_dependents(self):
+        tmpl = parser.Template({'Resources': {
+            'WH': {'Type': 'AWS::CloudFormation::WaitConditionHandle'},
+            'WC': {'Type': 'AWS::CloudFormation::WaitCondition',
+                   'Properties': {'Handle': {'Ref': 'WH'}}},
+            'S1': {'Type': 'AWS::EC2::Instance',
+                   'Properties': {'UserData': {'Ref': 'WH'}}},
+            'S2': {'Type': 'AWS::EC2::Instance',
+                   'Metadata': {'test': {'Fn::GetAtt': ['WC', 'Data']}}},
+            'S3': {'Type': 'AWS::EC2::Instance',
+                   'Metadata': [{'Ref': 'WH'}]},
+            'S4': {'Type': 'AWS::EC2::Instance',
+                   'Metadata': {'Fn::GetAtt': ['S1', 'PublicIp']}},
+            'S5': {'Type': 'AWS::EC2::Instance',
+                   'Metadata': {'test': 'static'},
+                   'Properties': {'UserData': {'Fn::GetAtt': ['WC',
+                                                              'Data']}}}}})
+
+        self.assertEqual(set(['S2', 'S3', 'S4']),
+                         tmpl.metadata_dependents('WH'))
+        self.assertEqual(set(['S2']), tmpl.metadata_dependents('WC'))
+        self.assertEqual(set(), tmpl.metadata_dependents('S5'))
+
     def test_invalid_section(self):
         tmpl = parser.Template({'Foo': ['Bar']})
         self.assertNotIn('Foo', tmpl)
@@ -718,6 +745,38 @@ class ResolveDataTest(HeatTestCase):
             {"Fn::Join": [" ", [{'Ref': 'baz'}]]},
             self.stack.resolve_static_data(join))
 
+    def test_get_azs_of_region_ref(self):
+        snippet = {'Fn::GetAZs': {'Ref': 'AWS::Region'}}
+        self.assertEqual(['nova'], parser.resolve_static_data(
+            self.stack.t, None, self.stack.parameters, snippet))
+
+    def test_transform_single_walk(self):
+        snippet = {'joined': {'Fn::Join': [' ', ['foo',
+                                                {'Fn::Base64': 'bar'}]]},
+                   'untouched': [{'a': 'b'}, 'c']}
+        transformations = [self.stack.t.resolve_joins,
+                           self.stack.t.resolve_base64]
+
+        with mock.patch.object(template, '_resolve',
+                               wraps=template._resolve) as resolve:
+            result = parser.transform(snippet, transformations)
+
+        self.assertEqual({'joined': 'foo bar',
+                          'untouched': [{'a': 'b'}, 'c']}, result)
+        self.assertIsNot(snippet['untouched'], result['untouched'])
+        # Each transformation only registers its function, rather than
+        # walking the snippet itself
+        self.assertEqual(2, resolve.call_count)
+
+    def test_function_table_first_match(self):
+        table = template.FunctionTable([])
+        table.register(lambda k, v: v == 'x', lambda a: 'first', ['Fn::F'])
+        table.register(lambda k, v: True, lambda a: 'second', ['Fn::F'])
+
+        self.assertEqual(['first', 'second', {'Fn::G': 'x'}],
+                         table.resolve([{'Fn::F': 'x'}, {'Fn::F': 'y'},
+                                        {'Fn::G': 'x'}]))
+
 
 class StackTest(HeatTestCase):
     def setUp(self):
@@ -999,6 +1058,185 @@ class StackTest(HeatTestCase):
         newstack = parser.Stack.load(self.ctx, stack_id=self.stack.id)
         self.assertEqual(identifier.arn(), newstack.parameters['AWS::StackId'])
 
+    def _load_resources_db_calls(self, num_resources):
+        tmpl = {'Resources': dict(('R%d' % i,
+                                   {'Type': 'GenericResourceType'})
+                                  for i in range(num_resources))}
+        self.stack = parser.Stack(self.ctx, 'load_resources_test',
+                                  template.Template(tmpl))
+        self.stack.store()
+        self.stack.create()
+        self.assertEqual((parser.Stack.CREATE, parser.Stack.COMPLETE),
+                         self.stack.state)
+
+        get_all = mock.patch.object(db_api, 'resource_get_all_by_stack',
+                                    wraps=db_api.resource_get_all_by_stack)
+        get_one = mock.patch.object(
+            db_api, 'resource_get_by_name_and_stack',
+            wraps=db_api.resource_get_by_name_and_stack)
+        with get_all as get_all_mock:
+            with get_one as get_one_mock:
+                newstack = parser.Stack.load(self.ctx, stack_id=self.stack.id)
+                for res in newstack.resources.values():
+                    self.assertEqual((res.CREATE, res.COMPLETE), res.state)
+                    self.assertIsNotNone(res.id)
+                return get_all_mock.call_count + get_one_mock.call_count
+
+    @utils.stack_delete_after
+    def test_load_resources_single_query(self):
+        self.assertEqual(1, self._load_resources_db_calls(2))
+
+    @utils.stack_delete_after
+    def test_load_resources_query_count_constant(self):
+        self.assertEqual(1, self._load_resources_db_calls(20))
+
+    @utils.stack_delete_after
+    def test_load_template_cached(self):
+        tmpl = {'Resources': {'A': {'Type': 'GenericResourceType'}},
+                'Outputs': {'Out': {'Value': {'Ref': 'AWS::StackName'}}}}
+        self.stack = parser.Stack(self.ctx, 'template_cache_test',
+                                  template.Template(tmpl))
+        self.stack.store()
+
+        get_tmpl = mock.patch.object(db_api, 'raw_template_get',
+                                     wraps=db_api.raw_template_get)
+        resolve = mock.patch.object(parser, 'resolve_static_data',
+                                    wraps=parser.resolve_static_data)
+        with get_tmpl as get_tmpl_mock:
+            with resolve as resolve_mock:
+                first = parser.Stack.load(self.ctx, stack_id=self.stack.id)
+                first.resources
+                self.assertEqual(1, get_tmpl_mock.call_count)
+                self.assertEqual(2, resolve_mock.call_count)
+
+                second = parser.Stack.load(self.ctx, stack_id=self.stack.id)
+                second.resources
+                self.assertEqual(1, get_tmpl_mock.call_count)
+                self.assertEqual(2, resolve_mock.call_count)
+
+        self.assertIsNot(first.t, second.t)
+        # The template data is shared, not copied for each load
+        self.assertIs(first.t.t, second.t.t)
+        self.assertIsNot(first.t.files, second.t.files)
+        self.assertEqual({'Out': {'Value': 'template_cache_test'}},
+                         second.outputs)
+        self.assertIsNot(first['A'].t, second['A'].t)
+        self.assertEqual(first['A'].t, second['A'].t)
+
+    @utils.stack_delete_after
+    def test_load_static_data_not_shared_between_stacks(self):
+        tmpl = template.Template(
+            {'Outputs': {'Out': {'Value': {'Ref': 'AWS::StackName'}}}})
+        self.stack = parser.Stack(self.ctx, 'static_data_one', tmpl)
+        self.stack.store()
+        other = parser.Stack(self.ctx, 'static_data_two', tmpl)
+        other.store()
+        self.addCleanup(other.delete)
+
+        self.assertEqual(
+            {'Out': {'Value': 'static_data_one'}},
+            parser.Stack.load(self.ctx, stack_id=self.stack.id).outputs)
+        self.assertEqual(
+            {'Out': {'Value': 'static_data_two'}},
+            parser.Stack.load(self.ctx, stack_id=other.id).outputs)
+
+    @utils.stack_delete_after
+    def test_load_static_data_snippet_modified(self):
+        tmpl = {'Resources': {'A': {'Type': 'GenericResourceType',
+                                    'Properties': {'Foo': 'bar'}}}}
+        self.stack = parser.Stack(self.ctx, 'static_data_modified',
+                                  template.Template(tmpl))
+        self.stack.store()
+
+        stack = parser.Stack.load(self.ctx, stack_id=self.stack.id)
+        snippet = stack['A'].json_snippet
+        self.assertEqual({'Foo': 'bar'},
+                         stack.resolve_static_data(snippet)['Properties'])
+
+        # A modified copy of the definition is resolved, not hidden by the
+        # memo, and the shared definition itself is unchanged
+        modified = copy.deepcopy(snippet)
+        modified['Properties']['Foo'] = 'baz'
+        self.assertEqual({'Foo': 'baz'},
+                         stack.resolve_static_data(modified)['Properties'])
+
+        other = parser.Stack.load(self.ctx, stack_id=self.stack.id)
+        other_snippet = other['A'].json_snippet
+        self.assertEqual({'Foo': 'bar'}, other_snippet['Properties'])
+        resolved = other.resolve_static_data(other_snippet)
+        self.assertEqual({'Foo': 'bar'}, resolved['Properties'])
+
+    @utils.stack_delete_after
+    def test_load_template_cache_disabled(self):
+        cfg.CONF.set_override('template_cache_size', 0)
+        self.stack = parser.Stack(self.ctx, 'template_cache_disabled',
+                                  template.Template({}))
+        self.stack.store()
+
+        get_tmpl = mock.patch.object(db_api, 'raw_template_get',
+                                     wraps=db_api.raw_template_get)
+        with get_tmpl as get_tmpl_mock:
+            parser.Stack.load(self.ctx, stack_id=self.stack.id)
+            parser.Stack.load(self.ctx, stack_id=self.stack.id)
+            self.assertEqual(2, get_tmpl_mock.call_count)
+
+    def test_db_resource_get_not_stored(self):
+        stack = parser.Stack(self.ctx, 'db_resource_get_test',
+                             parser.Template({}))
+        self.m.StubOutWithMock(db_api, 'resource_get_by_name_and_stack')
+        self.m.ReplayAll()
+        self.assertIsNone(stack.db_resource_get('A'))
+        self.m.VerifyAll()
+
+    def test_max_concurrent_resource_actions_default(self):
+        stack = parser.Stack(self.ctx, 'concurrency_test',
+                             parser.Template({}))
+        self.assertIsNone(stack.max_concurrent_resource_actions())
+
+    def test_max_concurrent_resource_actions_config(self):
+        cfg.CONF.set_override('max_concurrent_resource_actions', 3)
+        stack = parser.Stack(self.ctx, 'concurrency_test',
+                             parser.Template({}))
+        self.assertEqual(3, stack.max_concurrent_resource_actions())
+
+    def test_max_concurrent_resource_actions_env(self):
+        cfg.CONF.set_override('max_concurrent_resource_actions', 3)
+        env = environment.Environment(
+            {'engine_options': {'max_concurrent_resource_actions': '1'}})
+        stack = parser.Stack(self.ctx, 'concurrency_test',
+                             parser.Template({}), env=env)
+        self.assertEqual(1, stack.max_concurrent_resource_actions())
+
+    def test_max_concurrent_resource_actions_invalid(self):
+        env = environment.Environment(
+            {'engine_options': {'max_concurrent_resource_actions': 'x'}})
+        stack = parser.Stack(self.ctx, 'concurrency_test',
+                             parser.Template({}), env=env)
+        self.assertRaises(exception.StackValidationFailed, stack.validate)
+
+    @utils.stack_delete_after
+    def test_create_max_concurrent_resource_actions(self):
+        tmpl = {'Resources': dict(('R%d' % i,
+                                   {'Type': 'GenericResourceType'})
+                                  for i in range(4))}
+        env = environment.Environment(
+            {'engine_options': {'max_concurrent_resource_actions': 1}})
+        self.stack = parser.Stack(self.ctx, 'concurrency_test',
+                                  template.Template(tmpl), env=env)
+        self.stack.store()
+
+        with mock.patch.object(scheduler, 'DependencyTaskGroup',
+                               wraps=scheduler.DependencyTaskGroup) as dtg:
+            self.stack.create()
+
+        self.assertEqual((parser.Stack.CREATE, parser.Stack.COMPLETE),
+                         self.stack.state)
+        self.assertEqual(1, dtg.call_count)
+        kwargs = dtg.call_args[1]
+        self.assertEqual(1, kwargs['max_concurrency'])
+        self.assertIs(parser.resource_action_slots(), kwargs['slot_pool'])
+        self.assertTrue(kwargs['needs_slot'](self.stack['R0']))
+
     @utils.stack_delete_after
     def test_created_time(self):
         self.stack = parser.Stack(self.ctx, 'creation_time_test',
@@ -1018,6 +1256,38 @@ class StackTest(HeatTestCase):
         self.assertIsNotNone(self.stack.updated_time)
         self.assertNotEqual(self.stack.updated_time, stored_time)
 
+    @utils.stack_delete_after
+    def test_timestamps_cached_on_load(self):
+        self.stack = parser.Stack(self.ctx, 'timestamp_load_test',
+                                  parser.Template({}))
+        self.stack.store()
+        self.stack.state_set(self.stack.CREATE, self.stack.COMPLETE, 'test')
+
+        loaded = parser.Stack.load(self.ctx, stack_id=self.stack.id)
+        with mock.patch.object(db_api, 'stack_get') as stack_get:
+            self.assertEqual(self.stack.created_time, loaded.created_time)
+            self.assertEqual(self.stack.updated_time, loaded.updated_time)
+        self.assertFalse(stack_get.called)
+
+    @utils.stack_delete_after
+    def test_updated_time_written_on_state_set(self):
+        self.stack = parser.Stack(self.ctx, 'timestamp_write_test',
+                                  parser.Template({}))
+        self.stack.store()
+        new_time = datetime.datetime(2014, 1, 1)
+
+        with mock.patch.object(db_api, 'stack_get') as stack_get:
+            self.stack.updated_time = new_time
+            self.assertEqual(new_time, self.stack.updated_time)
+        self.assertFalse(stack_get.called)
+        db_stack = db_api.stack_get(self.ctx, self.stack.id)
+        self.assertNotEqual(new_time, db_stack.updated_at)
+
+        self.stack.state_set(self.stack.CREATE, self.stack.COMPLETE, 'test')
+        db_stack = db_api.stack_get(self.ctx, self.stack.id)
+        self.assertEqual(new_time, db_stack.updated_at)
+        self.assertEqual(new_time, self.stack.updated_time)
+
     @utils.stack_delete_after
     def test_delete(self):
         self.stack = parser.Stack(self.ctx, 'delete_test',
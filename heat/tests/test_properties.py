@@ -1006,6 +1006,82 @@ class PropertiesTest(testtools.TestCase):
         err = self.assertRaises(ValueError, props.get, 'foo')
         self.assertEqual('foo resolution failed!', str(err))
 
+    def test_resolved_value_cached(self):
+        schema = {'foo': {'Type': 'List'}}
+        resolved = []
+        state = ['created']
+
+        def resolver(data):
+            resolved.append(data)
+            return data + [state[0]]
+
+        props = properties.Properties(schema, {'foo': ['a']}, resolver,
+                                      reference_state=lambda d: state[0])
+        self.assertEqual(['a', 'created'], props['foo'])
+        props['foo'].append('modified')
+        self.assertEqual(['a', 'created'], props['foo'])
+        self.assertEqual(1, len(resolved))
+        self.assertEqual(2, props.cache_hits)
+        self.assertEqual(1, props.cache_misses)
+
+        state[0] = 'updated'
+        self.assertEqual(['a', 'updated'], props['foo'])
+        self.assertEqual(2, len(resolved))
+
+        props.data['foo'] = ['b']
+        self.assertEqual(['b', 'updated'], props['foo'])
+        self.assertEqual(3, len(resolved))
+        self.assertEqual(3, props.cache_misses)
+
+    def test_references_found_when_data_changes(self):
+        schema = {'foo': {'Type': 'String'}}
+        found = []
+
+        def references(data):
+            found.append(data)
+            return [data]
+
+        props = properties.Properties(schema, {'foo': 'bar'},
+                                      reference_state=lambda r: r,
+                                      references=references)
+        self.assertEqual('bar', props['foo'])
+        self.assertEqual('bar', props['foo'])
+        self.assertEqual(['bar'], found)
+        self.assertEqual(1, props.cache_hits)
+
+        props.data['foo'] = 'baz'
+        self.assertEqual('baz', props['foo'])
+        self.assertEqual(['bar', 'baz'], found)
+
+    def test_resolved_value_not_cached_without_reference_state(self):
+        schema = {'foo': {'Type': 'String'}}
+        resolved = []
+
+        def resolver(data):
+            resolved.append(data)
+            return data
+
+        props = properties.Properties(schema, {'foo': 'bar'}, resolver)
+        self.assertEqual('bar', props['foo'])
+        self.assertEqual('bar', props['foo'])
+        self.assertEqual(2, len(resolved))
+        self.assertEqual(0, props.cache_hits)
+
+    def test_resolved_value_not_cached_without_state(self):
+        schema = {'foo': {'Type': 'String'}}
+        resolved = []
+
+        def resolver(data):
+            resolved.append(data)
+            return data
+
+        props = properties.Properties(schema, {'foo': 'bar'}, resolver,
+                                      reference_state=lambda d: None)
+        self.assertEqual('bar', props['foo'])
+        self.assertEqual('bar', props['foo'])
+        self.assertEqual(2, len(resolved))
+        self.assertEqual(0, props.cache_hits)
+
     def test_schema_from_params(self):
         params_snippet = {
             "DBUsername": {
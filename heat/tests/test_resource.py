@@ -261,6 +261,130 @@ class ResourceTest(HeatTestCase):
         res = generic_rsrc.GenericResource('test_resource', tmpl, self.stack)
         self.assertEqual({}, res.metadata)
 
+    def test_metadata_cached(self):
+        tmpl = {'Type': 'Foo', 'Metadata': {'Test': 'Initial metadata'}}
+        res = generic_rsrc.GenericResource('metadata_resource', tmpl,
+                                           self.stack)
+        res._store()
+
+        with mock.patch.object(db_api, 'resource_get',
+                               wraps=db_api.resource_get) as mock_get:
+            self.assertEqual({'Test': 'Initial metadata'}, res.metadata)
+            self.assertEqual(1, mock_get.call_count)
+
+            # Only the version is checked while the metadata is unchanged
+            metadata = res.metadata
+            self.assertEqual({'Test': 'Initial metadata'}, metadata)
+            self.assertEqual(1, mock_get.call_count)
+
+            # Changing the data returned does not change the cached copy
+            metadata['Test'] = 'Changed locally'
+            self.assertEqual({'Test': 'Initial metadata'}, res.metadata)
+
+            # An update made elsewhere changes the version
+            db_api.resource_metadata_set(res.context, res.id,
+                                         {'Test': 'Updated metadata'})
+            self.assertEqual({'Test': 'Updated metadata'}, res.metadata)
+            self.assertEqual(2, mock_get.call_count)
+
+    def test_metadata_set_clears_cache(self):
+        tmpl = {'Type': 'Foo', 'Metadata': {'Test': 'Initial metadata'}}
+        res = generic_rsrc.GenericResource('metadata_resource', tmpl,
+                                           self.stack)
+        res._store()
+        self.assertEqual({'Test': 'Initial metadata'}, res.metadata)
+
+        res.metadata = {'Test': 'Updated metadata'}
+        self.assertIsNone(res._metadata_cache)
+        self.assertEqual({'Test': 'Updated metadata'}, res.metadata)
+
+    def test_data_set(self):
+        tmpl = {'Type': 'Foo'}
+        res = generic_rsrc.GenericResource('data_resource', tmpl, self.stack)
+        self.assertEqual({}, dict(res.data))
+        res._store()
+
+        res.data.update({'secret': 'shh', 'other': 'hush'}, redact=True)
+        res.data.set('plain', 'value')
+        expected = {'secret': 'shh', 'other': 'hush', 'plain': 'value'}
+        self.assertEqual(expected, dict(res.data))
+        self.assertEqual(expected, db_api.resource_data_get_all(res))
+        self.assertTrue(db_api.resource_data_get_by_key(res.context, res.id,
+                                                        'secret').redact)
+
+        res.data.delete('other')
+        self.assertNotIn('other', res.data)
+        self.assertRaises(exception.NotFound, res.data.delete, 'other')
+        self.assertEqual({'secret': 'shh', 'plain': 'value'},
+                         db_api.resource_data_get_all(res))
+
+    def test_data_loaded_once(self):
+        tmpl = {'Type': 'Foo'}
+        res = generic_rsrc.GenericResource('data_resource', tmpl, self.stack)
+        res._store()
+        db_api.resource_data_set(res, 'secret', 'shh', redact=True)
+        db_api.resource_data_set(res, 'plain', 'value')
+
+        res = generic_rsrc.GenericResource('data_resource', tmpl, self.stack)
+        with mock.patch.object(db_api, 'resource_data_decrypt',
+                               wraps=db_api.resource_data_decrypt) as decrypt:
+            self.assertEqual('value', res.data['plain'])
+            self.assertEqual(1, decrypt.call_count)
+
+            # Values are only decrypted once, when first read
+            self.assertEqual('shh', res.data['secret'])
+            self.assertEqual('shh', res.data['secret'])
+            self.assertEqual(2, decrypt.call_count)
+
+        # Data written elsewhere is not seen once the rows are loaded
+        db_api.resource_data_set(res, 'late', 'value')
+        self.assertNotIn('late', res.data)
+        self.assertRaises(KeyError, res.data.__getitem__, 'late')
+
+    def test_data_from_db_resource(self):
+        tmpl = {'Type': 'Foo'}
+        res = generic_rsrc.GenericResource('data_resource', tmpl, self.stack)
+        res._store()
+        res.data.set('key', 'value')
+
+        db_res = db_api.resource_get(res.context, res.id)
+        rows = db_res.data
+        res = generic_rsrc.GenericResource('data_resource', tmpl, self.stack)
+        res.data = resource.ResourceData(res, mock.Mock(data=rows))
+        with mock.patch.object(db_api,
+                               'resource_data_get_all_by_resource') as get:
+            self.assertEqual({'key': 'value'}, dict(res.data))
+            self.assertFalse(get.called)
+
+    def test_data_written_before_load(self):
+        tmpl = {'Type': 'Foo'}
+        res = generic_rsrc.GenericResource('data_resource', tmpl, self.stack)
+        res._store()
+        res.data.update({'key': 'value', 'old': 'value'})
+
+        # The resource's database entry was fetched before the writes below
+        rows = list(db_api.resource_get(res.context, res.id).data)
+        res = generic_rsrc.GenericResource('data_resource', tmpl, self.stack)
+        res.data = resource.ResourceData(res, mock.Mock(data=rows))
+        res.data.set('new', 'value')
+        res.data.delete('old')
+
+        expected = {'key': 'value', 'new': 'value'}
+        self.assertEqual(2, len(res.data))
+        self.assertEqual(expected, dict(res.data))
+        self.assertEqual(expected, res.get_abandon_data()['resource_data'])
+
+    def test_data_refresh(self):
+        tmpl = {'Type': 'Foo'}
+        res = generic_rsrc.GenericResource('data_resource', tmpl, self.stack)
+        res._store()
+        res.data.set('key', 'value')
+
+        db_api.resource_data_set(res, 'late', 'value')
+        self.assertNotIn('late', res.data)
+        res.data.refresh()
+        self.assertEqual({'key': 'value', 'late': 'value'}, dict(res.data))
+
     def test_equals_different_stacks(self):
         tmpl1 = {'Type': 'Foo'}
         tmpl2 = {'Type': 'Foo'}
@@ -390,6 +514,92 @@ class ResourceTest(HeatTestCase):
         self.assertIn(estr, str(err))
         self.assertEqual((res.CREATE, res.FAILED), res.state)
 
+    def test_create_poll_policy(self):
+        tmpl = {'Type': 'GenericResourceType'}
+        res = generic_rsrc.GenericResource('test_resource', tmpl, self.stack)
+        res.poll_policy = scheduler.PollPolicy()
+        res.expected_durations = {res.CREATE: 30}
+        res.check_create_complete = mock.Mock(side_effect=[False, True])
+
+        with mock.patch.object(scheduler, 'poll_until',
+                               wraps=scheduler.poll_until) as poll_until:
+            scheduler.TaskRunner(res.create)()
+
+        self.assertEqual((res.CREATE, res.COMPLETE), res.state)
+        self.assertEqual(2, res.check_create_complete.call_count)
+        poll_until.assert_called_once_with(mock.ANY, res.poll_policy, 30)
+
+    def test_properties_cached_until_reference_changes(self):
+        resource._register_class('ResourceWithPropsType',
+                                 generic_rsrc.ResourceWithProps)
+        tmpl = template.Template({
+            'Resources': {
+                'foo': {'Type': 'GenericResourceType'},
+                'bar': {
+                    'Type': 'ResourceWithPropsType',
+                    'Properties': {
+                        'Foo': {'Ref': 'foo'},
+                    }
+                }
+            }
+        })
+        stack = parser.Stack(utils.dummy_context(), 'test', tmpl)
+        foo = stack['foo']
+        props = stack['bar'].properties
+
+        self.assertEqual('foo', props['Foo'])
+        self.assertEqual('foo', props['Foo'])
+        self.assertEqual(1, props.cache_hits)
+        self.assertEqual(1, props.cache_misses)
+
+        foo.resource_id = 'foo-id'
+        self.assertEqual('foo-id', props['Foo'])
+        self.assertEqual(2, props.cache_misses)
+
+        foo.state_set(foo.CREATE, foo.COMPLETE)
+        self.assertEqual('foo-id', props['Foo'])
+        self.assertEqual(3, props.cache_misses)
+        self.assertEqual(1, props.cache_hits)
+
+    def test_properties_cached_until_attribute_changes(self):
+        resource._register_class('ResourceWithPropsType',
+                                 generic_rsrc.ResourceWithProps)
+        tmpl = template.Template({
+            'Resources': {
+                'foo': {'Type': 'GenericResourceType'},
+                'bar': {
+                    'Type': 'ResourceWithPropsType',
+                    'Properties': {
+                        'Foo': {'Fn::GetAtt': ['foo', 'Foo']},
+                    }
+                }
+            }
+        })
+        stack = parser.Stack(utils.dummy_context(), 'test', tmpl)
+        foo = stack['foo']
+        foo.state_set(foo.CREATE, foo.COMPLETE)
+        props = stack['bar'].properties
+
+        self.m.StubOutWithMock(foo, 'FnGetAtt')
+        foo.FnGetAtt('Foo').MultipleTimes().AndReturn('first')
+        self.m.ReplayAll()
+
+        self.assertEqual('first', props['Foo'])
+        self.assertEqual('first', props['Foo'])
+        self.assertEqual(1, props.cache_hits)
+        self.assertEqual(1, props.cache_misses)
+        self.m.VerifyAll()
+
+        self.m.UnsetStubs()
+        self.m.StubOutWithMock(foo, 'FnGetAtt')
+        foo.FnGetAtt('Foo').MultipleTimes().AndReturn('second')
+        self.m.ReplayAll()
+
+        self.assertEqual('second', props['Foo'])
+        self.assertEqual(1, props.cache_hits)
+        self.assertEqual(2, props.cache_misses)
+        self.m.VerifyAll()
+
     def test_create_fail_metadata_parse_error(self):
         tmpl = {'Type': 'GenericResourceType', 'Properties': {},
                 'Metadata': {"Fn::GetAtt": ["ResourceA", "abc"]}}
@@ -713,6 +923,8 @@ class ResourceAdoptTest(HeatTestCase):
         adopt()
         self.assertEqual("test-value",
                          db_api.resource_data_get(res, "test-key"))
+        self.assertEqual({"test-key": "test-value"},
+                         res.get_abandon_data()['resource_data'])
         self.assertEqual({"os_distro": "test-distro"}, res.metadata)
         self.assertEqual((res.ADOPT, res.COMPLETE), res.state)
 
@@ -1182,6 +1394,69 @@ class ResourceDependenciesTest(HeatTestCase):
                                getattr, stack, 'dependencies')
         self.assertIn('"wibble" (in foo)', str(ex))
 
+    def test_references_indexed_once_per_template(self):
+        tmpl = template.Template({
+            'Parameters': {'param': {'Type': 'String', 'Default': 'foo'}},
+            'Resources': {
+                'foo': {'Type': 'GenericResourceType'},
+                'bar': {
+                    'Type': 'ResourceWithPropsType',
+                    'Properties': {'Foo': {'Ref': 'foo'}},
+                },
+                'baz': {
+                    'Type': 'ResourceWithPropsType',
+                    'Properties': {'Foo': {'Ref': 'param'}},
+                },
+            }
+        })
+        refs = mock.patch.object(template, 'dependency_references',
+                                 wraps=template.dependency_references)
+        with refs as refs_mock:
+            call_counts = []
+            for i in range(2):
+                stack = parser.Stack(utils.dummy_context(), 'test', tmpl)
+                graph = stack.dependencies.graph()
+                self.assertEqual([stack['foo']], list(graph[stack['bar']]))
+                self.assertEqual([], list(graph[stack['baz']]))
+                call_counts.append(refs_mock.call_count)
+
+        self.assertNotEqual(0, call_counts[0])
+        self.assertEqual(call_counts[0], call_counts[1])
+
+    def test_reference_given_by_function(self):
+        tmpl = template.Template({
+            'Mappings': {'map': {'key': {'name': 'foo'}}},
+            'Resources': {
+                'foo': {'Type': 'GenericResourceType'},
+                'bar': {
+                    'Type': 'ResourceWithPropsType',
+                    'Properties': {
+                        'Foo': {'Ref': {'Fn::FindInMap': ['map', 'key',
+                                                          'name']}},
+                    }
+                }
+            }
+        })
+        stack = parser.Stack(utils.dummy_context(), 'test', tmpl)
+
+        graph = stack.dependencies.graph()
+        self.assertEqual([stack['foo']], list(graph[stack['bar']]))
+
+    def test_references_of_updated_definition(self):
+        tmpl = template.Template({
+            'Resources': {
+                'foo': {'Type': 'GenericResourceType'},
+                'bar': {'Type': 'GenericResourceType'},
+            }
+        })
+        stack = parser.Stack(utils.dummy_context(), 'test', tmpl)
+        res = stack['bar']
+        res._t_source = {'Type': 'GenericResourceType', 'DependsOn': 'foo'}
+        res.t = res._t_source
+
+        res.add_dependencies(self.deps)
+        self.assertIn(stack['foo'], self.deps.graph()[res])
+
 
 class MetadataTest(HeatTestCase):
     def setUp(self):
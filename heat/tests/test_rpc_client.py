@@ -126,6 +126,10 @@ class EngineRpcAPITestCase(testtools.TestCase):
         self._test_engine_api('delete_stack', 'call',
                               stack_identity=self.identity)
 
+    def test_create_nested_stack(self):
+        self._test_engine_api('create_nested_stack', 'cast',
+                              stack_id='6')
+
     def test_validate_template(self):
         self._test_engine_api('validate_template', 'call',
                               template={u'Foo': u'bar'})
@@ -142,7 +146,11 @@ class EngineRpcAPITestCase(testtools.TestCase):
 
     def test_list_events(self):
         self._test_engine_api('list_events', 'call',
-                              stack_identity=self.identity)
+                              stack_identity=self.identity,
+                              include_properties=False,
+                              filters={'resource_name': 'foo'},
+                              limit=10, marker='1234',
+                              sort_keys=['created_at'], sort_dir='desc')
 
     def test_describe_stack_resource(self):
         self._test_engine_api('describe_stack_resource', 'call',
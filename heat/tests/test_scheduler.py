@@ -400,6 +400,341 @@ class DependencyTaskGroupTest(HeatTestCase):
                                 run_tasks_with_exceptions, e1)
         self.assertEqual([e1], exc.exceptions)
 
+    def test_aggregate_exceptions_cancels_diamond_once(self):
+        self.aggregate_exceptions = True
+        deps = dependencies.Dependencies([('last', 'mid1'), ('last', 'mid2'),
+                                          ('mid1', 'first'),
+                                          ('mid2', 'first')])
+        e1 = Exception('e1')
+        dummy = DummyTask()
+        tg = scheduler.DependencyTaskGroup(deps, dummy,
+                                           aggregate_exceptions=True)
+
+        self.m.StubOutWithMock(dummy, 'do_step')
+        dummy.do_step(1, 'first').AndRaise(e1)
+        self.m.ReplayAll()
+
+        exc = self.assertRaises(scheduler.ExceptionGroup,
+                                scheduler.TaskRunner(tg), wait_time=None)
+        self.assertEqual([e1], exc.exceptions)
+        self.assertTrue(all(r.done() for r in tg._runners.values()))
+
+    def test_dependents_start_when_requirement_completes(self):
+        edges = [('leaf%d' % i, 'root') for i in range(10)]
+        deps = dependencies.Dependencies(edges + [('other', None)])
+        leaves = set('leaf%d' % i for i in range(10))
+        started = []
+
+        def task(name):
+            started.append(name)
+            yield
+
+        tg = scheduler.DependencyTaskGroup(deps, task)
+        runner = tg()
+
+        next(runner)
+        self.assertEqual(set(['root', 'other']), set(started))
+        del started[:]
+        next(runner)
+        self.assertEqual(leaves, set(started))
+        self.assertEqual(10, len(started))
+        del started[:]
+        self.assertRaises(StopIteration, next, runner)
+        self.assertEqual([], started)
+
+    def test_tick_stats(self):
+        deps = dependencies.Dependencies([('second', 'first')])
+        tg = scheduler.DependencyTaskGroup(deps, DummyTask())
+
+        scheduler.TaskRunner(tg)(wait_time=None)
+
+        stats = tg.stats
+        self.assertTrue(stats.ticks > 0)
+        self.assertTrue(stats.max_time <= stats.total_time)
+        self.assertEqual(stats.total_time / stats.ticks, stats.mean_time())
+        self.assertEqual(stats.ticks, stats.to_dict()['ticks'])
+
+    def test_tick_stats_independent_of_wallclock(self):
+        deps = dependencies.Dependencies([('second', 'first')])
+        tg = scheduler.DependencyTaskGroup(deps, DummyTask())
+
+        self.m.StubOutWithMock(scheduler, 'wallclock')
+        self.m.ReplayAll()
+
+        scheduler.TaskRunner(tg)(wait_time=None)
+        self.assertTrue(tg.stats.ticks > 0)
+        self.m.VerifyAll()
+
+    def test_max_concurrency(self):
+        deps = dependencies.Dependencies([('1', None), ('2', None),
+                                          ('3', None)])
+        started = []
+
+        def task(name):
+            started.append(name)
+            yield
+
+        tg = scheduler.DependencyTaskGroup(deps, task, max_concurrency=2)
+
+        runner = tg()
+        next(runner)
+        self.assertEqual(2, len(started))
+        next(runner)
+        self.assertEqual(3, len(started))
+        self.assertEqual(set(['1', '2', '3']), set(started))
+        self.assertRaises(StopIteration, next, runner)
+
+    def test_slot_pool(self):
+        deps = dependencies.Dependencies([('1', None), ('2', None)])
+        pool = scheduler.SlotPool(2)
+        started = []
+
+        def task(name):
+            started.append(name)
+            yield
+
+        tg = scheduler.DependencyTaskGroup(deps, task, slot_pool=pool)
+        other = object()
+        self.assertTrue(pool.acquire(other))
+
+        runner = tg()
+        next(runner)
+        self.assertEqual(1, len(started))
+        self.assertEqual(1, pool.held(tg))
+        self.assertEqual(2, pool.in_use())
+
+        for step in runner:
+            pass
+        self.assertEqual(2, len(started))
+        self.assertEqual(0, pool.held(tg))
+        self.assertEqual(1, pool.in_use())
+
+    def test_slot_pool_full(self):
+        deps = dependencies.Dependencies([('1', None)])
+        pool = scheduler.SlotPool(1)
+        started = []
+
+        def task(name):
+            started.append(name)
+            yield
+
+        tg = scheduler.DependencyTaskGroup(deps, task, slot_pool=pool)
+        other = object()
+        self.assertTrue(pool.acquire(other))
+
+        runner = tg()
+        next(runner)
+        self.assertEqual([], started)
+        pool.release(other)
+        next(runner)
+        self.assertEqual(['1'], started)
+        self.assertRaises(StopIteration, next, runner)
+        self.assertEqual(0, pool.in_use())
+
+    def test_slot_pool_not_needed(self):
+        deps = dependencies.Dependencies([('1', None), ('2', None)])
+        pool = scheduler.SlotPool(1)
+        started = []
+
+        def task(name):
+            started.append(name)
+            yield
+
+        tg = scheduler.DependencyTaskGroup(deps, task, slot_pool=pool,
+                                           needs_slot=lambda k: k != '2')
+        other = object()
+        self.assertTrue(pool.acquire(other))
+
+        runner = tg()
+        next(runner)
+        self.assertEqual(['2'], started)
+        self.assertEqual(0, pool.held(tg))
+        pool.release(other)
+        for step in runner:
+            pass
+        self.assertEqual(['2', '1'], started)
+        self.assertEqual(0, pool.in_use())
+
+    def test_slot_pool_released_on_exception(self):
+        deps = dependencies.Dependencies([('1', None), ('2', None)])
+        pool = scheduler.SlotPool(4)
+        dummy = DummyTask(2)
+        tg = scheduler.DependencyTaskGroup(deps, dummy, slot_pool=pool)
+
+        self.m.StubOutWithMock(dummy, 'do_step')
+        dummy.do_step(1, mox.IgnoreArg()).MultipleTimes().AndReturn(None)
+        dummy.do_step(2, '1').AndRaise(Exception('e1'))
+        self.m.ReplayAll()
+
+        self.assertRaises(Exception, scheduler.TaskRunner(tg),
+                          wait_time=None)
+        self.assertEqual(0, pool.in_use())
+
+
+class SlotPoolTest(HeatTestCase):
+
+    def test_unlimited(self):
+        pool = scheduler.SlotPool()
+        for i in range(10):
+            self.assertTrue(pool.acquire('a'))
+        self.assertEqual(10, pool.held('a'))
+        pool.release_all('a')
+        self.assertEqual(0, pool.in_use())
+
+    def test_limit(self):
+        pool = scheduler.SlotPool(2)
+        self.assertTrue(pool.acquire('a'))
+        self.assertTrue(pool.acquire('a'))
+        self.assertFalse(pool.acquire('a'))
+        pool.release('a')
+        self.assertEqual(1, pool.in_use())
+        self.assertTrue(pool.acquire('a'))
+
+    def test_limit_shared(self):
+        pool = scheduler.SlotPool(1)
+        self.assertTrue(pool.acquire('a'))
+        self.assertFalse(pool.acquire('b'))
+        self.assertEqual(1, pool.in_use())
+        pool.release('a')
+        self.assertTrue(pool.acquire('b'))
+
+    def test_fair_share(self):
+        pool = scheduler.SlotPool(4)
+        self.assertTrue(pool.acquire('a'))
+        self.assertTrue(pool.acquire('a'))
+        self.assertTrue(pool.acquire('a'))
+        self.assertTrue(pool.acquire('b'))
+        self.assertFalse(pool.acquire('b'))
+        pool.release('a')
+        # 'a' holds its fair share while 'b' is waiting
+        self.assertFalse(pool.acquire('a'))
+        self.assertTrue(pool.acquire('b'))
+
+    def test_withdraw(self):
+        pool = scheduler.SlotPool(2)
+        self.assertTrue(pool.acquire('a'))
+        self.assertTrue(pool.acquire('b'))
+        self.assertFalse(pool.acquire('b'))
+        pool.release('b')
+        pool.withdraw('b')
+        self.assertTrue(pool.acquire('a'))
+
+    def test_release_not_held(self):
+        pool = scheduler.SlotPool(2)
+        pool.release('a')
+        pool.release_all('a')
+        self.assertEqual(0, pool.in_use())
+
+
+class TickStatsTest(HeatTestCase):
+
+    def test_empty(self):
+        stats = scheduler.TickStats()
+        self.assertEqual({'ticks': 0, 'total_time': 0.0,
+                          'mean_time': 0.0, 'max_time': 0.0},
+                         stats.to_dict())
+
+    def test_stop_without_start(self):
+        stats = scheduler.TickStats()
+        stats.stop()
+        self.assertEqual(0, stats.ticks)
+
+    def test_ticks(self):
+        stats = scheduler.TickStats()
+        for i in range(3):
+            stats.start()
+            stats.stop()
+        self.assertEqual(3, stats.ticks)
+        self.assertTrue(stats.max_time <= stats.total_time)
+
+
+class PollPolicyTest(HeatTestCase):
+
+    def test_backoff(self):
+        policy = scheduler.PollPolicy(initial_interval=1, backoff_factor=2,
+                                      max_interval=5, jitter=0)
+        intervals = policy.intervals()
+        self.assertEqual([1, 2, 4, 5, 5],
+                         [next(intervals) for i in range(5)])
+
+    def test_expected_duration(self):
+        policy = scheduler.PollPolicy(initial_interval=1, backoff_factor=2,
+                                      max_interval=5, jitter=0)
+        intervals = policy.intervals(expected_duration=30)
+        self.assertEqual([15, 1, 2],
+                         [next(intervals) for i in range(3)])
+
+    def test_jitter(self):
+        policy = scheduler.PollPolicy(initial_interval=10, jitter=0.5)
+        for i in range(10):
+            interval = next(policy.intervals())
+            self.assertTrue(5 <= interval <= 15)
+
+
+class PollUntilTest(HeatTestCase):
+
+    def setUp(self):
+        super(PollUntilTest, self).setUp()
+        scheduler.ENABLE_SLEEP = True
+        self.addCleanup(self.m.VerifyAll)
+
+    def _check(self, *results):
+        results = list(results)
+        return lambda: results.pop(0)
+
+    def test_no_policy(self):
+        self.m.StubOutWithMock(scheduler, 'wallclock')
+        self.m.ReplayAll()
+
+        task = scheduler.poll_until(self._check(False, False, True))
+        self.assertEqual(2, len(list(task)))
+
+    def test_sleep_disabled(self):
+        scheduler.ENABLE_SLEEP = False
+        policy = scheduler.PollPolicy(jitter=0)
+        self.m.StubOutWithMock(scheduler, 'wallclock')
+        self.m.ReplayAll()
+
+        task = scheduler.poll_until(self._check(False, True), policy)
+        self.assertEqual(1, len(list(task)))
+
+    def test_backoff(self):
+        policy = scheduler.PollPolicy(initial_interval=1, backoff_factor=2,
+                                      jitter=0)
+        check = self.m.CreateMockAnything()
+        self.m.StubOutWithMock(scheduler, 'wallclock')
+
+        check().AndReturn(False)
+        scheduler.wallclock().AndReturn(100)
+        scheduler.wallclock().AndReturn(101)
+        check().AndReturn(False)
+        scheduler.wallclock().AndReturn(101)
+        scheduler.wallclock().AndReturn(102)
+        scheduler.wallclock().AndReturn(103)
+        check().AndReturn(True)
+        self.m.ReplayAll()
+
+        task = scheduler.poll_until(check, policy)
+        self.assertEqual(3, len(list(task)))
+
+    def test_expected_duration(self):
+        policy = scheduler.PollPolicy(initial_interval=1, backoff_factor=2,
+                                      jitter=0)
+        check = self.m.CreateMockAnything()
+        self.m.StubOutWithMock(scheduler, 'wallclock')
+
+        scheduler.wallclock().AndReturn(100)
+        scheduler.wallclock().AndReturn(103)
+        scheduler.wallclock().AndReturn(105)
+        check().AndReturn(False)
+        scheduler.wallclock().AndReturn(105)
+        scheduler.wallclock().AndReturn(106)
+        check().AndReturn(True)
+        self.m.ReplayAll()
+
+        task = scheduler.poll_until(check, policy, expected_duration=10)
+        self.assertEqual(3, len(list(task)))
+
 
 class TaskTest(HeatTestCase):
 
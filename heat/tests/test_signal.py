@@ -218,7 +218,7 @@ class SignalTest(HeatTestCase):
 
         # Check user id can still be fetched from resource_id
         # if the resource data is not there.
-        db_api.resource_data_delete(rsrc, 'user_id')
+        rsrc.data.delete('user_id')
         self.assertRaises(
             exception.NotFound, db_api.resource_data_get, rsrc, 'user_id')
         self.assertEqual('1234', rsrc._get_user_id())
@@ -19,6 +19,7 @@ from json import loads
 from json import dumps
 import mock
 import mox
+import sqlalchemy
 
 from heat.db.sqlalchemy import api as db_api
 from heat.engine import environment
@@ -374,6 +375,21 @@ class SqlAlchemyTest(HeatTestCase):
         st_db = db_api.stack_get_all_by_tenant(self.ctx)
         self.assertEqual(1, len(st_db))
 
+    def test_stack_get_all_by_tenant_without_parameters(self):
+        self._setup_test_stack('stack', UUID1)
+
+        st_db = db_api.stack_get_all_by_tenant(self.ctx,
+                                               load_parameters=False)
+        self.assertEqual(1, len(st_db))
+        self.assertNotIn('parameters', st_db[0].__dict__)
+        self.assertEqual('stack', st_db[0].name)
+
+    def test_stack_description_stored(self):
+        stack = self._setup_test_stack('stack', UUID1)[1]
+
+        st_db = db_api.stack_get(self.ctx, stack.id)
+        self.assertEqual(stack.t[stack.t.DESCRIPTION], st_db.description)
+
     def test_stack_get_all_by_tenant_and_filters(self):
         self._setup_test_stack('foo', UUID1)
         self._setup_test_stack('bar', UUID2)
@@ -1101,6 +1117,73 @@ class DBAPIStackTest(HeatTestCase):
         self._deleted_stack_existance(utils.dummy_context(), stacks,
                                       (), (0, 1, 2, 3, 4))
 
+    def test_purge_deleted_batched(self):
+        deleted = datetime.now() - timedelta(days=2)
+        template = create_raw_template(self.ctx)
+        creds = create_user_creds(self.ctx)
+        stacks = [create_stack(self.ctx, template, creds,
+                               deleted_at=deleted) for i in range(3)]
+        for stack in stacks:
+            rsrc = create_resource(self.ctx, stack)
+            rsrc.context = self.ctx
+            create_resource_data(self.ctx, rsrc)
+            create_event(self.ctx, stack_id=stack.id)
+            create_event(self.ctx, stack_id=stack.id)
+            rule = create_watch_rule(self.ctx, stack)
+            create_watch_data(self.ctx, rule)
+        live_stack = create_stack(self.ctx, template, creds)
+
+        purged = db_api.purge_deleted(age=1, batch_size=2)
+
+        self.assertEqual({'stack': 3, 'stack_lock': 0, 'event': 6,
+                          'resource': 3, 'resource_data': 3,
+                          'watch_rule': 3, 'watch_data': 3,
+                          'raw_template': 0, 'user_creds': 0}, purged)
+        self._deleted_stack_existance(utils.dummy_context(),
+                                      stacks + [live_stack], (3,), (0, 1, 2))
+        # The template and credentials are still used by the live stack
+        self.assertIsNotNone(db_api.raw_template_get(self.ctx, template.id))
+        self.assertIsNotNone(db_api.user_creds_get(creds.id))
+
+        db_api.stack_update(self.ctx, live_stack.id, {'deleted_at': deleted})
+        purged = db_api.purge_deleted(age=1, batch_size=2)
+        self.assertEqual(1, purged['raw_template'])
+        self.assertEqual(1, purged['user_creds'])
+
+    def test_purge_deleted_interrupted(self):
+        deleted = datetime.now() - timedelta(days=2)
+        template = create_raw_template(self.ctx)
+        creds = create_user_creds(self.ctx)
+        stack = create_stack(self.ctx, template, creds, deleted_at=deleted)
+
+        execute = sqlalchemy.engine.Connection.execute
+
+        def fail_creds_delete(conn, stmt, *args, **kwargs):
+            if (isinstance(stmt, sqlalchemy.sql.expression.Delete) and
+                    stmt.table.name == 'user_creds'):
+                raise exception.Error('interrupted')
+            return execute(conn, stmt, *args, **kwargs)
+
+        with mock.patch.object(sqlalchemy.engine.Connection, 'execute',
+                               autospec=True, side_effect=fail_creds_delete):
+            self.assertRaises(exception.Error, db_api.purge_deleted, 1)
+
+        # Nothing is left behind without a stack referring to it
+        self.assertIsNotNone(db_api.stack_get(self.ctx, stack.id,
+                                              show_deleted=True))
+        self.assertIsNotNone(db_api.raw_template_get(self.ctx, template.id))
+
+        purged = db_api.purge_deleted(age=1)
+        self.assertEqual(1, purged['stack'])
+        self.assertEqual(1, purged['raw_template'])
+        self.assertEqual(1, purged['user_creds'])
+
+    def test_purge_deleted_invalid_batch_size(self):
+        self.assertRaises(exception.Error, db_api.purge_deleted, 1,
+                          batch_size=0)
+        self.assertRaises(exception.Error, db_api.purge_deleted, 1,
+                          batch_size='many')
+
     def _deleted_stack_existance(self, ctx, stacks, existing, deleted):
         for s in existing:
             self.assertIsNotNone(db_api.stack_get(ctx, stacks[s].id,
@@ -1140,6 +1223,25 @@ class DBAPIResourceTest(HeatTestCase):
         self.assertRaises(exception.NotFound, db_api.resource_get,
                           self.ctx, UUID2)
 
+    def test_resource_metadata_set(self):
+        res = create_resource(self.ctx, self.stack)
+        self.assertEqual(0, db_api.resource_metadata_version(self.ctx,
+                                                             res.id))
+
+        db_api.resource_metadata_set(self.ctx, res.id, {'foo': 'bar'})
+        self.assertEqual(1, db_api.resource_metadata_version(self.ctx,
+                                                             res.id))
+        db_api.resource_metadata_set(self.ctx, res.id, {'foo': 'baz'})
+        self.assertEqual(2, db_api.resource_metadata_version(self.ctx,
+                                                             res.id))
+
+        ret_res = db_api.resource_get(self.ctx, res.id)
+        ret_res.refresh()
+        self.assertEqual({'foo': 'baz'}, ret_res.rsrc_metadata)
+
+        self.assertRaises(exception.NotFound,
+                          db_api.resource_metadata_version, self.ctx, UUID2)
+
     def test_resource_get_by_name_and_stack(self):
         create_resource(self.ctx, self.stack)
 
@@ -1206,6 +1308,11 @@ class DBAPIStackLockTest(HeatTestCase):
         self.user_creds = create_user_creds(self.ctx)
         self.stack = create_stack(self.ctx, self.template, self.user_creds)
 
+    def test_stack_lock_get_engine_id(self):
+        self.assertIsNone(db_api.stack_lock_get_engine_id(self.stack.id))
+        db_api.stack_lock_create(self.stack.id, UUID1)
+        self.assertEqual(UUID1, db_api.stack_lock_get_engine_id(self.stack.id))
+
     def test_stack_lock_create_success(self):
         observed = db_api.stack_lock_create(self.stack.id, UUID1)
         self.assertIsNone(observed)
@@ -1291,6 +1398,32 @@ class DBAPIResourceDataTest(HeatTestCase):
         self.assertEqual('foo', vals.get('test_resource_key'))
         self.assertEqual('test_value', vals.get('encryped_resource_key'))
 
+    def test_resource_data_set_all(self):
+        create_resource_data(self.ctx, self.resource, value='foo')
+        rows = db_api.resource_data_set_all(self.resource,
+                                            {'test_resource_key': 'bar',
+                                             'new_key': 'baz'},
+                                            redact=True)
+        self.assertEqual(set(['test_resource_key', 'new_key']),
+                         set(rows.keys()))
+        self.assertTrue(all(r.redact for r in rows.values()))
+        self.assertNotEqual('baz', rows['new_key'].value)
+
+        vals = db_api.resource_data_get_all(self.resource)
+        self.assertEqual({'test_resource_key': 'bar', 'new_key': 'baz'}, vals)
+
+    def test_resource_data_get_all_by_resource(self):
+        create_resource_data(self.ctx, self.resource)
+        create_resource_data(self.ctx, self.resource,
+                             key='encryped_resource_key', redact=True)
+
+        rows = db_api.resource_data_get_all_by_resource(self.ctx,
+                                                        self.resource.id)
+        self.assertEqual(2, len(rows))
+        vals = dict((r.key, db_api.resource_data_decrypt(r)) for r in rows)
+        self.assertEqual({'test_resource_key': 'test_value',
+                          'encryped_resource_key': 'test_value'}, vals)
+
     def test_resource_data_delete(self):
         create_resource_data(self.ctx, self.resource)
         res_data = db_api.resource_data_get_by_key(self.ctx, self.resource.id,
@@ -1383,6 +1516,66 @@ class DBAPIEventTest(HeatTestCase):
         events = db_api.event_get_all_by_stack(self.ctx, self.stack2.id)
         self.assertEqual(1, len(events))
 
+    def test_event_get_all_by_stack_without_properties(self):
+        self.stack1 = create_stack(self.ctx, self.template, self.user_creds)
+        create_event(self.ctx, stack_id=self.stack1.id)
+
+        events = db_api.event_get_all_by_stack(self.ctx, self.stack1.id,
+                                               load_properties=False)
+        self.assertEqual(1, len(events))
+        self.assertEqual('res', events[0].resource_name)
+        self.assertNotIn('resource_properties', events[0].__dict__)
+        # The properties are still loaded on demand
+        self.assertEqual({'name': 'foo'}, events[0].resource_properties)
+
+    def test_event_get_all_by_stack_filter_and_page(self):
+        self.stack1 = create_stack(self.ctx, self.template, self.user_creds)
+        now = timeutils.utcnow()
+        values = [
+            {'resource_name': 'res1', 'resource_status': 'IN_PROGRESS'},
+            {'resource_name': 'res1', 'resource_status': 'COMPLETE'},
+            {'resource_name': 'res2', 'resource_status': 'IN_PROGRESS'},
+            {'resource_name': 'res2', 'resource_status': 'COMPLETE'},
+        ]
+        ids = [create_event(self.ctx, stack_id=self.stack1.id,
+                            created_at=now + timedelta(seconds=i),
+                            **val).id
+               for i, val in enumerate(values)]
+
+        events = db_api.event_get_all_by_stack(self.ctx, self.stack1.id)
+        self.assertEqual(ids, [e.id for e in events])
+
+        events = db_api.event_get_all_by_stack(self.ctx, self.stack1.id,
+                                               sort_keys='created_at',
+                                               sort_dir='desc')
+        self.assertEqual(list(reversed(ids)), [e.id for e in events])
+
+        events = db_api.event_get_all_by_stack(self.ctx, self.stack1.id,
+                                               limit=2, marker=ids[0])
+        self.assertEqual(ids[1:3], [e.id for e in events])
+
+        filters = {'resource_name': 'res2', 'resource_status': 'COMPLETE'}
+        events = db_api.event_get_all_by_stack(self.ctx, self.stack1.id,
+                                               filters=filters)
+        self.assertEqual(ids[3:], [e.id for e in events])
+
+    def test_event_get_all_by_tenant_filter(self):
+        self.stack1 = create_stack(self.ctx, self.template, self.user_creds)
+        self.stack2 = create_stack(self.ctx, self.template, self.user_creds)
+        create_event(self.ctx, stack_id=self.stack1.id, resource_name='res1')
+        create_event(self.ctx, stack_id=self.stack2.id, resource_name='res1')
+        create_event(self.ctx, stack_id=self.stack2.id, resource_name='res2')
+
+        events = db_api.event_get_all_by_tenant(
+            self.ctx, filters={'resource_name': 'res1'})
+        self.assertEqual(2, len(events))
+
+        db_api.stack_delete(self.ctx, self.stack1.id)
+        events = db_api.event_get_all_by_tenant(
+            self.ctx, filters={'resource_name': 'res1'})
+        self.assertEqual(1, len(events))
+        self.assertEqual(self.stack2.id, events[0].stack_id)
+
     def test_event_count_all_by_stack(self):
         self.stack1 = create_stack(self.ctx, self.template, self.user_creds)
         self.stack2 = create_stack(self.ctx, self.template, self.user_creds)
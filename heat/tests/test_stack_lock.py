@@ -179,3 +179,101 @@ class StackLockTest(HeatTestCase):
         slock = stack_lock.StackLock(self.context, self.stack, self.engine_id)
         self.assertRaises(rpc_common.ClientException, slock.acquire)
         self.m.VerifyAll()
+
+    def test_get_engine_id(self):
+        self.m.StubOutWithMock(db_api, "stack_lock_get_engine_id")
+        db_api.stack_lock_get_engine_id(self.stack.id).\
+            AndReturn("fake-engine-id")
+        self.m.ReplayAll()
+
+        self.assertEqual("fake-engine-id",
+                         stack_lock.StackLock.get_engine_id(self.context,
+                                                            self.stack.id))
+        self.m.VerifyAll()
+
+    def test_get_engine_id_owner_locked(self):
+        nested = self.m.CreateMockAnything()
+        nested.owner_id = self.stack.id
+        self.m.StubOutWithMock(db_api, "stack_lock_get_engine_id")
+        self.m.StubOutWithMock(db_api, "stack_get")
+        db_api.stack_lock_get_engine_id("nested-stack-id").AndReturn(None)
+        db_api.stack_get(self.context, "nested-stack-id").AndReturn(nested)
+        db_api.stack_lock_get_engine_id(self.stack.id).\
+            AndReturn("fake-engine-id")
+        self.m.ReplayAll()
+
+        self.assertEqual("fake-engine-id",
+                         stack_lock.StackLock.get_engine_id(self.context,
+                                                            "nested-stack-id"))
+        self.m.VerifyAll()
+
+    def test_get_engine_id_not_locked(self):
+        self.stack.owner_id = None
+        self.m.StubOutWithMock(db_api, "stack_lock_get_engine_id")
+        self.m.StubOutWithMock(db_api, "stack_get")
+        db_api.stack_lock_get_engine_id(self.stack.id).AndReturn(None)
+        db_api.stack_get(self.context, self.stack.id).AndReturn(self.stack)
+        self.m.ReplayAll()
+
+        self.assertIsNone(stack_lock.StackLock.get_engine_id(self.context,
+                                                             self.stack.id))
+        self.m.VerifyAll()
+
+    def test_take_over_not_locked(self):
+        self.m.StubOutWithMock(db_api, "stack_lock_get_engine_id")
+        self.m.StubOutWithMock(db_api, "stack_lock_create")
+        self.m.StubOutWithMock(proxy.RpcProxy, "call")
+        db_api.stack_lock_get_engine_id(self.stack.id).AndReturn(None)
+        db_api.stack_lock_create(self.stack.id, self.engine_id).\
+            AndReturn(None)
+        self.m.ReplayAll()
+
+        slock = stack_lock.StackLock(self.context, self.stack, self.engine_id)
+        slock.take_over()
+        self.m.VerifyAll()
+
+    def test_take_over_stops_engine(self):
+        self.m.StubOutWithMock(db_api, "stack_lock_get_engine_id")
+        self.m.StubOutWithMock(db_api, "stack_lock_create")
+        db_api.stack_lock_get_engine_id(self.stack.id).\
+            AndReturn("fake-engine-id")
+
+        self.m.StubOutWithMock(proxy.RpcProxy, "call")
+        rpc = proxy.RpcProxy("fake-engine-id", "1.0")
+        rpc.call(self.context,
+                 rpc.make_msg("stop_stack", stack_id=self.stack.id),
+                 timeout=2, topic="fake-engine-id").AndReturn(None)
+
+        db_api.stack_lock_create(self.stack.id, self.engine_id).\
+            AndReturn(None)
+        self.m.ReplayAll()
+
+        slock = stack_lock.StackLock(self.context, self.stack, self.engine_id)
+        slock.take_over()
+        self.m.VerifyAll()
+
+    def test_take_over_engine_dead(self):
+        self.m.StubOutWithMock(db_api, "stack_lock_get_engine_id")
+        self.m.StubOutWithMock(db_api, "stack_lock_create")
+        db_api.stack_lock_get_engine_id(self.stack.id).\
+            AndReturn("fake-engine-id")
+
+        self.m.StubOutWithMock(proxy.RpcProxy, "call")
+        rpc = proxy.RpcProxy("fake-engine-id", "1.0")
+        rpc.call(self.context,
+                 rpc.make_msg("stop_stack", stack_id=self.stack.id),
+                 timeout=2,
+                 topic="fake-engine-id").AndRaise(rpc_common.Timeout)
+
+        db_api.stack_lock_create(self.stack.id, self.engine_id).\
+            AndReturn("fake-engine-id")
+        rpc.call(self.context, rpc.make_msg("listening"), timeout=2,
+                 topic="fake-engine-id").AndRaise(rpc_common.Timeout)
+        self.m.StubOutWithMock(db_api, "stack_lock_steal")
+        db_api.stack_lock_steal(self.stack.id, "fake-engine-id",
+                                self.engine_id).AndReturn(None)
+        self.m.ReplayAll()
+
+        slock = stack_lock.StackLock(self.context, self.stack, self.engine_id)
+        slock.take_over()
+        self.m.VerifyAll()
@@ -15,13 +15,20 @@
 import uuid
 import mox
 
+from oslo.config import cfg
+
 from heat.common import template_format
 from heat.common import exception
+from heat.db import api as db_api
 from heat.engine import environment
 from heat.engine import parser
 from heat.engine import resource
 from heat.engine import scheduler
+from heat.engine import service
+from heat.engine import stack_lock
 from heat.engine import stack_resource
+from heat.openstack.common import timeutils
+from heat.rpc import client as rpc_client
 from heat.tests.common import HeatTestCase
 from heat.tests import generic_resource as generic_rsrc
 from heat.tests import utils
@@ -107,6 +114,10 @@ class StackResourceTest(HeatTestCase):
         self.templ = template_format.parse(param_template)
         self.simple_template = template_format.parse(simple_template)
 
+    def test_no_resource_action_slot(self):
+        # The nested stack's resources take the slots instead
+        self.assertFalse(self.parent_resource.uses_resource_action_slot)
+
     @utils.stack_delete_after
     def test_create_with_template_ok(self):
         self.parent_resource.create_with_template(self.templ,
@@ -142,6 +153,153 @@ class StackResourceTest(HeatTestCase):
         self.assertEqual(self.templ, self.stack.t.t)
         self.assertEqual(self.stack.id, self.parent_resource.resource_id)
 
+    @utils.stack_delete_after
+    def test_create_with_template_dispatched(self):
+        cfg.CONF.set_override('dispatch_nested_stacks', True)
+        t = parser.Template({'Resources':
+                             {"provider_resource": ws_res_snippet}})
+        self.stack = parser.Stack(utils.dummy_context(), 'test_stack', t)
+        self.stack.store()
+        rsrc = self.stack['provider_resource']
+        rsrc._store()
+
+        self.m.StubOutWithMock(rpc_client.EngineClient,
+                               'create_nested_stack')
+        rpc_client.EngineClient.create_nested_stack(rsrc.context,
+                                                    mox.IsA(str))
+        self.m.ReplayAll()
+
+        poller = rsrc.create_with_template(self.templ, {"KeyName": "key"})
+        self.m.VerifyAll()
+        self.assertFalse(rsrc.check_create_complete(poller))
+
+        # Create the nested stack as the engine receiving the message would
+        engine = service.EngineService('a-host', 'a-topic')
+        self.m.StubOutWithMock(engine.thread_group_mgr,
+                               'start_with_acquired_lock')
+
+        def start_with_acquired_lock(stack, lock, func):
+            self.assertEqual(rsrc.resource_id, stack.id)
+            self.assertEqual('provider_resource', stack.parent_resource.name)
+            self.assertEqual(self.stack.id, stack.parent_resource.stack.id)
+            try:
+                func()
+            finally:
+                lock.release()
+
+        engine.thread_group_mgr.start_with_acquired_lock(
+            mox.IsA(parser.Stack), mox.IsA(stack_lock.StackLock),
+            mox.IgnoreArg()).WithSideEffects(start_with_acquired_lock)
+        self.m.ReplayAll()
+
+        engine.create_nested_stack(rsrc.context, rsrc.resource_id)
+        self.m.VerifyAll()
+
+        self.assertTrue(rsrc.check_create_complete(poller))
+        self.assertEqual((rsrc.nested().CREATE, rsrc.nested().COMPLETE),
+                         rsrc.nested().state)
+        self.assertIn('WebServer', rsrc.nested())
+
+    @utils.stack_delete_after
+    def test_create_with_template_dispatched_failed(self):
+        cfg.CONF.set_override('dispatch_nested_stacks', True)
+        self.m.StubOutWithMock(rpc_client.EngineClient,
+                               'create_nested_stack')
+        rpc_client.EngineClient.create_nested_stack(
+            self.parent_resource.context, mox.IsA(str))
+        self.m.ReplayAll()
+
+        poller = self.parent_resource.create_with_template(
+            self.templ, {"KeyName": "key"})
+        self.m.VerifyAll()
+
+        nested = parser.Stack.load(self.parent_resource.context,
+                                   self.parent_resource.resource_id)
+        nested.state_set(nested.CREATE, nested.IN_PROGRESS, 'Started')
+        self.assertFalse(self.parent_resource.check_create_complete(poller))
+
+        nested.state_set(nested.CREATE, nested.FAILED, 'Failed remotely')
+        err = self.assertRaises(exception.Error,
+                                self.parent_resource.check_create_complete,
+                                poller)
+        self.assertEqual('Failed remotely', str(err))
+        self.stack = self.parent_resource.nested()
+
+    def _dispatch_nested(self):
+        cfg.CONF.set_override('dispatch_nested_stacks', True)
+        t = parser.Template({'Resources':
+                             {"provider_resource": ws_res_snippet}})
+        self.stack = parser.Stack(utils.dummy_context(), 'test_stack', t)
+        self.stack.store()
+        rsrc = self.stack['provider_resource']
+        rsrc._store()
+        rsrc.set_template(self.templ, {"KeyName": "key"})
+        # The engine acting on the parent stack holds its lock
+        db_api.stack_lock_create(self.stack.id, 'parent-engine')
+
+        self.m.StubOutWithMock(rpc_client.EngineClient,
+                               'create_nested_stack')
+        rpc_client.EngineClient.create_nested_stack(rsrc.context,
+                                                    mox.IsA(str))
+        return rsrc
+
+    @utils.stack_delete_after
+    def test_create_with_template_dispatched_not_started(self):
+        cfg.CONF.set_override('nested_stack_dispatch_timeout', 60)
+        timeutils.set_time_override()
+        self.addCleanup(timeutils.clear_time_override)
+        rsrc = self._dispatch_nested()
+        self.m.ReplayAll()
+
+        poller = rsrc.create_with_template(self.templ, {"KeyName": "key"})
+        self.m.VerifyAll()
+        self.assertFalse(rsrc.check_create_complete(poller))
+
+        timeutils.advance_time_seconds(61)
+        self.assertRaises(exception.Error,
+                          rsrc.check_create_complete, poller)
+        nested = rsrc.nested()
+        self.assertEqual((nested.CREATE, nested.FAILED), nested.state)
+        self.assertIsNone(db_api.stack_lock_get_engine_id(nested.id))
+
+        # A message that arrives late does not start creating the stack
+        engine = service.EngineService('a-host', 'a-topic')
+        self.m.StubOutWithMock(engine.thread_group_mgr,
+                               'start_with_acquired_lock')
+        self.m.ReplayAll()
+        engine.create_nested_stack(rsrc.context, nested.id)
+        self.m.VerifyAll()
+        self.assertIsNone(db_api.stack_lock_get_engine_id(nested.id))
+
+    @utils.stack_delete_after
+    def test_create_with_template_dispatched_cancelled(self):
+        rsrc = self._dispatch_nested()
+        self.m.ReplayAll()
+
+        creator = scheduler.TaskRunner(rsrc.create)
+        creator.start()
+        self.m.VerifyAll()
+
+        # The nested stack is being created in another engine
+        nested_id = rsrc.resource_id
+        db_api.stack_lock_create(nested_id, 'other-engine')
+
+        def stop_engine_action(engine_id):
+            db_api.stack_lock_release(nested_id, engine_id)
+
+        self.m.StubOutWithMock(stack_lock.StackLock, '_stop_engine_action')
+        stack_lock.StackLock._stop_engine_action(
+            'other-engine').WithSideEffects(stop_engine_action)
+        self.m.ReplayAll()
+
+        creator.cancel()
+        self.m.VerifyAll()
+
+        self.assertEqual((rsrc.CREATE, rsrc.FAILED), rsrc.state)
+        nested = rsrc.nested()
+        self.assertEqual((nested.CREATE, nested.FAILED), nested.state)
+        self.assertIsNone(db_api.stack_lock_get_engine_id(nested_id))
+
     @utils.stack_delete_after
     def test_set_deletion_policy(self):
         self.parent_resource.create_with_template(self.templ,
@@ -294,15 +452,81 @@ class StackResourceTest(HeatTestCase):
         self.assertRaises(exception.NotFound, self.parent_resource.nested)
         self.m.VerifyAll()
 
-    def test_delete_nested_ok(self):
+    def _mock_nested_for_delete(self):
+        db_api.stack_lock_create(self.parent_resource.stack.id,
+                                 'parent-engine')
         nested = self.m.CreateMockAnything()
+        nested.id = str(uuid.uuid4())
+        nested.name = 'nested'
         self.m.StubOutWithMock(stack_resource.StackResource, 'nested')
         stack_resource.StackResource.nested().AndReturn(nested)
-        nested.delete()
+        return nested
+
+    def test_delete_nested_ok(self):
+        nested = self._mock_nested_for_delete()
+
+        def check_locked():
+            self.assertEqual('parent-engine',
+                             db_api.stack_lock_get_engine_id(nested.id))
+
+        nested.delete().WithSideEffects(check_locked)
         self.m.ReplayAll()
 
         self.parent_resource.delete_nested()
         self.m.VerifyAll()
+        self.assertIsNone(db_api.stack_lock_get_engine_id(nested.id))
+
+    def test_delete_nested_locked_until_complete(self):
+        nested = self._mock_nested_for_delete()
+
+        def delete():
+            for i in range(3):
+                yield
+
+        nested.delete().AndReturn(delete())
+        self.m.ReplayAll()
+
+        delete_task = self.parent_resource.delete_nested()
+        self.m.VerifyAll()
+        self.assertEqual('parent-engine',
+                         db_api.stack_lock_get_engine_id(nested.id))
+
+        self.assertFalse(delete_task.step())
+        self.assertEqual('parent-engine',
+                         db_api.stack_lock_get_engine_id(nested.id))
+        self.assertTrue(delete_task.step())
+        self.assertIsNone(db_api.stack_lock_get_engine_id(nested.id))
+
+    def test_delete_nested_unlocked_on_cancel(self):
+        nested = self._mock_nested_for_delete()
+
+        def delete():
+            while True:
+                yield
+
+        nested.delete().AndReturn(delete())
+        self.m.ReplayAll()
+
+        delete_task = self.parent_resource.delete_nested()
+        self.m.VerifyAll()
+        self.assertEqual('parent-engine',
+                         db_api.stack_lock_get_engine_id(nested.id))
+
+        delete_task.cancel()
+        self.assertIsNone(db_api.stack_lock_get_engine_id(nested.id))
+
+    def test_delete_nested_parent_not_locked(self):
+        nested = self.m.CreateMockAnything()
+        nested.id = str(uuid.uuid4())
+        nested.name = 'nested'
+        self.m.StubOutWithMock(stack_resource.StackResource, 'nested')
+        stack_resource.StackResource.nested().AndReturn(nested)
+        self.m.ReplayAll()
+
+        self.assertRaises(exception.Error,
+                          self.parent_resource.delete_nested)
+        self.m.VerifyAll()
+        self.assertIsNone(db_api.stack_lock_get_engine_id(nested.id))
 
     def test_delete_nested_not_found_nested_stack(self):
         self.parent_resource.create_with_template(self.templ,
@@ -12,6 +12,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import json
 import mock
 import os
 import testtools
@@ -132,6 +133,39 @@ Outputs: {}
         expected = {'heat_template_version': '2013-05-23'}
         self.assertEqual(expected, template_format.parse(tmpl_str))
 
+    def test_parse_yaml_not_parsed_as_json(self):
+        tmpl_str = 'heat_template_version: 2013-05-23'
+        with mock.patch.object(json, 'loads') as json_loads:
+            template_format.parse(tmpl_str)
+        self.assertFalse(json_loads.called)
+
+    def test_parse_yaml_flow_mapping(self):
+        tmpl_str = '{heat_template_version: 2013-05-23}'
+        expected = {'heat_template_version': '2013-05-23'}
+        self.assertEqual(expected, template_format.parse(tmpl_str))
+
+    def test_parse_yaml_cached(self):
+        tmpl_str = 'heat_template_version: 2013-05-23\nresources: {}\n'
+        first = template_format.parse(tmpl_str)
+        first['resources']['foo'] = {'type': 'Foo'}
+
+        with mock.patch.object(yaml, 'load') as yaml_load:
+            second = template_format.parse(tmpl_str)
+        self.assertFalse(yaml_load.called)
+        self.assertEqual({'heat_template_version': '2013-05-23',
+                          'resources': {}}, second)
+
+
+    def test_parse_yaml_cache_disabled(self):
+        config.cfg.CONF.set_override('parsed_template_cache_size', 0)
+        tmpl_str = 'heat_template_version: 2013-05-23\nresources: {a: {}}\n'
+        template_format.parse(tmpl_str)
+
+        with mock.patch.object(yaml, 'load') as yaml_load:
+            yaml_load.return_value = {'heat_template_version': '2013-05-23'}
+            template_format.parse(tmpl_str)
+        self.assertTrue(yaml_load.called)
+
 
 class YamlParseExceptions(HeatTestCase):
 
@@ -13,9 +13,13 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import requests
-from requests import exceptions
 import cStringIO
+import fixtures
+import os
+import shutil
+import tempfile
+
+from requests import exceptions
 
 from oslo.config import cfg
 
@@ -23,11 +27,15 @@ from heat.common import urlfetch
 from heat.tests.common import HeatTestCase
 
 from heat.openstack.common.py3kcompat import urlutils
+from heat.openstack.common import timeutils
 
 
 class Response:
-    def __init__(self, buf=''):
+    def __init__(self, buf='', status_code=200, headers=None):
         self.buf = buf
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.closed = False
 
     def iter_content(self, chunk_size=1):
         while self.buf:
@@ -37,11 +45,23 @@ class Response:
     def raise_for_status(self):
         pass
 
+    def close(self):
+        self.closed = True
+
 
-class UrlFetchTest(HeatTestCase):
+class UrlFetchTestBase(HeatTestCase):
     def setUp(self):
-        super(UrlFetchTest, self).setUp()
-        self.m.StubOutWithMock(requests, 'get')
+        super(UrlFetchTestBase, self).setUp()
+        self.session = self.m.CreateMockAnything()
+        self.useFixture(fixtures.MonkeyPatch(
+            'heat.common.urlfetch._http_session', self.session))
+
+    def expect_get(self, url, headers=None):
+        return self.session.get(url, stream=True, headers=headers,
+                                timeout=cfg.CONF.template_fetch_timeout)
+
+
+class UrlFetchTest(UrlFetchTestBase):
 
     def test_file_scheme_default_behaviour(self):
         self.m.ReplayAll()
@@ -73,7 +93,7 @@ class UrlFetchTest(HeatTestCase):
         url = 'http://example.com/template'
         data = '{ "foo": "bar" }'
         response = Response(data)
-        requests.get(url, stream=True).AndReturn(response)
+        self.expect_get(url).AndReturn(response)
         self.m.ReplayAll()
         self.assertEqual(data, urlfetch.get(url))
         self.m.VerifyAll()
@@ -82,7 +102,7 @@ class UrlFetchTest(HeatTestCase):
         url = 'https://example.com/template'
         data = '{ "foo": "bar" }'
         response = Response(data)
-        requests.get(url, stream=True).AndReturn(response)
+        self.expect_get(url).AndReturn(response)
         self.m.ReplayAll()
         self.assertEqual(data, urlfetch.get(url))
         self.m.VerifyAll()
@@ -90,7 +110,7 @@ class UrlFetchTest(HeatTestCase):
     def test_http_error(self):
         url = 'http://example.com/template'
 
-        requests.get(url, stream=True).AndRaise(exceptions.HTTPError())
+        self.expect_get(url).AndRaise(exceptions.HTTPError())
         self.m.ReplayAll()
 
         self.assertRaises(IOError, urlfetch.get, url)
@@ -99,7 +119,7 @@ class UrlFetchTest(HeatTestCase):
     def test_non_exist_url(self):
         url = 'http://non-exist.com/template'
 
-        requests.get(url, stream=True).AndRaise(exceptions.Timeout())
+        self.expect_get(url).AndRaise(exceptions.Timeout())
         self.m.ReplayAll()
 
         self.assertRaises(IOError, urlfetch.get, url)
@@ -115,7 +135,7 @@ class UrlFetchTest(HeatTestCase):
         data = '{ "foo": "bar" }'
         response = Response(data)
         cfg.CONF.set_override('max_template_size', 500)
-        requests.get(url, stream=True).AndReturn(response)
+        self.expect_get(url).AndReturn(response)
         self.m.ReplayAll()
         urlfetch.get(url)
         self.m.VerifyAll()
@@ -125,8 +145,165 @@ class UrlFetchTest(HeatTestCase):
         data = '{ "foo": "bar" }'
         response = Response(data)
         cfg.CONF.set_override('max_template_size', 5)
-        requests.get(url, stream=True).AndReturn(response)
+        self.expect_get(url).AndReturn(response)
         self.m.ReplayAll()
         exception = self.assertRaises(IOError, urlfetch.get, url)
         self.assertIn("Template exceeds", str(exception))
+        self.assertTrue(response.closed)
+        self.m.VerifyAll()
+
+    def test_fetch_in_chunks(self):
+        url = 'http://example.com/template'
+        data = 'x' * 1000
+        response = Response(data)
+        chunk_sizes = []
+        iter_content = response.iter_content
+
+        def record_chunks(chunk_size):
+            for chunk in iter_content(chunk_size):
+                chunk_sizes.append(len(chunk))
+                yield chunk
+
+        response.iter_content = record_chunks
+        cfg.CONF.set_override('template_fetch_chunk_size', 300)
+        self.expect_get(url).AndReturn(response)
+        self.m.ReplayAll()
+        self.assertEqual(data, urlfetch.get(url))
+        self.assertEqual([300, 300, 300, 100], chunk_sizes)
+        self.assertTrue(response.closed)
+        self.m.VerifyAll()
+
+    def test_file_scheme_max_fetch_size_error(self):
+        url = 'file:///etc/profile'
+        cfg.CONF.set_override('max_template_size', 5)
+
+        self.m.StubOutWithMock(urlutils, 'urlopen')
+        urlutils.urlopen(url).AndReturn(cStringIO.StringIO('{"foo": "bar"}'))
+        self.m.ReplayAll()
+
+        exception = self.assertRaises(IOError, urlfetch.get, url,
+                                      allowed_schemes=['file'])
+        self.assertIn("Template exceeds", str(exception))
+        self.m.VerifyAll()
+
+
+class UrlFetchSessionTest(HeatTestCase):
+    def test_session_shared(self):
+        self.useFixture(fixtures.MonkeyPatch(
+            'heat.common.urlfetch._http_session', None))
+        cfg.CONF.set_override('template_fetch_pool_size', 3)
+        session = urlfetch._session()
+        self.assertIs(session, urlfetch._session())
+        adapter = session.get_adapter('https://example.com/')
+        self.assertEqual(3, adapter._pool_maxsize)
+
+
+class TemplateCacheTest(UrlFetchTestBase):
+    url = 'https://example.com/nested.template'
+    data = '{ "foo": "bar" }'
+
+    def setUp(self):
+        super(TemplateCacheTest, self).setUp()
+        timeutils.set_time_override()
+        self.addCleanup(timeutils.clear_time_override)
+        self.cache = urlfetch.enable_cache()
+        self.addCleanup(urlfetch.disable_cache)
+
+    def test_cache_disabled(self):
+        cfg.CONF.set_override('remote_template_cache_size', 0)
+        self.assertIsNone(urlfetch.enable_cache())
+
+    def test_hit_within_ttl(self):
+        self.expect_get(self.url, {}).AndReturn(Response(self.data))
+        self.m.ReplayAll()
+
+        self.assertEqual(self.data, urlfetch.get(self.url))
+        timeutils.advance_time_seconds(59)
+        self.assertEqual(self.data, urlfetch.get(self.url))
+        self.assertEqual({'hits': 1, 'misses': 1,
+                          'revalidated': 0, 'evicted': 0},
+                         self.cache.stats_dict())
+        self.m.VerifyAll()
+
+    def test_revalidate_not_modified(self):
+        headers = {'ETag': '"abc"',
+                   'Last-Modified': 'Tue, 01 Apr 2014 00:00:00 GMT'}
+        self.expect_get(self.url, {}).AndReturn(
+            Response(self.data, headers=headers))
+        self.expect_get(self.url, {
+            'If-None-Match': '"abc"',
+            'If-Modified-Since': 'Tue, 01 Apr 2014 00:00:00 GMT'}).AndReturn(
+                Response(status_code=304))
+        self.m.ReplayAll()
+
+        self.assertEqual(self.data, urlfetch.get(self.url))
+        timeutils.advance_time_seconds(100)
+        self.assertEqual(self.data, urlfetch.get(self.url))
+        timeutils.advance_time_seconds(10)
+        self.assertEqual(self.data, urlfetch.get(self.url))
+        self.assertEqual({'hits': 1, 'misses': 1,
+                          'revalidated': 1, 'evicted': 0},
+                         self.cache.stats_dict())
+        self.m.VerifyAll()
+
+    def test_revalidate_modified(self):
+        new_data = '{ "foo": "baz" }'
+        self.expect_get(self.url, {}).AndReturn(
+            Response(self.data, headers={'ETag': '"abc"'}))
+        self.expect_get(self.url, {
+            'If-None-Match': '"abc"'}).AndReturn(Response(new_data))
+        self.m.ReplayAll()
+
+        self.assertEqual(self.data, urlfetch.get(self.url))
+        timeutils.advance_time_seconds(100)
+        self.assertEqual(new_data, urlfetch.get(self.url))
+        self.m.VerifyAll()
+
+    def test_evict_least_recently_used(self):
+        cfg.CONF.set_override('remote_template_cache_size',
+                              2 * len(self.data))
+        other_url = 'https://example.com/other.template'
+        third_url = 'https://example.com/third.template'
+        for url in (self.url, other_url, third_url, other_url):
+            self.expect_get(url, {}).AndReturn(Response(self.data))
+        self.m.ReplayAll()
+
+        urlfetch.get(self.url)
+        urlfetch.get(other_url)
+        urlfetch.get(self.url)
+        urlfetch.get(third_url)
+        urlfetch.get(self.url)
+        urlfetch.get(other_url)
+        self.assertEqual({'hits': 2, 'misses': 4,
+                          'revalidated': 0, 'evicted': 2},
+                         self.cache.stats_dict())
+        self.m.VerifyAll()
+
+    def test_error_not_cached(self):
+        self.expect_get(self.url, {}).AndRaise(exceptions.HTTPError())
+        self.expect_get(self.url, {}).AndReturn(Response(self.data))
+        self.m.ReplayAll()
+
+        self.assertRaises(IOError, urlfetch.get, self.url)
+        self.assertEqual(self.data, urlfetch.get(self.url))
+        self.m.VerifyAll()
+
+    def test_on_disk(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        cfg.CONF.set_override('remote_template_cache_dir', cache_dir)
+        urlfetch.enable_cache()
+        self.expect_get(self.url, {}).AndReturn(Response(self.data))
+        self.m.ReplayAll()
+
+        self.assertEqual(self.data, urlfetch.get(self.url))
+        self.assertEqual(1, len(os.listdir(cache_dir)))
+
+        # A new process finds the template on disk
+        cache = urlfetch.enable_cache()
+        self.assertEqual(self.data, urlfetch.get(self.url))
+        self.assertEqual(1, cache.stats_dict()['hits'])
+
+        cache.clear()
+        self.assertEqual([], os.listdir(cache_dir))
         self.m.VerifyAll()
@@ -333,8 +333,8 @@ class AccessKeyTest(UserPolicyTestCase):
         # Delete the resource data for secret_key, to test that existing
         # stacks which don't have the resource_data stored will continue
         # working via retrieving the keypair from keystone
-        db_api.resource_data_delete(rsrc, 'credential_id')
-        db_api.resource_data_delete(rsrc, 'secret_key')
+        rsrc.data.delete('credential_id')
+        rsrc.data.delete('secret_key')
         rs_data = db_api.resource_data_get_all(rsrc)
         self.assertEqual(0, len(rs_data.keys()))
 
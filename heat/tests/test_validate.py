@@ -567,8 +567,6 @@ class validateTest(HeatTestCase):
 
         self.m.StubOutWithMock(instances.Instance, 'nova')
         instances.Instance.nova().AndReturn(self.fc)
-        self.m.StubOutWithMock(service.EngineListener, 'start')
-        service.EngineListener.start().AndReturn(None)
         self.m.ReplayAll()
 
         engine = service.EngineService('a', 't')
@@ -586,8 +584,6 @@ class validateTest(HeatTestCase):
             """)
         self.m.StubOutWithMock(instances.Instance, 'nova')
         instances.Instance.nova().AndReturn(self.fc)
-        self.m.StubOutWithMock(service.EngineListener, 'start')
-        service.EngineListener.start().AndReturn(None)
         self.m.ReplayAll()
 
         engine = service.EngineService('a', 't')
@@ -599,8 +595,6 @@ class validateTest(HeatTestCase):
 
         self.m.StubOutWithMock(instances.Instance, 'nova')
         instances.Instance.nova().AndReturn(self.fc)
-        self.m.StubOutWithMock(service.EngineListener, 'start')
-        service.EngineListener.start().AndReturn(None)
         self.m.ReplayAll()
 
         engine = service.EngineService('a', 't')
@@ -612,8 +606,6 @@ class validateTest(HeatTestCase):
 
         self.m.StubOutWithMock(instances.Instance, 'nova')
         instances.Instance.nova().AndReturn(self.fc)
-        self.m.StubOutWithMock(service.EngineListener, 'start')
-        service.EngineListener.start().AndReturn(None)
         self.m.ReplayAll()
 
         engine = service.EngineService('a', 't')
@@ -625,8 +617,6 @@ class validateTest(HeatTestCase):
 
         self.m.StubOutWithMock(instances.Instance, 'nova')
         instances.Instance.nova().AndReturn(self.fc)
-        self.m.StubOutWithMock(service.EngineListener, 'start')
-        service.EngineListener.start().AndReturn(None)
         self.m.ReplayAll()
 
         engine = service.EngineService('a', 't')
@@ -638,8 +628,6 @@ class validateTest(HeatTestCase):
 
         self.m.StubOutWithMock(instances.Instance, 'nova')
         instances.Instance.nova().AndReturn(self.fc)
-        self.m.StubOutWithMock(service.EngineListener, 'start')
-        service.EngineListener.start().AndReturn(None)
         self.m.ReplayAll()
 
         engine = service.EngineService('a', 't')
@@ -659,8 +647,6 @@ class validateTest(HeatTestCase):
         t = template_format.parse(test_template_invalid_property)
         self.m.StubOutWithMock(instances.Instance, 'nova')
         instances.Instance.nova().AndReturn(self.fc)
-        self.m.StubOutWithMock(service.EngineListener, 'start')
-        service.EngineListener.start().AndReturn(None)
         self.m.ReplayAll()
 
         engine = service.EngineService('a', 't')
@@ -671,8 +657,6 @@ class validateTest(HeatTestCase):
         t = template_format.parse(test_template_invalid_resources)
         self.m.StubOutWithMock(instances.Instance, 'nova')
         instances.Instance.nova().AndReturn(self.fc)
-        self.m.StubOutWithMock(service.EngineListener, 'start')
-        service.EngineListener.start().AndReturn(None)
         self.m.ReplayAll()
 
         engine = service.EngineService('a', 't')
@@ -685,8 +669,6 @@ class validateTest(HeatTestCase):
         t = template_format.parse(test_template_unimplemented_property)
         self.m.StubOutWithMock(instances.Instance, 'nova')
         instances.Instance.nova().AndReturn(self.fc)
-        self.m.StubOutWithMock(service.EngineListener, 'start')
-        service.EngineListener.start().AndReturn(None)
         self.m.ReplayAll()
 
         engine = service.EngineService('a', 't')
@@ -699,8 +681,6 @@ class validateTest(HeatTestCase):
         t = template_format.parse(test_template_invalid_deletion_policy)
         self.m.StubOutWithMock(instances.Instance, 'nova')
         instances.Instance.nova().AndReturn(self.fc)
-        self.m.StubOutWithMock(service.EngineListener, 'start')
-        service.EngineListener.start().AndReturn(None)
         self.m.ReplayAll()
 
         engine = service.EngineService('a', 't')
@@ -711,8 +691,6 @@ class validateTest(HeatTestCase):
         t = template_format.parse(test_template_snapshot_deletion_policy)
         self.m.StubOutWithMock(instances.Instance, 'nova')
         instances.Instance.nova().AndReturn(self.fc)
-        self.m.StubOutWithMock(service.EngineListener, 'start')
-        service.EngineListener.start().AndReturn(None)
         self.m.ReplayAll()
 
         engine = service.EngineService('a', 't')
@@ -726,8 +704,6 @@ class validateTest(HeatTestCase):
         t = template_format.parse(test_template_volume_snapshot)
         self.m.StubOutWithMock(instances.Instance, 'nova')
         instances.Instance.nova().AndReturn(self.fc)
-        self.m.StubOutWithMock(service.EngineListener, 'start')
-        service.EngineListener.start().AndReturn(None)
         self.m.ReplayAll()
 
         engine = service.EngineService('a', 't')
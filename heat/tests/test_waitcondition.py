@@ -100,6 +100,8 @@ class WaitConditionTest(HeatTestCase):
 
     def setUp(self):
         super(WaitConditionTest, self).setUp()
+        # Check the handle status on every step, as get_status is stubbed
+        cfg.CONF.set_override('wait_condition_poll_interval', 0)
         utils.setup_dummy_db()
         self.m.StubOutWithMock(wc.WaitConditionHandle,
                                'get_status')
@@ -388,9 +390,52 @@ class WaitConditionTest(HeatTestCase):
         self.m.VerifyAll()
 
 
+class SignalWaiterTest(HeatTestCase):
+    def test_notify_signal(self):
+        with wc.SignalWaiter('handle-id') as waiter:
+            self.assertTrue(waiter.check_due())
+            self.assertFalse(waiter.check_due())
+
+            wc.notify_signal('other-handle-id')
+            self.assertFalse(waiter.check_due())
+
+            wc.notify_signal('handle-id')
+            self.assertTrue(waiter.check_due())
+            self.assertFalse(waiter.check_due())
+
+        self.assertNotIn('handle-id', wc._waiters)
+        # Signals with nobody waiting are ignored
+        wc.notify_signal('handle-id')
+        self.assertFalse(waiter.check_due())
+
+    def test_poll_interval(self):
+        cfg.CONF.set_override('wait_condition_poll_interval', 30)
+        with wc.SignalWaiter('handle-id') as waiter:
+            self.assertTrue(waiter.check_due())
+            self.assertFalse(waiter.check_due())
+
+            waiter.last_checked -= 30
+            self.assertTrue(waiter.check_due())
+            self.assertFalse(waiter.check_due())
+
+    def test_multiple_waiters(self):
+        with wc.SignalWaiter('handle-id') as waiter1:
+            with wc.SignalWaiter('handle-id') as waiter2:
+                waiter1.check_due()
+                waiter2.check_due()
+
+                wc.notify_signal('handle-id')
+                self.assertTrue(waiter1.check_due())
+                self.assertTrue(waiter2.check_due())
+
+            self.assertEqual(set([waiter1]), wc._waiters['handle-id'])
+
+
 class WaitConditionHandleTest(HeatTestCase):
     def setUp(self):
         super(WaitConditionHandleTest, self).setUp()
+        # Check the handle status on every step, as get_status is stubbed
+        cfg.CONF.set_override('wait_condition_poll_interval', 0)
         cfg.CONF.set_default('heat_waitcondition_server_url',
                              'http://server.test:8000/v1/waitcondition')
 
@@ -445,7 +490,7 @@ class WaitConditionHandleTest(HeatTestCase):
 
         rsrc = self.stack['WaitHandle']
         # clear the url
-        db_api.resource_data_set(rsrc, 'ec2_signed_url', None, False)
+        rsrc.data.set('ec2_signed_url', None)
 
         rsrc.created_time = created_time
         self.assertEqual((rsrc.CREATE, rsrc.COMPLETE), rsrc.state)
@@ -580,6 +625,8 @@ class WaitConditionHandleTest(HeatTestCase):
 class WaitConditionUpdateTest(HeatTestCase):
     def setUp(self):
         super(WaitConditionUpdateTest, self).setUp()
+        # Check the handle status on every step, as get_status is stubbed
+        cfg.CONF.set_override('wait_condition_poll_interval', 0)
         cfg.CONF.set_default('heat_waitcondition_server_url',
                              'http://server.test:8000/v1/waitcondition')
 
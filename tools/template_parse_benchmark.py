@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Time heat.common.template_format.parse() on representative templates.
+
+Usage: template_parse_benchmark.py [ITERATIONS]
+
+The sample CFN templates (JSON and YAML) from the unit tests are parsed,
+along with a large generated HOT template. Each is timed both with an empty
+parse cache and with the result already cached.
+"""
+
+import json
+import os
+import sys
+import timeit
+
+import yaml
+
+from heat.common import template_format
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            os.pardir, 'heat', 'tests', 'templates')
+
+
+def hot_template(num_resources=500):
+    resources = dict(('server_%d' % i, {
+        'type': 'OS::Nova::Server',
+        'properties': {'image': {'get_param': 'image'},
+                       'flavor': {'get_param': 'flavor'},
+                       'user_data': 'echo %d' % i}})
+        for i in range(num_resources))
+    tmpl = {'heat_template_version': '2013-05-23',
+            'parameters': {'image': {'type': 'string'},
+                           'flavor': {'type': 'string'}},
+            'resources': resources}
+    return yaml.safe_dump(tmpl, default_flow_style=False)
+
+
+def templates():
+    for name in sorted(os.listdir(TEMPLATE_DIR)):
+        if name.endswith(('.template', '.yaml')):
+            with open(os.path.join(TEMPLATE_DIR, name)) as f:
+                yield name, f.read()
+
+    hot = hot_template()
+    yield 'generated HOT (YAML)', hot
+    yield 'generated HOT (JSON)', json.dumps(yaml.safe_load(hot))
+
+
+def main(iterations=100):
+    print('%-34s %8s %12s %12s' % ('template', 'bytes', 'cold (ms)',
+                                   'cached (ms)'))
+    for name, tmpl_str in templates():
+        try:
+            template_format.parse(tmpl_str)
+        except ValueError:
+            print('%-34s %8d %25s' % (name, len(tmpl_str), 'not parseable'))
+            continue
+
+        def cold():
+            template_format._parse_cache.clear()
+            template_format.parse(tmpl_str)
+
+        def cached():
+            template_format.parse(tmpl_str)
+
+        cold_time = timeit.timeit(cold, number=iterations)
+        cached_time = timeit.timeit(cached, number=iterations)
+        print('%-34s %8d %12.3f %12.3f' % (name, len(tmpl_str),
+                                           cold_time * 1000 / iterations,
+                                           cached_time * 1000 / iterations))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:2]])